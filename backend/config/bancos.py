@@ -0,0 +1,15 @@
+PRAGMAS_SQLITE = "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA busy_timeout={timeout}; PRAGMA foreign_keys=ON; PRAGMA cache_size=-20000; PRAGMA temp_store=MEMORY"
+PRAGMAS_REPLICA = "PRAGMA busy_timeout={timeout}; PRAGMA query_only=ON; PRAGMA cache_size=-20000; PRAGMA temp_store=MEMORY"
+
+def sqlite(nome, conn_max_age, timeout_ms, replica=False):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': nome, 'CONN_MAX_AGE': conn_max_age, 'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'init_command': PRAGMAS_REPLICA.format(timeout=timeout_ms)} if replica else {'init_command': PRAGMAS_SQLITE.format(timeout=timeout_ms), 'transaction_mode': 'IMMEDIATE'},
+        'TEST': {'MIRROR': 'default'} if replica else {},
+    }
+
+def postgres(host, nome, usuario, senha, porta, conn_max_age, replica=False):
+    return {
+        'ENGINE': 'django.db.backends.postgresql', 'HOST': host, 'NAME': nome, 'USER': usuario, 'PASSWORD': senha, 'PORT': porta,
+        'CONN_MAX_AGE': conn_max_age, 'CONN_HEALTH_CHECKS': True, 'TEST': {'MIRROR': 'default'} if replica else {},
+    }
@@ -0,0 +1,71 @@
+import random
+import sqlite3
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import connections
+
+usar_replica = ContextVar('usar_replica', default=False)
+escreveu = ContextVar('escreveu', default=False)
+
+CACHES_LOCAIS = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+def chave_aderencia(usuario_id): return f"bancos:escrita:{usuario_id}"
+
+def verificar_cache_aderencia(app_configs=None, **kwargs):
+    if not settings.DATABASE_REPLICAS or settings.CACHES['default']['BACKEND'] not in CACHES_LOCAIS: return []
+    return [checks.Warning(
+        'DATABASE_REPLICAS está configurado, mas o cache padrão não é compartilhado entre processos.',
+        hint='Com mais de um worker, a aderência ao banco principal após uma escrita só vale no mesmo processo. Defina CACHE_BACKEND/CACHE_LOCATION (Redis, Memcached ou DatabaseCache).',
+        id='readlist.W001',
+    )]
+
+class RoteadorReplicas:
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or not usar_replica.get() or escreveu.get() or connections['default'].in_atomic_block: return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        escreveu.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints): return True
+
+    def allow_migrate(self, db, app_label, **hints): return db == 'default'
+
+def abrir_leitura(request, aderente):
+    return escreveu.set(False), usar_replica.set(request.method in ('GET', 'HEAD', 'OPTIONS') and not aderente)
+
+def fechar_leitura(tokens):
+    houve_escrita = escreveu.get()
+    escreveu.reset(tokens[0]); usar_replica.reset(tokens[1])
+    return houve_escrita
+
+class LeituraReplicaMixin:
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        usuario_id = request.user.pk if request.user.is_authenticated else None
+        self._tokens_replica = abrir_leitura(request, usuario_id and cache.get(chave_aderencia(usuario_id)))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        tokens = getattr(self, '_tokens_replica', None)
+        if tokens:
+            if fechar_leitura(tokens) and request.user.is_authenticated: cache.set(chave_aderencia(request.user.pk), True, settings.REPLICA_ADERENCIA_SEGUNDOS)
+            self._tokens_replica = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+@asynccontextmanager
+async def leitura_assincrona(request):
+    chave = chave_aderencia(request.user.pk)
+    tokens = abrir_leitura(request, await cache.aget(chave))
+    try: yield
+    finally:
+        if fechar_leitura(tokens): await cache.aset(chave, True, settings.REPLICA_ADERENCIA_SEGUNDOS)
+
+def sincronizar_sqlite(origem, destino):
+    connections[origem].ensure_connection(); connections[destino].close()
+    copia = sqlite3.connect(connections[destino].settings_dict['NAME'])
+    try: connections[origem].connection.backup(copia)
+    finally: copia.close()
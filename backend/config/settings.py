@@ -1,6 +1,7 @@
 from pathlib import Path
 from datetime import timedelta
 import os
+from config import bancos
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -24,6 +25,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'resenhas.metricas.MetricasMiddleware',
     'corsheaders.middleware.CorsMiddleware', 
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -53,10 +55,25 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
-DATABASES = {
+DB_PERFIL = os.environ.get('DB_PERFIL', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+DB_REPLICAS = [r for r in os.environ.get('DB_REPLICAS', '').split(',') if r]
+if DB_PERFIL == 'postgres':
+    _pg = [os.environ.get('DB_NOME', 'readlist'), os.environ.get('DB_USUARIO', 'readlist'), os.environ.get('DB_SENHA', ''), os.environ.get('DB_PORTA', '5432'), DB_CONN_MAX_AGE]
+    DATABASES = {'default': bancos.postgres(os.environ.get('DB_HOST', 'localhost'), *_pg)}
+    DATABASES.update({f'replica{i}': bancos.postgres(host, *_pg, replica=True) for i, host in enumerate(DB_REPLICAS)})
+else:
+    DB_SQLITE_TIMEOUT_MS = int(os.environ.get('DB_SQLITE_TIMEOUT_MS', 5000))
+    DATABASES = {'default': bancos.sqlite(os.environ.get('DB_ARQUIVO', str(BASE_DIR / 'db.sqlite3')), DB_CONN_MAX_AGE, DB_SQLITE_TIMEOUT_MS)}
+    DATABASES.update({f'replica{i}': bancos.sqlite(arquivo, DB_CONN_MAX_AGE, DB_SQLITE_TIMEOUT_MS, replica=True) for i, arquivo in enumerate(DB_REPLICAS)})
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['config.roteador.RoteadorReplicas']
+REPLICA_ADERENCIA_SEGUNDOS = int(os.environ.get('REPLICA_ADERENCIA_SEGUNDOS', 5))
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
@@ -75,7 +92,11 @@ STATIC_URL = 'static/'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'resenhas.autenticacao.JWTAuthenticationCache',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'resenhas.metricas.JSONRendererMedido',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -89,5 +110,58 @@ SIMPLE_JWT = {
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+COMENTARIOS_MAX_PROFUNDIDADE = int(os.environ.get('COMENTARIOS_MAX_PROFUNDIDADE', 10))
+COMENTARIOS_MAX_RESPOSTAS = int(os.environ.get('COMENTARIOS_MAX_RESPOSTAS', 50))
+FEED_COMENTARIOS_RECENTES = int(os.environ.get('FEED_COMENTARIOS_RECENTES', 3))
+
+TIMELINE_LIMITE_POPULAR = int(os.environ.get('TIMELINE_LIMITE_POPULAR', 1000))
+TIMELINE_LOTE = int(os.environ.get('TIMELINE_LOTE', 500))
+TIMELINE_PREENCHIMENTO = int(os.environ.get('TIMELINE_PREENCHIMENTO', 50))
+
+CONVERSA_LIMITE = int(os.environ.get('CONVERSA_LIMITE', 50))
+CONVERSA_LIMITE_MAXIMO = int(os.environ.get('CONVERSA_LIMITE_MAXIMO', 200))
+
+NOTIFICACOES_LOTE = int(os.environ.get('NOTIFICACOES_LOTE', 500))
+NOTIFICACOES_MAX_TENTATIVAS = int(os.environ.get('NOTIFICACOES_MAX_TENTATIVAS', 5))
+NOTIFICACOES_AGRUPAR = [t for t in os.environ.get('NOTIFICACOES_AGRUPAR', 'curtida,comentario').split(',') if t]
+NOTIFICACOES_JANELA_HORAS = float(os.environ.get('NOTIFICACOES_JANELA_HORAS', 24))
+NOTIFICACOES_ULTIMOS_REMETENTES = int(os.environ.get('NOTIFICACOES_ULTIMOS_REMETENTES', 3))
+NOTIFICACOES_RETENCAO_DIAS = int(os.environ.get('NOTIFICACOES_RETENCAO_DIAS', 90))
+NOTIFICACOES_PODA_LOTE = int(os.environ.get('NOTIFICACOES_PODA_LOTE', 1000))
+
+TEMPO_REAL_BROKER = os.environ.get('TEMPO_REAL_BROKER', 'resenhas.tempo_real.BrokerLocal')
+TEMPO_REAL_FILA = int(os.environ.get('TEMPO_REAL_FILA', 100))
+TEMPO_REAL_KEEPALIVE = float(os.environ.get('TEMPO_REAL_KEEPALIVE', 15))
+TEMPO_REAL_RETRY_MS = int(os.environ.get('TEMPO_REAL_RETRY_MS', 3000))
+TEMPO_REAL_INGRESSO_TTL = int(os.environ.get('TEMPO_REAL_INGRESSO_TTL', 30))
+
+BUSCA_BACKEND = os.environ.get('BUSCA_BACKEND', '')
+BUSCA_MAX_RESULTADOS = int(os.environ.get('BUSCA_MAX_RESULTADOS', 500))
+
+AUTH_CACHE_ATIVO = os.environ.get('AUTH_CACHE_ATIVO', 'True') == 'True'
+AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', 30))
+AUTH_CACHE_MAXIMO = int(os.environ.get('AUTH_CACHE_MAXIMO', 10000))
+
+METRICAS_ORCAMENTO_CONSULTAS = int(os.environ.get('METRICAS_ORCAMENTO_CONSULTAS', 20))
+METRICAS_SQL_LOG = int(os.environ.get('METRICAS_SQL_LOG', 10))
+METRICAS_IPS = os.environ.get('METRICAS_IPS', '127.0.0.1,::1').split(',')
+
+EXPORTACAO_CHUNK = int(os.environ.get('EXPORTACAO_CHUNK', 2000))
+IMPORTACAO_LOTE = int(os.environ.get('IMPORTACAO_LOTE', 500))
+
+LIVROS_CLIENTE = os.environ.get('LIVROS_CLIENTE', 'resenhas.livros.GoogleBooksClient')
+GOOGLE_BOOKS_API_KEY = os.environ.get('GOOGLE_BOOKS_API_KEY', '')
+LIVROS_MAX_RESULTADOS = int(os.environ.get('LIVROS_MAX_RESULTADOS', 20))
+LIVROS_TIMEOUT = float(os.environ.get('LIVROS_TIMEOUT', 5))
+LIVROS_CACHE_MAXIMO = int(os.environ.get('LIVROS_CACHE_MAXIMO', 1000))
+LIVROS_CACHE_TTL = int(os.environ.get('LIVROS_CACHE_TTL', 600))
+LIVROS_CACHE_PERSISTENTE_TTL = int(os.environ.get('LIVROS_CACHE_PERSISTENTE_TTL', 7 * 86400))
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+SERVIR_MIDIA = os.environ.get('SERVIR_MIDIA', str(DEBUG)) == 'True'
+MIDIA_MAX_AGE = int(os.environ.get('MIDIA_MAX_AGE', 86400))
+MIDIA_MAX_AGE_IMUTAVEL = int(os.environ.get('MIDIA_MAX_AGE_IMUTAVEL', 31536000))
+
+AVATAR_MINIATURAS_DIR = 'avatars/miniaturas'
+AVATAR_MINIATURAS = {'pequena': 48, 'media': 96, 'grande': 256}
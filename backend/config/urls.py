@@ -1,9 +1,9 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from resenhas.views import RegisterView, UserDetailView, PublicProfileView
+from resenhas.views import RegisterView, UserDetailView, PublicProfileView, SeguirView, PerfilBundleView
+from resenhas.midia import servir
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,6 +11,11 @@ urlpatterns = [
     path('api/auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/auth/me/', UserDetailView.as_view(), name='user_detail'),
+    path('api/auth/me/bundle/', PerfilBundleView.as_view(), name='perfil_bundle_proprio'),
     path('api/auth/profile/<str:username>/', PublicProfileView.as_view(), name='public_profile'),
+    path('api/auth/profile/<str:username>/seguir/', SeguirView.as_view(), name='seguir'),
+    path('api/auth/profile/<str:username>/bundle/', PerfilBundleView.as_view(), name='perfil_bundle'),
     path('api/', include('resenhas.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+if settings.SERVIR_MIDIA: urlpatterns.append(re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<caminho>.*)$", servir, name='midia'))
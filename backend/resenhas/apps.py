@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.core.checks import register
+from django.db.models.signals import post_migrate
 
 
 class ResenhasConfig(AppConfig):
     name = 'resenhas'
+
+    def ready(self):
+        from .busca import instalar_indice
+        from . import autenticacao, notificacoes
+        from config.roteador import verificar_cache_aderencia
+        post_migrate.connect(instalar_indice, sender=self)
+        register(verificar_cache_aderencia)
@@ -0,0 +1,70 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count, Max, Q, Sum
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, NotAuthenticated, ParseError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from config.roteador import leitura_assincrona
+from .condicional import marcar, mais_recente, validar
+from .metricas import JSONRendererMedido
+from .models import Conversa, Notificacao, Resenha
+from .pagination import KeysetPagination
+from .serializers import MensagemSerializer, NotificacaoSerializer, ResenhaResumoSerializer, ResenhaSerializer
+from .views import janela_conversa
+
+def autenticado(request): return request.user.is_authenticated
+
+class LeituraAssincrona(View):
+    http_method_names = ['get', 'options']
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.request = Request(request, authenticators=[classe() for classe in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            if not await sync_to_async(autenticado)(self.request): raise NotAuthenticated()
+            async with leitura_assincrona(self.request): return await super().dispatch(self.request, *args, **kwargs)
+        except APIException as exc: return self.responder({'detail': exc.detail}, exc.status_code)
+
+    def responder(self, dados, status=200):
+        return HttpResponse(JSONRendererMedido().render(dados), status=status, content_type='application/json')
+
+    def serializar(self, serializer_class, objetos):
+        return serializer_class(objetos, many=True, context={'request': self.request}).data
+
+    async def listar(self, queryset, serializer_class, versao, modificado):
+        etag, timestamp, resposta = validar(self.request._request, self.request.user.pk, versao, modificado)
+        if resposta is None:
+            paginador = KeysetPagination()
+            pagina = await paginador.apaginate_queryset(queryset, self.request, self)
+            resposta = self.responder(paginador.get_paginated_response(self.serializar(serializer_class, pagina)).data)
+        return marcar(resposta, etag, timestamp)
+
+class FeedAssincrono(LeituraAssincrona):
+    async def get(self, request):
+        if request.query_params.get('search') or request.query_params.get('ordering'): raise ParseError('Busca e ordenação estão disponíveis em /api/resenhas/.')
+        if request.query_params.get('expand'): queryset, serializer_class = Resenha.objects.com_detalhes(request.user), ResenhaSerializer
+        else: queryset, serializer_class = Resenha.objects.com_resumo(request.user, settings.FEED_COMENTARIOS_RECENTES), ResenhaResumoSerializer
+        queryset = queryset.filtrar_feed(request.user, request.query_params)
+        estado = await queryset.order_by().aaggregate(n=Count('id'), ultima=Max('atualizado_em'), perfis=Max('usuario__perfil__atualizado_em'))
+        return await self.listar(queryset, serializer_class, f"{estado['n']}|{estado['ultima']}|{estado['perfis']}", mais_recente(estado['ultima'], estado['perfis']))
+
+class NotificacoesAssincronas(LeituraAssincrona):
+    cursor_campo = 'data'
+
+    async def get(self, request):
+        queryset = Notificacao.objects.filter(destinatario=request.user)
+        estado = await queryset.order_by().aaggregate(n=Count('id'), nao_lidas=Count('id', filter=Q(lida=False)), atores=Sum('total_remetentes'), ultima=Max('data'),
+                                                      perfis=Max('remetente__perfil__atualizado_em'), resenhas=Max('resenha__atualizado_em'))
+        versao = f"{estado['n']}|{estado['nao_lidas']}|{estado['atores']}|{estado['ultima']}|{estado['perfis']}|{estado['resenhas']}"
+        return await self.listar(queryset.select_related('remetente__perfil', 'resenha'), NotificacaoSerializer, versao, mais_recente(estado['ultima'], estado['perfis'], estado['resenhas']))
+
+class ConversaAssincrona(LeituraAssincrona):
+    async def get(self, request):
+        outro = await User.objects.filter(username=request.query_params.get('user')).values_list('id', flat=True).afirst()
+        if outro is None: return self.responder([])
+        consulta, invertida = janela_conversa(request.user, outro, request.query_params)
+        await Conversa.objects.filter(usuario=request.user, correspondente_id=outro, nao_lidas__gt=0).aupdate(nao_lidas=0)
+        msgs = [msg async for msg in consulta]
+        return self.responder(self.serializar(MensagemSerializer, msgs[::-1] if invertida else msgs))
@@ -0,0 +1,40 @@
+import copy
+from functools import lru_cache
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .cache import CacheLRU
+from .metricas import JWTAuthenticationMedida
+from .models import Perfil
+
+@lru_cache(maxsize=None)
+def get_usuarios(): return CacheLRU(settings.AUTH_CACHE_MAXIMO, settings.AUTH_CACHE_TTL)
+
+def invalidar(usuario_id): get_usuarios().remover(str(usuario_id))
+
+class JWTAuthenticationCache(JWTAuthenticationMedida):
+    def carregar(self, usuario_id):
+        usuario = self.user_model.objects.select_related('perfil').filter(**{api_settings.USER_ID_FIELD: usuario_id}).first()
+        if usuario is None: raise AuthenticationFailed('User not found', code='user_not_found')
+        get_usuarios().set(str(usuario_id), usuario)
+        return usuario
+
+    def get_user(self, validated_token):
+        if not settings.AUTH_CACHE_ATIVO: return super().get_user(validated_token)
+        if api_settings.USER_ID_CLAIM not in validated_token: raise InvalidToken('Token contained no recognizable user identification')
+        usuario_id = validated_token[api_settings.USER_ID_CLAIM]
+        usuario = get_usuarios().get(str(usuario_id)) or self.carregar(usuario_id)
+        if api_settings.CHECK_USER_IS_ACTIVE and not usuario.is_active: raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(usuario.password):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        return copy.deepcopy(usuario)
+
+@receiver([post_save, post_delete], sender=User)
+def invalidar_usuario(sender, instance, **kwargs): invalidar(instance.pk)
+
+@receiver([post_save, post_delete], sender=Perfil)
+def invalidar_perfil(sender, instance, **kwargs): invalidar(instance.usuario_id)
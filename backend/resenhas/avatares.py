@@ -0,0 +1,47 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from . import autenticacao
+from .models import Perfil
+
+logger = logging.getLogger(__name__)
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='miniaturas')
+
+def nome_miniatura(digest, px): return f"{settings.AVATAR_MINIATURAS_DIR}/{digest}_{px}.webp"
+
+def redimensionar(imagem, px):
+    modo = 'RGBA' if imagem.mode in ('RGBA', 'LA', 'P') else 'RGB'
+    buffer = BytesIO()
+    ImageOps.fit(imagem.convert(modo), (px, px), Image.LANCZOS).save(buffer, 'WEBP', quality=85, method=4)
+    return buffer.getvalue()
+
+def gerar_miniaturas(perfil_id):
+    perfil = Perfil.objects.filter(pk=perfil_id).only('avatar', 'usuario_id').first()
+    if perfil is None or not perfil.avatar: return {}
+    with perfil.avatar.open('rb') as f: bruto = f.read()
+    digest = hashlib.sha256(bruto).hexdigest()[:20]
+    imagem = ImageOps.exif_transpose(Image.open(BytesIO(bruto)))
+    miniaturas = {}
+    for tamanho, px in settings.AVATAR_MINIATURAS.items():
+        nome = nome_miniatura(digest, px)
+        if not default_storage.exists(nome): nome = default_storage.save(nome, ContentFile(redimensionar(imagem, px)))
+        miniaturas[tamanho] = nome
+    Perfil.objects.filter(pk=perfil_id, avatar=perfil.avatar.name).update(miniaturas=miniaturas, atualizado_em=timezone.now())
+    autenticacao.invalidar(perfil.usuario_id)
+    return miniaturas
+
+def _processar(perfil_id):
+    close_old_connections()
+    try: gerar_miniaturas(perfil_id)
+    except Exception: logger.exception("Falha ao gerar miniaturas do perfil %s", perfil_id)
+    finally: close_old_connections()
+
+def agendar(perfil_id):
+    transaction.on_commit(lambda: executor.submit(_processar, perfil_id))
@@ -0,0 +1,145 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .models import Conversa, Resenha
+
+ENDPOINTS = {
+    'feed': "/api/resenhas/",
+    'feed_expandido': "/api/resenhas/?expand=1",
+    'feed_busca': "/api/resenhas/?search=memória",
+    'timeline': "/api/resenhas/timeline/",
+    'resenha': "/api/resenhas/{resenha}/",
+    'resenha_comentarios': "/api/resenhas/{resenha}/comentarios/",
+    'resenha_curtidores': "/api/resenhas/{resenha}/curtidores/",
+    'comentarios': "/api/comentarios/?resenha={resenha}",
+    'notificacoes': "/api/notificacoes/",
+    'notificacoes_nao_lidas': "/api/notificacoes/unread_count/",
+    'conversa': "/api/mensagens/conversa/?user={correspondente}",
+    'inbox': "/api/mensagens/inbox/",
+}
+CONCORRENCIA = {
+    'feed': ("/api/resenhas/", "/api/async/resenhas/"),
+    'notificacoes': ("/api/notificacoes/", "/api/async/notificacoes/"),
+    'conversa': ("/api/mensagens/conversa/?user={correspondente}", "/api/async/mensagens/conversa/?user={correspondente}"),
+}
+METRICAS = ('p50_ms', 'p95_ms', 'p99_ms', 'consultas', 'bytes')
+
+def contexto():
+    conversa = Conversa.objects.select_related('usuario', 'correspondente').order_by('-nao_lidas', 'id').first()
+    resenha = Resenha.objects.order_by('-total_comentarios', 'id').values_list('id', flat=True).first()
+    if conversa is None or resenha is None: raise ValueError("Banco sem dados; rode seed_readlist antes.")
+    return conversa.usuario, {'resenha': resenha, 'correspondente': conversa.correspondente.username}
+
+def percentis(amostras):
+    cortes = statistics.quantiles(amostras, n=100, method='inclusive')
+    return {'p50_ms': cortes[49], 'p95_ms': cortes[94], 'p99_ms': cortes[98]}
+
+def medir(client, url, repeticoes, aquecimento=2):
+    for _ in range(aquecimento): client.get(url)
+    amostras, consultas = [], 0
+    for _ in range(repeticoes):
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter(); resp = client.get(url); amostras.append((time.perf_counter() - inicio) * 1000)
+        consultas = max(consultas, len(capturadas))
+    if resp.status_code != 200: raise ValueError(f"{url} respondeu {resp.status_code}.")
+    return {**{k: round(v, 2) for k, v in percentis(amostras).items()}, 'consultas': consultas, 'bytes': len(resp.content)}
+
+def executar(repeticoes=50, endpoints=None):
+    usuario, valores = contexto()
+    client = APIClient(); client.force_authenticate(user=usuario)
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        return {nome: medir(client, url.format(**valores), repeticoes) for nome, url in ENDPOINTS.items() if not endpoints or nome in endpoints}
+
+def comparar(atual, base, tolerancia=0.25):
+    regressoes = []
+    for nome, metricas in atual.items():
+        anterior = base.get(nome)
+        if not anterior:
+            regressoes.append(f"{nome}: sem linha de base; grave com --salvar"); continue
+        for metrica in METRICAS:
+            limite = anterior[metrica] if metrica == 'consultas' else anterior[metrica] * (1 + tolerancia)
+            if metricas[metrica] > limite: regressoes.append(f"{nome}.{metrica}: {anterior[metrica]} -> {metricas[metrica]}")
+    return regressoes
+
+def cotas(total, partes): return [total // partes + (i < total % partes) for i in range(partes)]
+
+def chamar_wsgi(handler, url, token):
+    caminho, _, consulta = url.partition('?')
+    status = []
+    ambiente = {'REQUEST_METHOD': 'GET', 'PATH_INFO': caminho, 'QUERY_STRING': consulta, 'SERVER_NAME': 'testserver', 'SERVER_PORT': '80',
+                'HTTP_HOST': 'testserver', 'HTTP_AUTHORIZATION': f"Bearer {token}", 'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http'}
+    resposta = handler(ambiente, lambda linha, cabecalhos: status.append(int(linha[:3])))
+    try: b''.join(resposta)
+    finally: resposta.close()
+    return status[0]
+
+async def chamar_asgi(app, url, token):
+    caminho, _, consulta = url.partition('?')
+    escopo = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http', 'path': caminho,
+              'query_string': consulta.encode(), 'headers': [(b'host', b'testserver'), (b'authorization', f"Bearer {token}".encode())],
+              'server': ('testserver', 80), 'client': ('127.0.0.1', 0)}
+    status, fim, pedido = [], asyncio.Event(), [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    async def receber():
+        if pedido: return pedido.pop()
+        await fim.wait(); return {'type': 'http.disconnect'}
+    async def enviar(mensagem):
+        if mensagem['type'] == 'http.response.start': status.append(mensagem['status'])
+        elif not mensagem.get('more_body'): fim.set()
+    await app(escopo, receber, enviar)
+    return status[0]
+
+def carga_wsgi(url, token, clientes, trabalhadores, requisicoes):
+    handler, vagas, amostras = WSGIHandler(), threading.BoundedSemaphore(trabalhadores), []
+    def cliente(n):
+        try:
+            for _ in range(n):
+                inicio = time.perf_counter()
+                with vagas: status = chamar_wsgi(handler, url, token)
+                amostras.append(((time.perf_counter() - inicio) * 1000, status))
+        finally: connections.close_all()
+    with ThreadPoolExecutor(clientes) as pool:
+        inicio = time.perf_counter(); list(pool.map(cliente, cotas(requisicoes, clientes))); duracao = time.perf_counter() - inicio
+    return amostras, duracao
+
+@contextmanager
+def conexoes_por_requisicao():
+    anteriores = {alias: dados['CONN_MAX_AGE'] for alias, dados in connections.settings.items()}
+    for dados in connections.settings.values(): dados['CONN_MAX_AGE'] = 0
+    try: yield
+    finally:
+        for alias, idade in anteriores.items(): connections.settings[alias]['CONN_MAX_AGE'] = idade
+
+async def carga_asgi(url, token, clientes, requisicoes):
+    app, amostras = ASGIHandler(), []
+    async def cliente(n):
+        for _ in range(n):
+            inicio = time.perf_counter(); status = await chamar_asgi(app, url, token)
+            amostras.append(((time.perf_counter() - inicio) * 1000, status))
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(n) for n in cotas(requisicoes, clientes)))
+    return amostras, time.perf_counter() - inicio
+
+def resumir(amostras, duracao):
+    latencias = [ms for ms, _ in amostras]
+    return {'req_s': round(len(amostras) / duracao, 1), **{k: round(v, 2) for k, v in percentis(latencias).items()}, 'erros': sum(status != 200 for _, status in amostras)}
+
+def concorrencia(clientes=32, trabalhadores=4, requisicoes=320, endpoints=None):
+    usuario, valores = contexto()
+    token, resultado = str(AccessToken.for_user(usuario)), {}
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        for nome, (sincrono, assincrono) in CONCORRENCIA.items():
+            if endpoints and nome not in endpoints: continue
+            wsgi = resumir(*carga_wsgi(sincrono.format(**valores), token, clientes, trabalhadores, requisicoes))
+            with conexoes_por_requisicao(): asgi = resumir(*asyncio.run(carga_asgi(assincrono.format(**valores), token, clientes, requisicoes)))
+            resultado[nome] = {'wsgi': wsgi, 'asgi': asgi}
+    return resultado
@@ -0,0 +1,84 @@
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+CAMPOS = ['titulo_livro', 'autor_livro', 'texto_resenha', 'usuario__username']
+
+def termos(texto): return re.findall(r'\w+', texto)
+
+class BuscaBackend(ABC):
+    def instalar(self): pass
+    def indexar(self, resenhas): pass
+    def remover(self, ids): pass
+    def reconstruir(self, queryset, lote=500):
+        ultimo, total = 0, 0
+        while True:
+            pedaco = list(queryset.filter(id__gt=ultimo).order_by('id').select_related('usuario')[:lote])
+            if not pedaco: return total
+            self.indexar(pedaco); total += len(pedaco); ultimo = pedaco[-1].id
+    @abstractmethod
+    def filtrar(self, queryset, texto): ...
+
+class ContainsBackend(BuscaBackend):
+    def filtrar(self, queryset, texto):
+        for termo in termos(texto):
+            queryset = queryset.filter(Q(*[Q(**{f'{campo}__icontains': termo}) for campo in CAMPOS], _connector=Q.OR))
+        return queryset
+
+class SQLiteFTSBackend(BuscaBackend):
+    tabela = 'resenhas_resenha_fts'
+    pesos = (10.0, 8.0, 1.0, 4.0)
+
+    def instalar(self):
+        with connection.cursor() as c:
+            c.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.tabela} USING fts5(titulo_livro, autor_livro, texto_resenha, username, tokenize='unicode61 remove_diacritics 2')")
+
+    def indexar(self, resenhas):
+        linhas = [(r.id, r.titulo_livro, r.autor_livro, r.texto_resenha, r.usuario.username) for r in resenhas]
+        if not linhas: return
+        with connection.cursor() as c:
+            c.executemany(f"DELETE FROM {self.tabela} WHERE rowid = %s", [(linha[0],) for linha in linhas])
+            c.executemany(f"INSERT INTO {self.tabela}(rowid, titulo_livro, autor_livro, texto_resenha, username) VALUES (%s, %s, %s, %s, %s)", linhas)
+
+    def remover(self, ids):
+        with connection.cursor() as c:
+            c.executemany(f"DELETE FROM {self.tabela} WHERE rowid = %s", [(pk,) for pk in ids])
+
+    def reconstruir(self, queryset, lote=500):
+        with connection.cursor() as c: c.execute(f"DELETE FROM {self.tabela}")
+        return super().reconstruir(queryset, lote)
+
+    def ranking(self, texto, limite):
+        consulta = ' '.join(f'"{termo}"*' for termo in termos(texto))
+        if not consulta: return []
+        with connection.cursor() as c:
+            c.execute(f"SELECT rowid FROM {self.tabela} WHERE {self.tabela} MATCH %s ORDER BY bm25({self.tabela}, {', '.join(map(str, self.pesos))}) LIMIT %s", [consulta, limite])
+            return [linha[0] for linha in c.fetchall()]
+
+    def filtrar(self, queryset, texto):
+        ids = self.ranking(texto, settings.BUSCA_MAX_RESULTADOS)
+        if not ids: return queryset.none()
+        ordem = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(ids)], output_field=IntegerField())
+        return queryset.filter(pk__in=ids).order_by(ordem)
+
+@lru_cache(maxsize=None)
+def get_backend():
+    if settings.BUSCA_BACKEND: return import_string(settings.BUSCA_BACKEND)()
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as c:
+            c.execute("PRAGMA compile_options")
+            if ('ENABLE_FTS5',) in c.fetchall(): return SQLiteFTSBackend()
+    return ContainsBackend()
+
+def instalar_indice(**kwargs): get_backend().instalar()
+
+class BuscaTextualFilter(filters.BaseFilterBackend):
+    search_param = 'search'
+    def filter_queryset(self, request, queryset, view):
+        texto = request.query_params.get(self.search_param, '').strip()
+        return get_backend().filtrar(queryset, texto) if texto else queryset
@@ -0,0 +1,22 @@
+import threading
+import time
+from collections import OrderedDict
+
+class CacheLRU:
+    def __init__(self, maximo, ttl):
+        self.maximo, self.ttl, self._lock, self._itens = maximo, ttl, threading.Lock(), OrderedDict()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None: return None
+            if item[0] < time.monotonic(): del self._itens[chave]; return None
+            self._itens.move_to_end(chave); return item[1]
+
+    def set(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl, valor); self._itens.move_to_end(chave)
+            while len(self._itens) > self.maximo: self._itens.popitem(last=False)
+
+    def remover(self, chave):
+        with self._lock: self._itens.pop(chave, None)
@@ -0,0 +1,130 @@
+import random
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from . import timeline
+from .busca import get_backend
+from .models import Comentario, Conversa, Livro, Mensagem, Notificacao, Perfil, Resenha, Seguindo
+
+PREFIXO = 'seed_'
+PALAVRAS = ("livro leitura enredo personagem capítulo autora narrativa final começo estilo ritmo tema mundo história "
+            "página voz memória viagem cidade amor guerra tempo silêncio família segredo mar noite cartas").split()
+LIVROS = [
+    ("Dom Casmurro", "Machado de Assis"), ("Memórias Póstumas de Brás Cubas", "Machado de Assis"), ("Grande Sertão: Veredas", "João Guimarães Rosa"),
+    ("A Hora da Estrela", "Clarice Lispector"), ("Vidas Secas", "Graciliano Ramos"), ("Capitães da Areia", "Jorge Amado"),
+    ("O Cortiço", "Aluísio Azevedo"), ("Iracema", "José de Alencar"), ("Macunaíma", "Mário de Andrade"), ("Torto Arado", "Itamar Vieira Junior"),
+    ("Cem Anos de Solidão", "Gabriel García Márquez"), ("1984", "George Orwell"), ("O Senhor dos Anéis", "J. R. R. Tolkien"),
+    ("Orgulho e Preconceito", "Jane Austen"), ("Ensaio sobre a Cegueira", "José Saramago"), ("O Pequeno Príncipe", "Antoine de Saint-Exupéry"),
+]
+
+def texto(rng, minimo, maximo): return ' '.join(rng.choices(PALAVRAS, k=rng.randint(minimo, maximo))).capitalize() + '.'
+
+def pesos_zipf(n, s=1.1): return [1 / (i + 1) ** s for i in range(n)]
+
+def espalhar(rng, objetos, campo, agora, dias):
+    for obj, segundos in zip(objetos, sorted((rng.randint(0, dias * 86400) for _ in objetos), reverse=True)):
+        setattr(obj, campo, agora - timedelta(seconds=segundos))
+
+def criar_usuarios(rng, n):
+    senha = make_password('readlist')
+    usuarios = User.objects.bulk_create([User(username=f"{PREFIXO}{i:05d}", email=f"{PREFIXO}{i:05d}@example.com", password=senha) for i in range(n)])
+    Perfil.objects.bulk_create([Perfil(usuario=u, bio=texto(rng, 3, 20), hobbies=', '.join(rng.sample(PALAVRAS, 3))) for u in usuarios])
+    return usuarios
+
+def criar_resenhas(rng, usuarios, n, agora):
+    autores = rng.choices(usuarios, weights=pesos_zipf(len(usuarios), 0.8), k=n)
+    resenhas = []
+    for usuario in autores:
+        titulo, autor = rng.choice(LIVROS)
+        resenhas.append(Resenha(usuario=usuario, titulo_livro=titulo, autor_livro=autor, texto_resenha=texto(rng, 20, 250), nota=rng.choices(range(1, 6), weights=[1, 2, 4, 6, 5])[0]))
+    Resenha.objects.bulk_create(resenhas)
+    espalhar(rng, resenhas, 'data_criacao', agora, 90)
+    Resenha.objects.bulk_update(resenhas, ['data_criacao'])
+    Livro.objects.catalogar_resenhas(resenhas); get_backend().indexar(resenhas)
+    return resenhas
+
+def criar_curtidas(rng, usuarios, resenhas, agora):
+    populares = rng.sample(resenhas, len(resenhas))
+    curtidas, notificacoes, grupos = [], [], []
+    for peso, resenha in zip(pesos_zipf(len(populares), 0.9), populares):
+        atores = rng.sample(usuarios, min(len(usuarios), round(len(usuarios) * 0.8 * peso)))
+        curtidas.extend(Resenha.curtidas.through(resenha_id=resenha.id, user_id=usuario.id) for usuario in atores)
+        atores = [usuario for usuario in atores if usuario.id != resenha.usuario_id]
+        if atores:
+            notificacoes.append(Notificacao(destinatario_id=resenha.usuario_id, remetente=atores[0], tipo='curtida', resenha=resenha, lida=rng.random() < 0.7,
+                                            total_remetentes=len(atores), ultimos_remetentes=[u.username for u in atores[:settings.NOTIFICACOES_ULTIMOS_REMETENTES]]))
+            grupos.append(atores)
+    Resenha.curtidas.through.objects.bulk_create(curtidas, batch_size=1000)
+    espalhar(rng, notificacoes, 'data', agora, 30)
+    for n in notificacoes: n.inicio = n.data
+    Notificacao.objects.bulk_create(notificacoes, batch_size=1000)
+    ligacao = Notificacao.remetentes.through
+    ligacao.objects.bulk_create([ligacao(notificacao_id=n.id, user_id=u.id) for n, grupo in zip(notificacoes, grupos) for u in grupo], batch_size=1000)
+    for usuario_id, n in Counter(n.destinatario_id for n in notificacoes if not n.lida).items():
+        Perfil.objects.filter(usuario_id=usuario_id).update(notificacoes_nao_lidas=n)
+    return len(curtidas)
+
+def criar_comentarios(rng, usuarios, resenhas, n, profundidade, agora):
+    alvos = rng.choices(resenhas, weights=pesos_zipf(len(resenhas)), k=n)
+    fios, niveis = {}, {}
+    for resenha in alvos:
+        fio, pai = fios.setdefault(resenha.id, []), None
+        if fio and rng.random() < 0.7:
+            pai = fio[-1] if rng.random() < 0.6 else rng.choice(fio)
+            if pai.nivel + 1 >= profundidade: pai = None
+        comentario = Comentario(usuario=rng.choice(usuarios), resenha=resenha, texto=texto(rng, 2, 30)[:200])
+        comentario.pai, comentario.nivel = pai, pai.nivel + 1 if pai else 0
+        fio.append(comentario); niveis.setdefault(comentario.nivel, []).append(comentario)
+    criados = []
+    for nivel in sorted(niveis):
+        for comentario in niveis[nivel]: comentario.parent = comentario.pai
+        criados += Comentario.objects.bulk_create(niveis[nivel], batch_size=1000)
+    espalhar(rng, criados, 'data_criacao', agora, 60)
+    Comentario.objects.bulk_update(criados, ['data_criacao'], batch_size=1000)
+    curtidas = [Comentario.curtidas.through(comentario_id=c.id, user_id=u.id) for c in rng.sample(criados, len(criados) // 3) for u in rng.sample(usuarios, rng.randint(1, 5))]
+    Comentario.curtidas.through.objects.bulk_create(curtidas, batch_size=1000, ignore_conflicts=True)
+    Comentario.objects.filter(id__in=[c.id for c in criados]).recalcular_contadores()
+    return len(criados)
+
+def criar_seguidores(rng, usuarios, n):
+    relacoes = sorted({(a.id, b.id) for a in usuarios for b in rng.choices(usuarios, weights=pesos_zipf(len(usuarios), 0.8), k=n) if a.id != b.id})
+    Seguindo.objects.bulk_create([Seguindo(seguidor_id=a, seguido_id=b) for a, b in relacoes], batch_size=1000)
+    for campo, posicao in (('total_seguindo', 0), ('total_seguidores', 1)):
+        for usuario_id, total in Counter(par[posicao] for par in relacoes).items(): Perfil.objects.filter(usuario_id=usuario_id).update(**{campo: total})
+    for usuario in usuarios: timeline.reconstruir(usuario.id)
+    return len(relacoes)
+
+def criar_conversas(rng, usuarios, n, mensagens, agora):
+    total = 0
+    for _ in range(n):
+        a, b = rng.sample(usuarios, 2)
+        if Conversa.objects.filter(usuario=a, correspondente=b).exists(): continue
+        msgs = [Mensagem(remetente=r, destinatario=b if r == a else a, texto=texto(rng, 1, 40)) for r in rng.choices((a, b), k=rng.randint(mensagens // 2, mensagens))]
+        Mensagem.objects.bulk_create(msgs, batch_size=1000)
+        for i, msg in enumerate(msgs): msg.data = agora - timedelta(minutes=len(msgs) - i)
+        Mensagem.objects.bulk_update(msgs, ['data'], batch_size=1000)
+        ultima = msgs[-1]
+        Conversa.objects.bulk_create([
+            Conversa(usuario=ultima.remetente, correspondente=ultima.destinatario, ultima_mensagem=ultima, atualizado_em=ultima.data),
+            Conversa(usuario=ultima.destinatario, correspondente=ultima.remetente, ultima_mensagem=ultima, atualizado_em=ultima.data, nao_lidas=rng.randint(0, 10)),
+        ])
+        total += len(msgs)
+    return total
+
+@transaction.atomic
+def semear(seed=42, usuarios=200, resenhas=1000, comentarios=5000, profundidade=12, conversas=20, mensagens=300, seguindo=20):
+    rng, agora = random.Random(seed), timezone.now()
+    criados = criar_usuarios(rng, usuarios)
+    lista = criar_resenhas(rng, criados, resenhas, agora)
+    totais = {'usuarios': len(criados), 'resenhas': len(lista), 'curtidas': criar_curtidas(rng, criados, lista, agora)}
+    totais['comentarios'] = criar_comentarios(rng, criados, lista, comentarios, profundidade, agora)
+    Resenha.objects.filter(id__in=[r.id for r in lista]).recalcular_contadores()
+    totais['mensagens'] = criar_conversas(rng, criados, conversas, mensagens, agora)
+    totais['seguindo'] = criar_seguidores(rng, criados, seguindo)
+    return totais
+
+def limpar(): return User.objects.filter(username__startswith=PREFIXO).delete()[0]
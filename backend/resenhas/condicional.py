@@ -0,0 +1,27 @@
+from hashlib import blake2b
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+def mais_recente(*datas): return max((d for d in datas if d), default=None)
+
+def validar(request, usuario_id, versao, modificado):
+    chave = f"{usuario_id}|{request.get_full_path()}|{versao}"
+    etag = quote_etag(blake2b(chave.encode(), digest_size=16).hexdigest())
+    timestamp = int(modificado.timestamp()) if modificado else None
+    return etag, timestamp, get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+def marcar(resposta, etag, timestamp):
+    resposta['ETag'] = etag
+    if timestamp: resposta['Last-Modified'] = http_date(timestamp)
+    resposta['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(resposta, ['Authorization'])
+    return resposta
+
+class CondicionalMixin:
+    def get_validadores(self, request): return None
+
+    def condicional(self, gerar, request, *args, **kwargs):
+        validadores = self.get_validadores(request)
+        if validadores is None: return gerar(request, *args, **kwargs)
+        etag, timestamp, resposta = validar(request._request, request.user.pk, *validadores)
+        return marcar(resposta or gerar(request, *args, **kwargs), etag, timestamp)
@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.db import connections, router, transaction
+from django.utils import timezone
+from . import notificacoes
+from .models import Comentario, Resenha
+
+RESENHA = {Resenha: 'id', Comentario: 'resenha_id'}
+
+def carimbo(model, conexao):
+    if model is not Resenha: return '', []
+    return ', versao = versao + 1, atualizado_em = %s', [conexao.ops.adapt_datetimefield_value(timezone.now())]
+
+def marcar(model, pk, usuario_id, curtida):
+    campo, tabela = model.curtidas.field, model._meta.db_table
+    ligacao, coluna, coluna_usuario = campo.m2m_db_table(), campo.m2m_column_name(), campo.m2m_reverse_name()
+    retorno, conexao = f"total_curtidas, usuario_id, {RESENHA[model]}", connections[router.db_for_write(model)]
+    with conexao.cursor() as c:
+        if curtida: c.execute(f"INSERT INTO {ligacao} ({coluna}, {coluna_usuario}) SELECT id, %s FROM {tabela} WHERE id = %s ON CONFLICT DO NOTHING", [usuario_id, pk])
+        else: c.execute(f"DELETE FROM {ligacao} WHERE {coluna} = %s AND {coluna_usuario} = %s", [pk, usuario_id])
+        delta = c.rowcount if curtida else -c.rowcount
+        if delta:
+            sql, extra = carimbo(model, conexao)
+            c.execute(f"UPDATE {tabela} SET total_curtidas = CASE WHEN total_curtidas + %s < 0 THEN 0 ELSE total_curtidas + %s END{sql} WHERE id = %s RETURNING {retorno}", [delta, delta, *extra, pk])
+        else: c.execute(f"SELECT {retorno} FROM {tabela} WHERE id = %s", [pk])
+        linha = c.fetchone()
+    return None if linha is None else (bool(delta), *linha)
+
+@transaction.atomic
+def aplicar(usuario, model, pk, curtida):
+    estado = marcar(model, pk, usuario.id, curtida)
+    if estado is None: return None
+    alterada, total, autor_id, resenha_id = estado
+    if alterada:
+        if model is Comentario: Resenha.objects.filter(pk=resenha_id).tocar()
+        (notificacoes.enfileirar if curtida else notificacoes.retirar)(usuario, User(pk=autor_id), 'curtida', Resenha(pk=resenha_id))
+    return {'curtido': curtida, 'total_curtidas': total, 'alterado': alterada}
@@ -0,0 +1,114 @@
+import json
+from datetime import datetime
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from .busca import get_backend
+from .models import Comentario, Importacao, ImportacaoItem, Livro, Resenha
+
+CAMPOS_RESENHA = ['id', 'usuario__username', 'titulo_livro', 'autor_livro', 'url_imagem', 'texto_resenha', 'nota', 'data_criacao']
+CAMPOS_COMENTARIO = ['id', 'resenha_id', 'parent_id', 'usuario__username', 'texto', 'data_criacao']
+
+class Codificador(DjangoJSONEncoder):
+    def default(self, o): return o.isoformat() if isinstance(o, datetime) else super().default(o)
+
+def _percorrer(tipo, queryset, campos):
+    nomes = [campo.split('__')[0].removesuffix('_id') for campo in campos]
+    for linha in queryset.order_by('pk').values_list(*campos).iterator(chunk_size=settings.EXPORTACAO_CHUNK):
+        yield {'tipo': tipo, **dict(zip(nomes, linha))}
+
+def registros():
+    yield from _percorrer('resenha', Resenha.objects.all(), CAMPOS_RESENHA)
+    yield from _percorrer('comentario', Comentario.objects.all(), CAMPOS_COMENTARIO)
+    yield from _percorrer('curtida', Resenha.curtidas.through.objects.all(), ['resenha_id', 'user__username'])
+    yield from _percorrer('curtida_comentario', Comentario.curtidas.through.objects.all(), ['comentario_id', 'user__username'])
+
+def ndjson(): return (json.dumps(r, cls=Codificador, ensure_ascii=False) + '\n' for r in registros())
+
+class Importador:
+    def __init__(self, nome, lote=None):
+        self.importacao, _ = Importacao.objects.get_or_create(nome=nome)
+        self.lote, self.erros, self.totais = lote or settings.IMPORTACAO_LOTE, [], {}
+
+    def importar(self, arquivo):
+        pendentes, tipo = [], None
+        for n, linha in enumerate(arquivo, 1):
+            if n <= self.importacao.linha or not linha.strip(): continue
+            try: registro = json.loads(linha)
+            except ValueError: self.erros.append((n, 'JSON inválido.')); continue
+            if not hasattr(self, f"importar_{registro.get('tipo')}"): self.erros.append((n, 'Tipo desconhecido.')); continue
+            if pendentes and (registro['tipo'] != tipo or len(pendentes) >= self.lote): self.gravar(tipo, pendentes); pendentes = []
+            tipo = registro['tipo']; pendentes.append((n, registro))
+        if pendentes: self.gravar(tipo, pendentes)
+        return self.totais
+
+    def gravar(self, tipo, pendentes):
+        with transaction.atomic():
+            total = getattr(self, f'importar_{tipo}')(pendentes)
+            self.importacao.linha = pendentes[-1][0]
+            self.importacao.save(update_fields=['linha', 'atualizado_em'])
+        self.totais[tipo] = self.totais.get(tipo, 0) + total
+
+    def validar(self, n, obj, exclude):
+        try: obj.clean_fields(exclude=exclude)
+        except ValidationError as e: self.erros.append((n, e.message_dict)); return False
+        return True
+
+    def mapa(self, tipo, origens):
+        return dict(self.importacao.itens.filter(tipo=tipo, origem__in=set(origens)).values_list('origem', 'destino'))
+
+    def registrar(self, tipo, pares):
+        ImportacaoItem.objects.bulk_create([ImportacaoItem(importacao=self.importacao, tipo=tipo, origem=origem, destino=obj.pk) for origem, obj in pares])
+
+    def usuarios(self, nomes):
+        nomes = set(nomes)
+        existentes = {u.username: u for u in User.objects.filter(username__in=nomes)}
+        User.objects.bulk_create([User(username=nome, password=make_password(None)) for nome in nomes - existentes.keys()], ignore_conflicts=True)
+        return existentes | {u.username: u for u in User.objects.filter(username__in=nomes - existentes.keys())}
+
+    def importar_resenha(self, pendentes):
+        ja, usuarios, novas = self.mapa('resenha', (r['id'] for _, r in pendentes)), self.usuarios(r['usuario'] for _, r in pendentes), []
+        for n, r in pendentes:
+            if r['id'] in ja: continue
+            obj = Resenha(usuario=usuarios[r['usuario']], titulo_livro=r['titulo_livro'], autor_livro=r['autor_livro'], url_imagem=r['url_imagem'], texto_resenha=r['texto_resenha'], nota=r['nota'])
+            if self.validar(n, obj, ['usuario', 'livro', 'data_criacao']): novas.append((r, obj))
+        objs = Resenha.objects.bulk_create([obj for _, obj in novas])
+        for r, obj in novas: obj.data_criacao = parse_datetime(r['data_criacao'])
+        Resenha.objects.bulk_update(objs, ['data_criacao'])
+        if objs: Livro.objects.catalogar_resenhas(objs); get_backend().indexar(objs)
+        self.registrar('resenha', [(r['id'], obj) for r, obj in novas])
+        return len(objs)
+
+    def importar_comentario(self, pendentes):
+        ja = self.mapa('comentario', (r['id'] for _, r in pendentes))
+        resenhas = self.mapa('resenha', (r['resenha'] for _, r in pendentes))
+        pais = self.mapa('comentario', (r['parent'] for _, r in pendentes if r['parent']))
+        usuarios, novos, conhecidos = self.usuarios(r['usuario'] for _, r in pendentes), [], set(pais)
+        for n, r in pendentes:
+            if r['id'] in ja: continue
+            if r['resenha'] not in resenhas or (r['parent'] and r['parent'] not in conhecidos): self.erros.append((n, 'Resenha ou comentário pai não importado.')); continue
+            obj = Comentario(usuario=usuarios[r['usuario']], resenha_id=resenhas[r['resenha']], texto=r['texto'])
+            if self.validar(n, obj, ['usuario', 'resenha', 'parent', 'data_criacao']): novos.append((r, obj)); conhecidos.add(r['id'])
+        objs = Comentario.objects.bulk_create([obj for _, obj in novos])
+        pais |= {r['id']: obj.pk for r, obj in novos}
+        for r, obj in novos: obj.data_criacao, obj.parent_id = parse_datetime(r['data_criacao']), pais.get(r['parent'])
+        Comentario.objects.bulk_update(objs, ['data_criacao', 'parent'])
+        Resenha.objects.filter(id__in={obj.resenha_id for obj in objs}).recalcular_contadores()
+        self.registrar('comentario', [(r['id'], obj) for r, obj in novos])
+        return len(objs)
+
+    def _curtidas(self, pendentes, model, tipo):
+        alvos, usuarios = self.mapa(tipo, (r[tipo] for _, r in pendentes)), self.usuarios(r['user'] for _, r in pendentes)
+        through = model.curtidas.through
+        linhas = [through(**{f'{tipo}_id': alvos[r[tipo]], 'user_id': usuarios[r['user']].id}) for _, r in pendentes if r[tipo] in alvos]
+        through.objects.bulk_create(linhas, ignore_conflicts=True)
+        model.objects.filter(id__in={alvos[r[tipo]] for _, r in pendentes if r[tipo] in alvos}).recalcular_contadores()
+        self.erros.extend((n, 'Alvo da curtida não importado.') for n, r in pendentes if r[tipo] not in alvos)
+        return len(linhas)
+
+    def importar_curtida(self, pendentes): return self._curtidas(pendentes, Resenha, 'resenha')
+    def importar_curtida_comentario(self, pendentes): return self._curtidas(pendentes, Comentario, 'comentario')
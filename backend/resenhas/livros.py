@@ -0,0 +1,80 @@
+import json
+import threading
+from datetime import timedelta
+from functools import lru_cache
+from urllib.parse import urlencode
+from urllib.request import urlopen
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import APIException
+from .cache import CacheLRU
+from .models import ConsultaLivro
+
+class LivrosIndisponiveis(APIException):
+    status_code = 503
+    default_detail = 'Busca de livros indisponível no momento.'
+
+def normalizar(termo): return ' '.join(termo.lower().split())[:255]
+
+class GoogleBooksClient:
+    url = 'https://www.googleapis.com/books/v1/volumes'
+    campos = 'items(id,volumeInfo(title,authors,imageLinks(smallThumbnail,thumbnail)))'
+
+    def volume(self, item):
+        info = item.get('volumeInfo', {}); capas = info.get('imageLinks', {})
+        return {'id': item['id'], 'titulo': info.get('title', ''), 'autores': info.get('authors', []),
+                'capa': capas.get('thumbnail', capas.get('smallThumbnail', '')), 'miniatura': capas.get('smallThumbnail', '')}
+
+    def buscar(self, termo):
+        params = {'q': termo, 'maxResults': settings.LIVROS_MAX_RESULTADOS, 'fields': self.campos}
+        if settings.GOOGLE_BOOKS_API_KEY: params['key'] = settings.GOOGLE_BOOKS_API_KEY
+        with urlopen(f"{self.url}?{urlencode(params)}", timeout=settings.LIVROS_TIMEOUT) as resp:
+            return [self.volume(item) for item in json.load(resp).get('items', [])]
+
+class Chamada:
+    def __init__(self): self.evento, self.resultado, self.erro = threading.Event(), None, None
+
+class Coalescedor:
+    def __init__(self): self._lock, self._chamadas = threading.Lock(), {}
+
+    def executar(self, chave, funcao):
+        with self._lock:
+            chamada, lider = self._chamadas.get(chave), False
+            if chamada is None: chamada, lider = self._chamadas.setdefault(chave, Chamada()), True
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro: raise chamada.erro
+            return chamada.resultado
+        try: chamada.resultado = funcao()
+        except Exception as e: chamada.erro = e; raise
+        finally:
+            with self._lock: self._chamadas.pop(chave, None)
+            chamada.evento.set()
+        return chamada.resultado
+
+@lru_cache(maxsize=None)
+def get_cliente(): return import_string(settings.LIVROS_CLIENTE)()
+
+@lru_cache(maxsize=None)
+def get_memoria(): return CacheLRU(settings.LIVROS_CACHE_MAXIMO, settings.LIVROS_CACHE_TTL)
+
+coalescedor = Coalescedor()
+
+def carregar(termo):
+    salva = ConsultaLivro.objects.filter(termo=termo).first()
+    if salva and salva.atualizado_em > timezone.now() - timedelta(seconds=settings.LIVROS_CACHE_PERSISTENTE_TTL): return salva.resultados
+    try: resultados = get_cliente().buscar(termo)
+    except Exception:
+        if salva: return salva.resultados
+        raise LivrosIndisponiveis()
+    ConsultaLivro.objects.update_or_create(termo=termo, defaults={'resultados': resultados, 'atualizado_em': timezone.now()})
+    return resultados
+
+def buscar(termo):
+    termo = normalizar(termo)
+    resultados = get_memoria().get(termo)
+    if resultados is None:
+        resultados = coalescedor.executar(termo, lambda: carregar(termo))
+        get_memoria().set(termo, resultados)
+    return resultados
@@ -0,0 +1,64 @@
+import json
+import tempfile
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from resenhas import benchmark, carga
+
+class Command(BaseCommand):
+    help = "Mede latência (p50/p95/p99), consultas e bytes dos endpoints mais usados e compara com a linha de base salva."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=50)
+        parser.add_argument('--endpoint', action='append', dest='endpoints', choices=list(benchmark.ENDPOINTS))
+        parser.add_argument('--baseline', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'))
+        parser.add_argument('--salvar', action='store_true', help="Grava o resultado como nova linha de base.")
+        parser.add_argument('--tolerancia', type=float, default=0.25, help="Piora relativa aceita em latência e bytes.")
+        parser.add_argument('--banco-atual', action='store_true', help="Usa o banco configurado em vez de um banco de teste semeado.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--usuarios', type=int, default=200)
+        parser.add_argument('--resenhas', type=int, default=1000)
+        parser.add_argument('--comentarios', type=int, default=5000)
+        parser.add_argument('--concorrencia', action='store_true', help="Compara vazão WSGI (threads) e ASGI (event loop) com clientes simultâneos.")
+        parser.add_argument('--clientes', type=int, default=32, help="Conexões simultâneas no modo --concorrencia.")
+        parser.add_argument('--threads', type=int, default=4, help="Threads do worker WSGI no modo --concorrencia; o ASGI usa um único event loop.")
+        parser.add_argument('--requisicoes', type=int, default=320, help="Total de requisições por endpoint e servidor no modo --concorrencia.")
+
+    def executar(self, options):
+        if not options['concorrencia']: return benchmark.executar(options['repeticoes'], options['endpoints'])
+        return benchmark.concorrencia(options['clientes'], options['threads'], options['requisicoes'], options['endpoints'])
+
+    def medir(self, options):
+        if options['banco_atual']: return self.executar(options)
+        nome = connection.settings_dict['NAME']
+        if options['concorrencia'] and connection.vendor == 'sqlite': connection.settings_dict['TEST']['NAME'] = str(Path(tempfile.gettempdir()) / 'readlist_benchmark.sqlite3')
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            carga.semear(seed=options['seed'], usuarios=options['usuarios'], resenhas=options['resenhas'], comentarios=options['comentarios'])
+            return self.executar(options)
+        finally:
+            connection.creation.destroy_test_db(nome, verbosity=0)
+
+    def handle(self, *args, **options):
+        resultado = self.medir(options)
+        if options['concorrencia']: return self.mostrar_concorrencia(resultado, options)
+        self.stdout.write(f"{'endpoint':<24}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'consultas':>11}{'bytes':>10}")
+        for nome, m in resultado.items():
+            self.stdout.write(f"{nome:<24}{m['p50_ms']:>9.2f}{m['p95_ms']:>9.2f}{m['p99_ms']:>9.2f}{m['consultas']:>11}{m['bytes']:>10}")
+        caminho = Path(options['baseline'])
+        if options['salvar']:
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            caminho.write_text(json.dumps(resultado, indent=2, sort_keys=True) + '\n')
+            return self.stdout.write(self.style.SUCCESS(f"Linha de base gravada em {caminho}."))
+        if not caminho.exists(): return self.stdout.write(self.style.WARNING(f"Sem linha de base em {caminho}; use --salvar."))
+        regressoes = benchmark.comparar(resultado, json.loads(caminho.read_text()), options['tolerancia'])
+        if regressoes: raise CommandError("Regressões em relação à linha de base:\n" + '\n'.join(regressoes))
+        self.stdout.write(self.style.SUCCESS("Sem regressões em relação à linha de base."))
+
+    def mostrar_concorrencia(self, resultado, options):
+        self.stdout.write(f"{options['clientes']} clientes, {options['requisicoes']} requisições; WSGI com {options['threads']} threads, ASGI com 1 event loop")
+        self.stdout.write(f"{'endpoint':<16}{'servidor':<10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'erros':>7}")
+        for nome, servidores in resultado.items():
+            for servidor, m in servidores.items():
+                self.stdout.write(f"{nome:<16}{servidor:<10}{m['req_s']:>9.1f}{m['p50_ms']:>9.2f}{m['p95_ms']:>9.2f}{m['p99_ms']:>9.2f}{m['erros']:>7}")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from resenhas.models import Livro, Resenha
+
+class Command(BaseCommand):
+    help = "Cataloga em lotes as resenhas sem livro, deduplicando títulos e autores digitados livremente."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        ultimo, total = 0, 0
+        while True:
+            resenhas = list(Resenha.objects.filter(id__gt=ultimo, livro=None).order_by('id').only('id', 'titulo_livro', 'autor_livro', 'url_imagem')[:options['lote']])
+            if not resenhas: break
+            with transaction.atomic(): Livro.objects.catalogar_resenhas(resenhas)
+            ultimo, total = resenhas[-1].id, total + len(resenhas)
+        self.stdout.write(self.style.SUCCESS(f"{total} resenhas catalogadas em {Livro.objects.count()} livros."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from resenhas.exportacao import ndjson
+
+class Command(BaseCommand):
+    help = "Exporta resenhas, comentários e curtidas como NDJSON, em memória constante."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--saida', default=None, help="Arquivo de destino (padrão: saída padrão).")
+
+    def handle(self, *args, **options):
+        if not options['saida']:
+            for linha in ndjson(): self.stdout.write(linha, ending='')
+            return
+        with open(options['saida'], 'w', encoding='utf-8') as f: f.writelines(ndjson())
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from resenhas.avatares import gerar_miniaturas
+from resenhas.models import Perfil
+
+class Command(BaseCommand):
+    help = "Gera as miniaturas de avatar que ainda não existem (ou todas, com --todas)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true')
+
+    def handle(self, *args, **options):
+        qs = Perfil.objects.exclude(avatar='').exclude(avatar__isnull=True)
+        if not options['todas']: qs = qs.filter(miniaturas={})
+        total = 0
+        for perfil_id in qs.order_by('id').values_list('id', flat=True).iterator():
+            try:
+                if gerar_miniaturas(perfil_id): total += 1
+            except Exception as e:
+                self.stderr.write(f"Perfil {perfil_id}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"{total} perfis com miniaturas geradas."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from resenhas.exportacao import Importador
+
+class Command(BaseCommand):
+    help = "Importa um arquivo NDJSON gerado por exportar_resenhas em lotes, retomando do último lote gravado."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo')
+        parser.add_argument('--nome', default=None, help="Identificador do checkpoint (padrão: nome do arquivo).")
+        parser.add_argument('--lote', type=int, default=None)
+
+    def handle(self, *args, **options):
+        importador = Importador(options['nome'] or options['arquivo'], options['lote'])
+        if importador.importacao.linha: self.stdout.write(f"Retomando após a linha {importador.importacao.linha}.")
+        with open(options['arquivo'], encoding='utf-8') as f: totais = importador.importar(f)
+        for n, erro in importador.erros: self.stderr.write(f"Linha {n}: {erro}")
+        resumo = ', '.join(f"{total} {tipo}" for tipo, total in totais.items()) or 'nada novo'
+        self.stdout.write(self.style.SUCCESS(f"Importação concluída: {resumo}; {len(importador.erros)} linhas rejeitadas."))
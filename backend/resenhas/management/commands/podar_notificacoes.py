@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from resenhas.notificacoes import podar
+
+class Command(BaseCommand):
+    help = "Remove em lotes as notificações lidas mais antigas que a retenção; com --arquivo, grava-as antes em NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.NOTIFICACOES_RETENCAO_DIAS)
+        parser.add_argument('--lote', type=int, default=None)
+        parser.add_argument('--arquivo', default=None, help="Arquivo NDJSON onde as notificações removidas são acrescentadas.")
+
+    def handle(self, *args, **options):
+        if options['arquivo']:
+            with open(options['arquivo'], 'a', encoding='utf-8') as arquivo: removidas = podar(options['dias'], options['lote'], arquivo)
+        else: removidas = podar(options['dias'], options['lote'])
+        destino = f" e arquivadas em {options['arquivo']}" if options['arquivo'] else ""
+        self.stdout.write(self.style.SUCCESS(f"{removidas} notificações lidas com mais de {options['dias']} dias removidas{destino}."))
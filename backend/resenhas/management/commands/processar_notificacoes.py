@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from resenhas.notificacoes import atraso_fila, processar_lote
+
+class Command(BaseCommand):
+    help = "Drena a fila de eventos de notificação em lotes, criando as notificações."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=None)
+        parser.add_argument('--intervalo', type=float, default=1.0, help="Segundos de espera quando a fila está vazia.")
+        parser.add_argument('--uma-vez', action='store_true', help="Drena a fila atual e encerra.")
+
+    def handle(self, *args, **options):
+        while True:
+            entregues = processar_lote(options['lote'])
+            if entregues:
+                pendentes, atraso = atraso_fila()
+                self.stdout.write(f"{entregues} notificações entregues; {pendentes} pendentes, atraso {atraso:.1f}s.")
+                continue
+            if options['uma_vez']:
+                pendentes, atraso = atraso_fila()
+                self.stdout.write(self.style.SUCCESS(f"Fila drenada; {pendentes} pendentes, atraso {atraso:.1f}s."))
+                return
+            time.sleep(options['intervalo'])
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from resenhas.models import Resenha, Comentario, Perfil
+
+class Command(BaseCommand):
+    help = "Recalcula em lotes os contadores de curtidas, comentários e notificações não lidas armazenados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000)
+
+    def recalcular(self, model, lote):
+        ultimo, total = 0, 0
+        while True:
+            ids = list(model.objects.filter(id__gt=ultimo).order_by('id').values_list('id', flat=True)[:lote])
+            if not ids: return total
+            with transaction.atomic():
+                model.objects.filter(id__in=ids).recalcular_contadores()
+            ultimo, total = ids[-1], total + len(ids)
+
+    def handle(self, *args, **options):
+        for model in (Resenha, Comentario, Perfil):
+            total = self.recalcular(model, options['lote'])
+            self.stdout.write(self.style.SUCCESS(f"{model._meta.verbose_name_plural}: {total} registros recalculados."))
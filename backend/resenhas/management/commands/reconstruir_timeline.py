@@ -0,0 +1,16 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from resenhas import timeline
+
+class Command(BaseCommand):
+    help = "Recria a timeline materializada a partir das relações de seguidores (após importações ou mudança do limite de popularidade)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuarios', nargs='*', help="Nomes de usuário; sem argumentos, reconstrói todas as timelines.")
+
+    def handle(self, *args, **options):
+        usuarios = User.objects.order_by('id')
+        if options['usuarios']: usuarios = usuarios.filter(username__in=options['usuarios'])
+        ids = list(usuarios.values_list('id', flat=True))
+        total = sum(timeline.reconstruir(usuario_id) for usuario_id in ids)
+        self.stdout.write(self.style.SUCCESS(f"{len(ids)} timelines reconstruídas com {total} entradas."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from resenhas.busca import get_backend
+from resenhas.models import Resenha
+
+class Command(BaseCommand):
+    help = "Reconstrói o índice de busca textual das resenhas em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500)
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.instalar()
+        total = backend.reconstruir(Resenha.objects.all(), options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"{total} resenhas indexadas com {type(backend).__name__}."))
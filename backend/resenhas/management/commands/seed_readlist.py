@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from resenhas import carga
+
+class Command(BaseCommand):
+    help = "Gera um conjunto de dados realista e determinístico (usuários, curtidas concentradas, fios longos de comentários, conversas e seguidores)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--usuarios', type=int, default=200)
+        parser.add_argument('--resenhas', type=int, default=1000)
+        parser.add_argument('--comentarios', type=int, default=5000)
+        parser.add_argument('--profundidade', type=int, default=12)
+        parser.add_argument('--conversas', type=int, default=20)
+        parser.add_argument('--mensagens', type=int, default=300, help="Máximo de mensagens por conversa.")
+        parser.add_argument('--seguindo', type=int, default=20, help="Perfis sorteados para cada usuário seguir.")
+        parser.add_argument('--limpar', action='store_true', help=f"Remove antes os usuários gerados (prefixo '{carga.PREFIXO}').")
+
+    def handle(self, *args, **options):
+        if options['limpar']: self.stdout.write(f"{carga.limpar()} registros removidos.")
+        totais = carga.semear(**{campo: options[campo] for campo in ('seed', 'usuarios', 'resenhas', 'comentarios', 'profundidade', 'conversas', 'mensagens', 'seguindo')})
+        self.stdout.write(self.style.SUCCESS(', '.join(f"{n} {nome}" for nome, n in totais.items()) + " gerados."))
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from config.roteador import sincronizar_sqlite
+
+class Command(BaseCommand):
+    help = "Copia o banco principal SQLite para os arquivos de réplica (simula a replicação em desenvolvimento)."
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS: raise CommandError("Nenhuma réplica configurada (DB_REPLICAS).")
+        for alias in settings.DATABASE_REPLICAS:
+            if connections[alias].vendor != 'sqlite': raise CommandError(f"{alias} não é SQLite; a replicação é feita pelo servidor de banco.")
+            sincronizar_sqlite('default', alias)
+            self.stdout.write(self.style.SUCCESS(f"{alias} sincronizada."))
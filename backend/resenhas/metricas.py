@@ -0,0 +1,143 @@
+import logging
+import threading
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+logger = logging.getLogger(__name__)
+atual = ContextVar('medicao', default=None)
+
+SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONSULTAS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+HISTOGRAMAS = {
+    'readlist_requisicao_segundos': ('Duração total da requisição.', SEGUNDOS),
+    'readlist_db_segundos': ('Tempo gasto em SQL por requisição.', SEGUNDOS),
+    'readlist_serializacao_segundos': ('Tempo gasto em serializers DRF por requisição.', SEGUNDOS),
+    'readlist_renderizacao_segundos': ('Tempo gasto renderizando a resposta DRF.', SEGUNDOS),
+    'readlist_autenticacao_segundos': ('Tempo gasto na autenticação JWT.', SEGUNDOS),
+    'readlist_consultas': ('Consultas SQL por requisição.', CONSULTAS),
+    'readlist_resposta_bytes': ('Tamanho do corpo da resposta.', BYTES),
+}
+
+class Medicao:
+    def __init__(self):
+        self.consultas, self.tempo_db, self.sql, self.tempos, self._ativas = 0, 0.0, Counter(), Counter(), Counter()
+
+    def registrar_sql(self, execute, sql, params, many, context):
+        inicio = perf_counter()
+        try: return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1; self.tempo_db += perf_counter() - inicio; self.sql[sql] += 1
+
+    def server_timing(self, total, tamanho):
+        partes = [f'db;dur={self.tempo_db * 1000:.1f};desc="{self.consultas} consultas"']
+        partes += [f'{etapa};dur={segundos * 1000:.1f}' for etapa, segundos in self.tempos.items()]
+        if tamanho is not None: partes.append(f'resposta;desc="{tamanho} bytes"')
+        return ', '.join(partes + [f'total;dur={total * 1000:.1f}'])
+
+@contextmanager
+def medir(etapa):
+    medicao = atual.get()
+    if medicao is None or medicao._ativas[etapa]:
+        yield; return
+    medicao._ativas[etapa] += 1; inicio = perf_counter()
+    try: yield
+    finally:
+        medicao.tempos[etapa] += perf_counter() - inicio; medicao._ativas[etapa] -= 1
+
+class Histograma:
+    def __init__(self, limites): self.limites, self.contagens, self.soma, self.total = limites, [0] * len(limites), 0.0, 0
+
+    def observar(self, valor):
+        posicao = bisect_left(self.limites, valor)
+        if posicao < len(self.limites): self.contagens[posicao] += 1
+        self.soma += valor; self.total += 1
+
+class Registro:
+    def __init__(self): self._lock, self._series = threading.Lock(), {}
+
+    def observar(self, rotulos, valores):
+        with self._lock:
+            for nome, valor in valores.items():
+                self._series.setdefault((nome, rotulos), Histograma(HISTOGRAMAS[nome][1])).observar(valor)
+
+    def exportar(self):
+        with self._lock: series = sorted(self._series.items())
+        linhas, anterior = [], None
+        for (nome, rotulos), h in series:
+            if nome != anterior:
+                linhas += [f"# HELP {nome} {HISTOGRAMAS[nome][0]}", f"# TYPE {nome} histogram"]; anterior = nome
+            base = ','.join(f'{chave}="{valor}"' for chave, valor in rotulos)
+            acumulado = 0
+            for limite, n in zip(h.limites, h.contagens):
+                acumulado += n; linhas.append(f'{nome}_bucket{{{base},le="{limite}"}} {acumulado}')
+            linhas += [f'{nome}_bucket{{{base},le="+Inf"}} {h.total}', f'{nome}_sum{{{base}}} {h.soma:g}', f'{nome}_count{{{base}}} {h.total}']
+        return '\n'.join(linhas) + '\n'
+
+registro = Registro()
+
+def instrumentar(medicao):
+    pilha = ExitStack()
+    for conexao in connections.all(): pilha.enter_context(conexao.execute_wrapper(medicao.registrar_sql))
+    return pilha
+
+class MetricasMiddleware:
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response, self.assincrono = get_response, iscoroutinefunction(get_response)
+        if self.assincrono: markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono: return self.__acall__(request)
+        medicao = Medicao(); token = atual.set(medicao); inicio = perf_counter()
+        try:
+            with instrumentar(medicao): resposta = self.get_response(request)
+        finally: atual.reset(token)
+        return self.registrar(request, resposta, medicao, perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        medicao = Medicao(); token = atual.set(medicao); inicio = perf_counter()
+        pilha = await sync_to_async(instrumentar)(medicao)
+        try: resposta = await self.get_response(request)
+        finally:
+            await sync_to_async(pilha.close)(); atual.reset(token)
+        return self.registrar(request, resposta, medicao, perf_counter() - inicio)
+
+    def registrar(self, request, resposta, medicao, total):
+        tamanho = None if resposta.streaming else len(resposta.content)
+        resposta['Server-Timing'] = medicao.server_timing(total, tamanho)
+        rota = request.resolver_match.view_name if request.resolver_match else 'nao_encontrada'
+        valores = {'readlist_requisicao_segundos': total, 'readlist_db_segundos': medicao.tempo_db, 'readlist_consultas': medicao.consultas}
+        valores.update({f'readlist_{etapa}_segundos': segundos for etapa, segundos in medicao.tempos.items()})
+        if tamanho is not None: valores['readlist_resposta_bytes'] = tamanho
+        registro.observar((('view', rota), ('metodo', request.method), ('status', str(resposta.status_code)[0] + 'xx')), valores)
+        if medicao.consultas > settings.METRICAS_ORCAMENTO_CONSULTAS:
+            repetidas = '\n'.join(f"  {n}x {sql}" for sql, n in medicao.sql.most_common(settings.METRICAS_SQL_LOG))
+            logger.warning("%s %s executou %d consultas (orçamento %d):\n%s", request.method, request.get_full_path(), medicao.consultas, settings.METRICAS_ORCAMENTO_CONSULTAS, repetidas)
+        return resposta
+
+class JWTAuthenticationMedida(JWTAuthentication):
+    def authenticate(self, request):
+        with medir('autenticacao'): return super().authenticate(request)
+
+class JSONRendererMedido(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with medir('renderizacao'): return super().render(data, accepted_media_type, renderer_context)
+
+class SerializacaoMedida:
+    def to_representation(self, instance):
+        with medir('serializacao'): return super().to_representation(instance)
+
+def exportar_metricas(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICAS_IPS: return HttpResponseForbidden()
+    return HttpResponse(registro.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,57 @@
+import mimetypes
+import re
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+FAIXA = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def faixa_pedida(cabecalho, tamanho):
+    m = FAIXA.match(cabecalho.strip())
+    if not m or not (m[1] or m[2]): return None
+    if not m[1]: inicio, fim = max(tamanho - int(m[2]), 0), tamanho - 1
+    else: inicio, fim = int(m[1]), min(int(m[2]), tamanho - 1) if m[2] else tamanho - 1
+    return (inicio, fim) if inicio <= fim and inicio < tamanho else False
+
+def ler(caminho, inicio, total, bloco=64 * 1024):
+    with open(caminho, 'rb') as f:
+        f.seek(inicio)
+        while total > 0:
+            dados = f.read(min(bloco, total))
+            if not dados: return
+            total -= len(dados); yield dados
+
+def cache_control(nome):
+    if nome.startswith(f"{settings.AVATAR_MINIATURAS_DIR}/"): return f"public, max-age={settings.MIDIA_MAX_AGE_IMUTAVEL}, immutable"
+    return f"public, max-age={settings.MIDIA_MAX_AGE}"
+
+def servir(request, caminho):
+    try: arquivo = Path(safe_join(settings.MEDIA_ROOT, caminho))
+    except SuspiciousFileOperation: raise Http404
+    if not arquivo.is_file(): raise Http404
+    stat = arquivo.stat()
+    etag, modificado = quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}"), int(stat.st_mtime)
+    resposta = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if resposta is None:
+        tipo = mimetypes.guess_type(arquivo.name)[0] or 'application/octet-stream'
+        faixa = faixa_pedida(request.headers['Range'], stat.st_size) if 'Range' in request.headers and request.headers.get('If-Range', etag) == etag else None
+        if faixa is False:
+            resposta = HttpResponse(status=416)
+            resposta['Content-Range'] = f"bytes */{stat.st_size}"
+        elif faixa:
+            inicio, fim = faixa
+            resposta = StreamingHttpResponse(ler(arquivo, inicio, fim - inicio + 1), status=206, content_type=tipo)
+            resposta['Content-Range'] = f"bytes {inicio}-{fim}/{stat.st_size}"
+            resposta['Content-Length'] = fim - inicio + 1
+        else:
+            resposta = StreamingHttpResponse(ler(arquivo, 0, stat.st_size), content_type=tipo)
+            resposta['Content-Length'] = stat.st_size
+    resposta['Accept-Ranges'] = 'bytes'
+    resposta['ETag'] = etag
+    resposta['Last-Modified'] = http_date(modificado)
+    resposta['Cache-Control'] = cache_control(caminho)
+    return resposta
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0004_remove_perfil_avatar_url_perfil_avatar'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['resenha', '-data_criacao', '-id'], name='comentario_resenha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(fields=['destinatario', '-data', '-id'], name='notificacao_dest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resenha',
+            index=models.Index(fields=['-data_criacao', '-id'], name='resenha_feed_idx'),
+        ),
+    ]
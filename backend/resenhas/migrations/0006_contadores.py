@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:21
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def contagem(model, campo):
+    linhas = model.objects.filter(**{campo: models.OuterRef('pk')}).order_by().values(campo).annotate(n=models.Count('*')).values('n')
+    return Coalesce(models.Subquery(linhas), 0)
+
+
+def preencher_contadores(apps, schema_editor):
+    Resenha = apps.get_model('resenhas', 'Resenha')
+    Comentario = apps.get_model('resenhas', 'Comentario')
+    Resenha.objects.update(
+        total_curtidas=contagem(Resenha.curtidas.through, 'resenha_id'),
+        total_comentarios=contagem(Comentario, 'resenha'),
+    )
+    Comentario.objects.update(total_curtidas=contagem(Comentario.curtidas.through, 'comentario_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comentario',
+            name='total_curtidas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='resenha',
+            name='total_comentarios',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='resenha',
+            name='total_curtidas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
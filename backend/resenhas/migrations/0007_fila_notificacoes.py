@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0006_contadores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificacao',
+            name='data',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='EventoNotificacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('curtida', 'Curtida'), ('comentario', 'Comentário'), ('mensagem', 'Mensagem')], max_length=20)),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('erro', models.TextField(blank=True, default='')),
+                ('destinatario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('remetente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('resenha', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='resenhas.resenha')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tentativas', 'id'], name='evento_pendente_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def preencher_nao_lidas(apps, schema_editor):
+    Perfil = apps.get_model('resenhas', 'Perfil')
+    Notificacao = apps.get_model('resenhas', 'Notificacao')
+    nao_lidas = Notificacao.objects.filter(destinatario=models.OuterRef('usuario'), lida=False).order_by().values('destinatario').annotate(n=models.Count('*')).values('n')
+    Perfil.objects.update(notificacoes_nao_lidas=Coalesce(models.Subquery(nao_lidas), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0007_fila_notificacoes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfil',
+            name='notificacoes_nao_lidas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(fields=['destinatario', 'lida'], name='notificacao_nao_lida_idx'),
+        ),
+        migrations.RunPython(preencher_nao_lidas, migrations.RunPython.noop),
+    ]
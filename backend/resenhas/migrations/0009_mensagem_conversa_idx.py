@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0008_notificacoes_nao_lidas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mensagem',
+            index=models.Index(fields=['remetente', 'destinatario', 'id'], name='mensagem_conversa_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def preencher_conversas(apps, schema_editor):
+    Mensagem = apps.get_model('resenhas', 'Mensagem')
+    Conversa = apps.get_model('resenhas', 'Conversa')
+    ultimas = {}
+    for msg in Mensagem.objects.order_by('id').iterator():
+        ultimas[(msg.remetente_id, msg.destinatario_id)] = msg
+        ultimas[(msg.destinatario_id, msg.remetente_id)] = msg
+    Conversa.objects.bulk_create([
+        Conversa(usuario_id=dono, correspondente_id=outro, ultima_mensagem=msg, atualizado_em=msg.data)
+        for (dono, outro), msg in ultimas.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0009_mensagem_conversa_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('atualizado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('nao_lidas', models.PositiveIntegerField(default=0)),
+                ('correspondente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('ultima_mensagem', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='resenhas.mensagem')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['usuario', '-atualizado_em', '-id'], name='conversa_inbox_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'correspondente'), name='conversa_unica')],
+            },
+        ),
+        migrations.RunPython(preencher_conversas, migrations.RunPython.noop),
+    ]
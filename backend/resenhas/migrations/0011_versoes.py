@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0010_conversa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfil',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='resenha',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='resenha',
+            name='versao',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0011_versoes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfil',
+            name='miniaturas',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0012_miniaturas_avatar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultaLivro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termo', models.CharField(max_length=255, unique=True)),
+                ('resultados', models.JSONField(default=list)),
+                ('atualizado_em', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
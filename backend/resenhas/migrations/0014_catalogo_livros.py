@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0013_consulta_livro'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Autor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=1000)),
+                ('chave', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Livro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('titulo', models.CharField(max_length=1000)),
+                ('url_imagem', models.URLField(blank=True, null=True)),
+                ('chave', models.CharField(max_length=255, unique=True)),
+                ('total_resenhas', models.PositiveIntegerField(default=0)),
+                ('soma_notas', models.PositiveIntegerField(default=0)),
+                ('notas_1', models.PositiveIntegerField(default=0)),
+                ('notas_2', models.PositiveIntegerField(default=0)),
+                ('notas_3', models.PositiveIntegerField(default=0)),
+                ('notas_4', models.PositiveIntegerField(default=0)),
+                ('notas_5', models.PositiveIntegerField(default=0)),
+                ('autor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='livros', to='resenhas.autor')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='resenha',
+            name='livro',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resenhas', to='resenhas.livro'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0014_catalogo_livros'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Importacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=255, unique=True)),
+                ('linha', models.PositiveIntegerField(default=0)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImportacaoItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=20)),
+                ('origem', models.BigIntegerField()),
+                ('destino', models.BigIntegerField()),
+                ('importacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='resenhas.importacao')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('importacao', 'tipo', 'origem'), name='importacao_item_unico')],
+            },
+        ),
+    ]
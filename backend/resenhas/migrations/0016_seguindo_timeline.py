@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0015_importacoes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfil',
+            name='total_seguidores',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='perfil',
+            name='total_seguindo',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='EntradaTimeline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_criacao', models.DateTimeField()),
+                ('autor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('resenha', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='resenhas.resenha')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['usuario', '-data_criacao', '-resenha'], name='timeline_usuario_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'resenha'), name='timeline_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Seguindo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('seguido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seguidores', to=settings.AUTH_USER_MODEL)),
+                ('seguidor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seguindo', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['seguido', 'seguidor'], name='seguindo_seguidores_idx')],
+                'constraints': [models.UniqueConstraint(fields=('seguidor', 'seguido'), name='seguindo_unico'), models.CheckConstraint(condition=models.Q(('seguidor', models.F('seguido')), _negated=True), name='seguindo_outro_usuario')],
+            },
+        ),
+    ]
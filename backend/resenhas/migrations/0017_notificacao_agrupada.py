@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:28
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def preencher_inicio(apps, schema_editor):
+    apps.get_model('resenhas', 'Notificacao').objects.update(inicio=F('data'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0016_seguindo_timeline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacao',
+            name='inicio',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(preencher_inicio, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='notificacao',
+            name='total_remetentes',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notificacao',
+            name='ultimos_remetentes',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(fields=['destinatario', 'tipo', 'resenha', '-inicio'], name='notificacao_grupo_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0017_notificacao_agrupada'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resenha',
+            index=models.Index(fields=['usuario', '-data_criacao', '-id'], name='resenha_usuario_idx'),
+        ),
+    ]
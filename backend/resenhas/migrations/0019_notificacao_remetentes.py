@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def preencher_remetentes(apps, schema_editor):
+    Notificacao = apps.get_model('resenhas', 'Notificacao')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Remetente = Notificacao.remetentes.through
+    ultimo = 0
+    while True:
+        lote = list(Notificacao.objects.filter(id__gt=ultimo).order_by('id').values_list('id', 'remetente_id', 'ultimos_remetentes')[:1000])
+        if not lote: return
+        ids = dict(User.objects.filter(username__in={nome for _, _, nomes in lote for nome in nomes}).values_list('username', 'id'))
+        Remetente.objects.bulk_create([
+            Remetente(notificacao_id=pk, user_id=user_id)
+            for pk, remetente_id, nomes in lote for user_id in {remetente_id, *(ids[nome] for nome in nomes if nome in ids)}
+        ], ignore_conflicts=True)
+        ultimo = lote[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resenhas', '0018_resenha_usuario_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacao',
+            name='remetentes',
+            field=models.ManyToManyField(blank=True, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(preencher_remetentes, migrations.RunPython.noop),
+    ]
@@ -1,24 +1,187 @@
-from django.db import models
+import unicodedata
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, RowNumber
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.text import slugify
+from .busca import get_backend
 
 def validate_max_words_500(value):
     if len(value.strip().split()) > 500: raise ValidationError("Máximo 500 palavras.")
 def validate_max_words_50(value):
     if len(value.strip().split()) > 50: raise ValidationError("Máximo 50 palavras.")
 
+def _curtido_por(through, campo, user):
+    if not user or not user.is_authenticated: return models.Value(False, output_field=models.BooleanField())
+    return models.Exists(through.objects.filter(**{campo: models.OuterRef('pk'), 'user_id': user.id}))
+
+def _contagem(model, campo, agregado=None, chave='pk', **filtro):
+    linhas = model.objects.filter(**{campo: models.OuterRef(chave)}, **filtro).order_by().values(campo).annotate(n=agregado or models.Count('*')).values('n')
+    return Coalesce(models.Subquery(linhas), 0)
+
+def chave_catalogo(texto):
+    return slugify(''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c)), allow_unicode=True)[:255]
+
+def chave_livro(titulo, autor): return f"{chave_catalogo(autor)}/{chave_catalogo(titulo)}"[:255]
+
+def carimbo_versao(): return {'versao': models.F('versao') + 1, 'atualizado_em': timezone.now()}
+
+class ComentarioQuerySet(models.QuerySet):
+    def com_detalhes(self, user=None):
+        return self.select_related('usuario__perfil').annotate(
+            curtido=_curtido_por(Comentario.curtidas.through, 'comentario_id', user),
+        ).prefetch_related(models.Prefetch('curtidas', queryset=User.objects.only('id')))
+
+    def recalcular_contadores(self):
+        return self.update(total_curtidas=_contagem(Comentario.curtidas.through, 'comentario_id'))
+
+class ResenhaQuerySet(models.QuerySet):
+    def com_detalhes(self, user=None):
+        comentarios = Comentario.objects.com_detalhes(user).order_by('-data_criacao')
+        return self.select_related('usuario__perfil').annotate(
+            curtido=_curtido_por(Resenha.curtidas.through, 'resenha_id', user),
+        ).prefetch_related(
+            models.Prefetch('curtidas', queryset=User.objects.select_related('perfil').order_by('id')),
+            models.Prefetch('comentarios', queryset=comentarios),
+        )
+
+    def com_resumo(self, user=None, comentarios=3):
+        ordem = models.Window(RowNumber(), partition_by=models.F('resenha_id'), order_by=[models.F('data_criacao').desc(), models.F('id').desc()])
+        recentes = Comentario.objects.filter(parent=None).com_detalhes(user).prefetch_related(None).annotate(posicao=ordem).filter(posicao__lte=comentarios)
+        return self.select_related('usuario__perfil').annotate(
+            curtido=_curtido_por(Resenha.curtidas.through, 'resenha_id', user),
+        ).prefetch_related(models.Prefetch('comentarios', queryset=recentes.order_by('-data_criacao', '-id'), to_attr='comentarios_recentes'))
+
+    def filtrar_feed(self, user, params):
+        queryset = self
+        if params.get('only_mine') == 'true' and user.is_authenticated: queryset = queryset.filter(usuario=user)
+        if params.get('livro', '').isdigit(): queryset = queryset.filter(livro_id=params['livro'])
+        if params.get('usuario', '').isdigit(): queryset = queryset.filter(usuario_id=params['usuario'])
+        return queryset
+
+    def tocar(self): return self.update(**carimbo_versao())
+
+    def recalcular_contadores(self):
+        return self.update(
+            total_curtidas=_contagem(Resenha.curtidas.through, 'resenha_id'),
+            total_comentarios=_contagem(Comentario, 'resenha'),
+        )
+
+class PerfilQuerySet(models.QuerySet):
+    def recalcular_contadores(self):
+        return self.update(notificacoes_nao_lidas=_contagem(Notificacao, 'destinatario', chave='usuario', lida=False))
+
+class Autor(models.Model):
+    nome = models.CharField(max_length=1000)
+    chave = models.CharField(max_length=255, unique=True)
+    def __str__(self): return self.nome
+
+class LivroQuerySet(models.QuerySet):
+    def catalogar(self, titulo, autor, url_imagem=None):
+        chave = chave_livro(titulo, autor)
+        livro = self.filter(chave=chave).first()
+        if livro: return livro
+        autor_obj, _ = Autor.objects.get_or_create(chave=chave_catalogo(autor), defaults={'nome': autor})
+        return self.get_or_create(chave=chave, defaults={'titulo': titulo, 'autor': autor_obj, 'url_imagem': url_imagem})[0]
+
+    def catalogar_resenhas(self, resenhas):
+        nomes = {}
+        for r in resenhas: nomes.setdefault(chave_catalogo(r.autor_livro), r.autor_livro)
+        Autor.objects.bulk_create([Autor(nome=nome, chave=chave) for chave, nome in nomes.items()], ignore_conflicts=True)
+        autores = dict(Autor.objects.filter(chave__in=nomes).values_list('chave', 'id'))
+        novos = {}
+        for r in resenhas:
+            chave = chave_livro(r.titulo_livro, r.autor_livro)
+            livro = novos.setdefault(chave, Livro(titulo=r.titulo_livro, autor_id=autores[chave_catalogo(r.autor_livro)], chave=chave))
+            livro.url_imagem = livro.url_imagem or r.url_imagem
+        self.bulk_create(novos.values(), ignore_conflicts=True)
+        livros = dict(self.filter(chave__in=novos).values_list('chave', 'id'))
+        for r in resenhas: r.livro_id = livros[chave_livro(r.titulo_livro, r.autor_livro)]
+        Resenha.objects.bulk_update(resenhas, ['livro'])
+        return self.filter(id__in=livros.values()).recalcular_agregados()
+
+    def recalcular_agregados(self):
+        return self.update(
+            total_resenhas=_contagem(Resenha, 'livro'),
+            soma_notas=_contagem(Resenha, 'livro', models.Sum('nota')),
+            **{f'notas_{i}': _contagem(Resenha, 'livro', nota=i) for i in range(1, 6)},
+        )
+
+class Livro(models.Model):
+    titulo = models.CharField(max_length=1000)
+    autor = models.ForeignKey(Autor, on_delete=models.CASCADE, related_name='livros')
+    url_imagem = models.URLField(blank=True, null=True)
+    chave = models.CharField(max_length=255, unique=True)
+    total_resenhas = models.PositiveIntegerField(default=0)
+    soma_notas = models.PositiveIntegerField(default=0)
+    notas_1 = models.PositiveIntegerField(default=0)
+    notas_2 = models.PositiveIntegerField(default=0)
+    notas_3 = models.PositiveIntegerField(default=0)
+    notas_4 = models.PositiveIntegerField(default=0)
+    notas_5 = models.PositiveIntegerField(default=0)
+    objects = LivroQuerySet.as_manager()
+    def __str__(self): return f"{self.titulo} - {self.autor.nome}"
+
+    @property
+    def media(self): return round(self.soma_notas / self.total_resenhas, 2) if self.total_resenhas else None
+    @property
+    def histograma(self): return {i: getattr(self, f'notas_{i}') for i in range(1, 6)}
+
+    @staticmethod
+    def ajustar(livro_id, nota, delta):
+        if livro_id is None: return
+        campo = f'notas_{nota}'
+        qs = Livro.objects.filter(pk=livro_id)
+        if delta < 0: qs = qs.filter(total_resenhas__gte=-delta, **{f'{campo}__gte': -delta})
+        qs.update(total_resenhas=models.F('total_resenhas') + delta, soma_notas=models.F('soma_notas') + delta * nota, **{campo: models.F(campo) + delta})
+
 class Resenha(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name="resenhas")
     titulo_livro = models.CharField(max_length=1000, validators=[validate_max_words_50])
     autor_livro = models.CharField(max_length=1000, validators=[validate_max_words_50])
     url_imagem = models.URLField(blank=True, null=True)
+    livro = models.ForeignKey(Livro, on_delete=models.SET_NULL, null=True, blank=True, related_name='resenhas')
     texto_resenha = models.TextField(validators=[validate_max_words_500])
     nota = models.IntegerField(choices=[(i, str(i)) for i in range(1, 6)])
     data_criacao = models.DateTimeField(auto_now_add=True)
     curtidas = models.ManyToManyField(User, related_name="resenhas_curtidas", blank=True)
+    total_curtidas = models.PositiveIntegerField(default=0)
+    total_comentarios = models.PositiveIntegerField(default=0)
+    versao = models.PositiveIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
+    objects = ResenhaQuerySet.as_manager()
+    class Meta:
+        indexes = [
+            models.Index(fields=['-data_criacao', '-id'], name='resenha_feed_idx'),
+            models.Index(fields=['usuario', '-data_criacao', '-id'], name='resenha_usuario_idx'),
+        ]
     def __str__(self): return f"{self.titulo_livro} - {self.usuario.username}"
+    def save(self, *args, **kwargs):
+        if not self._state.adding: kwargs['update_fields'] = self.campos_edicao(kwargs.get('update_fields'))
+        campos = kwargs.get('update_fields')
+        if campos is not None and not {'titulo_livro', 'autor_livro', 'nota'} & set(campos): return self.gravar(*args, **kwargs)
+        anterior = Resenha.objects.filter(pk=self.pk).values_list('livro_id', 'nota', 'livro__chave').first() if self.pk else None
+        with transaction.atomic():
+            if anterior is None or anterior[2] != chave_livro(self.titulo_livro, self.autor_livro):
+                self.livro = Livro.objects.catalogar(self.titulo_livro, self.autor_livro, self.url_imagem)
+                if campos is not None: kwargs['update_fields'] = [*campos, 'livro']
+            self.gravar(*args, **kwargs)
+            if anterior and anterior[:2] == (self.livro_id, self.nota): return
+            if anterior: Livro.ajustar(anterior[0], anterior[1], -1)
+            Livro.ajustar(self.livro_id, self.nota, 1)
+
+    def campos_edicao(self, campos):
+        if campos is None: campos = [f.name for f in self._meta.concrete_fields if not f.primary_key and f.name not in ('total_curtidas', 'total_comentarios')]
+        return [c for c in dict.fromkeys(campos) if c != 'versao']
+
+    def gravar(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if kwargs.get('update_fields') is None: return
+        Resenha.objects.filter(pk=self.pk).update(versao=models.F('versao') + 1)
+        self.refresh_from_db(fields=['versao'])
 
 class Comentario(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -27,31 +190,150 @@ class Comentario(models.Model):
     texto = models.TextField(max_length=200)
     data_criacao = models.DateTimeField(auto_now_add=True)
     curtidas = models.ManyToManyField(User, related_name="comentarios_curtidos", blank=True)
+    total_curtidas = models.PositiveIntegerField(default=0)
+    objects = ComentarioQuerySet.as_manager()
+    class Meta: indexes = [models.Index(fields=['resenha', '-data_criacao', '-id'], name='comentario_resenha_idx')]
 
 class Perfil(models.Model):
     usuario = models.OneToOneField(User, on_delete=models.CASCADE, related_name='perfil')
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True) 
+    miniaturas = models.JSONField(default=dict, blank=True)
     hobbies = models.TextField(blank=True, default="")
     bio = models.TextField(blank=True, max_length=300, default="")
+    notificacoes_nao_lidas = models.PositiveIntegerField(default=0)
+    total_seguidores = models.PositiveIntegerField(default=0)
+    total_seguindo = models.PositiveIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+    objects = PerfilQuerySet.as_manager()
 
     def __str__(self): return f"Perfil de {self.usuario.username}"
 
+class Seguindo(models.Model):
+    seguidor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='seguindo')
+    seguido = models.ForeignKey(User, on_delete=models.CASCADE, related_name='seguidores')
+    criado_em = models.DateTimeField(default=timezone.now)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seguidor', 'seguido'], name='seguindo_unico'),
+            models.CheckConstraint(condition=~models.Q(seguidor=models.F('seguido')), name='seguindo_outro_usuario'),
+        ]
+        indexes = [models.Index(fields=['seguido', 'seguidor'], name='seguindo_seguidores_idx')]
+
+class EntradaTimeline(models.Model):
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    resenha = models.ForeignKey(Resenha, on_delete=models.CASCADE, related_name='+')
+    autor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    data_criacao = models.DateTimeField()
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['usuario', 'resenha'], name='timeline_unica')]
+        indexes = [models.Index(fields=['usuario', '-data_criacao', '-resenha'], name='timeline_usuario_idx')]
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created: Perfil.objects.create(usuario=instance)
 
+@receiver(post_save, sender=Resenha)
+def indexar_resenha(sender, instance, **kwargs): get_backend().indexar([instance])
+
+@receiver(post_delete, sender=Resenha)
+def remover_resenha_indice(sender, instance, **kwargs): get_backend().remover([instance.pk])
+
+@receiver(post_delete, sender=Resenha)
+def descontar_resenha_livro(sender, instance, **kwargs): Livro.ajustar(instance.livro_id, instance.nota, -1)
+
+@receiver(pre_save, sender=User)
+def guardar_username_anterior(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and (update_fields is None or 'username' in update_fields):
+        instance._username_anterior = User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+
+@receiver(post_save, sender=User)
+def propagar_username(sender, instance, created, **kwargs):
+    anterior = instance.__dict__.pop('_username_anterior', instance.username)
+    if created or anterior == instance.username: return
+    Perfil.objects.filter(usuario=instance).update(atualizado_em=timezone.now())
+    get_backend().indexar(instance.resenhas.select_related('usuario'))
+
 class Notificacao(models.Model):
     destinatario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notificacoes')
     remetente = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notificacoes_enviadas')
     tipo = models.CharField(max_length=20, choices=[('curtida', 'Curtida'), ('comentario', 'Comentário'), ('mensagem', 'Mensagem')])
     resenha = models.ForeignKey(Resenha, on_delete=models.CASCADE, null=True, blank=True)
     lida = models.BooleanField(default=False)
-    data = models.DateTimeField(auto_now_add=True)
-    class Meta: ordering = ['-data']
+    data = models.DateTimeField(default=timezone.now)
+    inicio = models.DateTimeField(default=timezone.now)
+    total_remetentes = models.PositiveIntegerField(default=1)
+    ultimos_remetentes = models.JSONField(default=list, blank=True)
+    remetentes = models.ManyToManyField(User, related_name='+', blank=True)
+    class Meta:
+        ordering = ['-data']
+        indexes = [
+            models.Index(fields=['destinatario', '-data', '-id'], name='notificacao_dest_idx'),
+            models.Index(fields=['destinatario', 'lida'], name='notificacao_nao_lida_idx'),
+            models.Index(fields=['destinatario', 'tipo', 'resenha', '-inicio'], name='notificacao_grupo_idx'),
+        ]
+
+class EventoNotificacao(models.Model):
+    destinatario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    remetente = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    tipo = models.CharField(max_length=20, choices=Notificacao._meta.get_field('tipo').choices)
+    resenha = models.ForeignKey(Resenha, on_delete=models.CASCADE, null=True, blank=True)
+    criado_em = models.DateTimeField(default=timezone.now)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    erro = models.TextField(blank=True, default="")
+    class Meta: indexes = [models.Index(fields=['tentativas', 'id'], name='evento_pendente_idx')]
 
 class Mensagem(models.Model):
     remetente = models.ForeignKey(User, on_delete=models.CASCADE, related_name='msgs_enviadas')
     destinatario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='msgs_recebidas')
     texto = models.TextField()
     data = models.DateTimeField(auto_now_add=True)
-    class Meta: ordering = ['data']
+    class Meta:
+        ordering = ['data']
+        indexes = [models.Index(fields=['remetente', 'destinatario', 'id'], name='mensagem_conversa_idx')]
+
+class Conversa(models.Model):
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversas')
+    correspondente = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    ultima_mensagem = models.ForeignKey(Mensagem, on_delete=models.SET_NULL, null=True, related_name='+')
+    atualizado_em = models.DateTimeField(default=timezone.now)
+    nao_lidas = models.PositiveIntegerField(default=0)
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['usuario', 'correspondente'], name='conversa_unica')]
+        indexes = [models.Index(fields=['usuario', '-atualizado_em', '-id'], name='conversa_inbox_idx')]
+
+@receiver(post_save, sender=Mensagem)
+def atualizar_conversas(sender, instance, created, **kwargs):
+    if not created: return
+    pares = {(instance.destinatario_id, instance.remetente_id): 1, (instance.remetente_id, instance.destinatario_id): 0}
+    for (dono, outro), novas in pares.items():
+        atualizadas = Conversa.objects.filter(usuario_id=dono, correspondente_id=outro).update(
+            ultima_mensagem=instance, atualizado_em=instance.data, nao_lidas=models.F('nao_lidas') + novas)
+        if not atualizadas:
+            Conversa.objects.create(usuario_id=dono, correspondente_id=outro, ultima_mensagem=instance, atualizado_em=instance.data, nao_lidas=novas)
+
+@receiver(post_delete, sender=Mensagem)
+def recalcular_ultima_mensagem(sender, instance, **kwargs):
+    par = models.Q(remetente_id=instance.remetente_id, destinatario_id=instance.destinatario_id) | models.Q(remetente_id=instance.destinatario_id, destinatario_id=instance.remetente_id)
+    ultima = Mensagem.objects.filter(par).order_by('-id').first()
+    Conversa.objects.filter(
+        models.Q(usuario_id=instance.remetente_id, correspondente_id=instance.destinatario_id) | models.Q(usuario_id=instance.destinatario_id, correspondente_id=instance.remetente_id),
+        ultima_mensagem=None,
+    ).update(ultima_mensagem=ultima)
+
+class ConsultaLivro(models.Model):
+    termo = models.CharField(max_length=255, unique=True)
+    resultados = models.JSONField(default=list)
+    atualizado_em = models.DateTimeField(default=timezone.now)
+
+class Importacao(models.Model):
+    nome = models.CharField(max_length=255, unique=True)
+    linha = models.PositiveIntegerField(default=0)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+class ImportacaoItem(models.Model):
+    importacao = models.ForeignKey(Importacao, on_delete=models.CASCADE, related_name='itens')
+    tipo = models.CharField(max_length=20)
+    origem = models.BigIntegerField()
+    destino = models.BigIntegerField()
+    class Meta: constraints = [models.UniqueConstraint(fields=['importacao', 'tipo', 'origem'], name='importacao_item_unico')]
@@ -0,0 +1,117 @@
+import json
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Min
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .exportacao import Codificador
+from .models import EventoNotificacao, Notificacao, Perfil
+from . import tempo_real
+
+logger = logging.getLogger(__name__)
+Remetente = Notificacao.remetentes.through
+
+def enfileirar(remetente, destinatario, tipo, resenha=None):
+    if remetente != destinatario:
+        EventoNotificacao.objects.create(remetente=remetente, destinatario=destinatario, tipo=tipo, resenha=resenha)
+        tempo_real.publicar(destinatario.id, 'notificacao', {'tipo': tipo, 'remetente_nome': remetente.username, 'resenha': resenha.id if resenha else None})
+
+@transaction.atomic
+def retirar(remetente, destinatario, tipo, resenha=None):
+    chave = {'destinatario_id': destinatario.id, 'tipo': tipo, 'resenha': resenha}
+    if remetente == destinatario or EventoNotificacao.objects.filter(remetente=remetente, **chave).delete()[0]: return
+    n = Notificacao.objects.select_for_update(of=('self',)).filter(**chave, remetentes=remetente).order_by('-inicio', '-id').first()
+    if n is None: return
+    if n.total_remetentes <= 1: n.delete(); return
+    n.remetentes.remove(remetente)
+    if remetente.username in n.ultimos_remetentes: n.ultimos_remetentes = [nome for nome in n.ultimos_remetentes if nome != remetente.username]
+    if n.remetente_id == remetente.id: n.remetente_id = User.objects.filter(username__in=n.ultimos_remetentes[:1]).values_list('id', flat=True).first() or n.remetente_id
+    n.total_remetentes -= 1; n.save(update_fields=['remetente', 'total_remetentes', 'ultimos_remetentes'])
+
+def pendentes(max_tentativas=None):
+    return EventoNotificacao.objects.filter(tentativas__lt=max_tentativas or settings.NOTIFICACOES_MAX_TENTATIVAS)
+
+def atraso_fila():
+    qs = pendentes()
+    mais_antigo = qs.aggregate(m=Min('criado_em'))['m']
+    return qs.count(), (timezone.now() - mais_antigo).total_seconds() if mais_antigo else 0.0
+
+def ajustar_nao_lidas(usuario_id, delta):
+    qs = Perfil.objects.filter(usuario_id=usuario_id)
+    if delta < 0: qs = qs.filter(notificacoes_nao_lidas__gte=-delta)
+    qs.update(notificacoes_nao_lidas=F('notificacoes_nao_lidas') + delta)
+
+@receiver(post_delete, sender=Notificacao)
+def descontar_nao_lida(sender, instance, **kwargs):
+    if not instance.lida: ajustar_nao_lidas(instance.destinatario_id, -1)
+
+def recentes(novos, anteriores): return list(dict.fromkeys([*novos, *anteriores]))[:settings.NOTIFICACOES_ULTIMOS_REMETENTES]
+
+def agrupar(eventos):
+    grupos = defaultdict(list)
+    for e in sorted(eventos, key=lambda e: (e.criado_em, e.id)):
+        grupos[(e.destinatario_id, e.tipo, e.resenha_id, None if e.tipo in settings.NOTIFICACOES_AGRUPAR else e.id)].append(e)
+    return grupos
+
+def entregar(eventos):
+    nomes = dict(User.objects.filter(id__in={e.remetente_id for e in eventos}).values_list('id', 'username'))
+    janela, novas, nao_lidas, ligacoes = timedelta(hours=settings.NOTIFICACOES_JANELA_HORAS), [], Counter(), []
+    for (destinatario_id, tipo, resenha_id, avulso), grupo in agrupar(eventos).items():
+        ultimo, ids = grupo[-1], list(dict.fromkeys(e.remetente_id for e in reversed(grupo)))
+        atores = [nomes[i] for i in ids if i in nomes]
+        existente = None if avulso else Notificacao.objects.select_for_update().filter(
+            destinatario_id=destinatario_id, tipo=tipo, resenha_id=resenha_id, inicio__gte=grupo[0].criado_em - janela).order_by('-inicio', '-id').first()
+        if existente is None:
+            novas.append((Notificacao(destinatario_id=destinatario_id, remetente_id=ultimo.remetente_id, tipo=tipo, resenha_id=resenha_id, data=ultimo.criado_em,
+                                      inicio=grupo[0].criado_em, total_remetentes=len(ids), ultimos_remetentes=recentes(atores, [])), ids))
+            nao_lidas[destinatario_id] += 1; continue
+        presentes = set(Remetente.objects.filter(notificacao=existente, user_id__in=ids).values_list('user_id', flat=True))
+        novos = [i for i in ids if i not in presentes]
+        ligacoes.extend(Remetente(notificacao_id=existente.id, user_id=i) for i in novos)
+        if existente.lida: nao_lidas[destinatario_id] += 1
+        existente.remetente_id, existente.data, existente.lida = ultimo.remetente_id, max(existente.data, ultimo.criado_em), False
+        existente.total_remetentes += len(novos); existente.ultimos_remetentes = recentes(atores, existente.ultimos_remetentes)
+        existente.save(update_fields=['remetente', 'data', 'lida', 'total_remetentes', 'ultimos_remetentes'])
+    criadas = Notificacao.objects.bulk_create([n for n, _ in novas])
+    Remetente.objects.bulk_create([*ligacoes, *(Remetente(notificacao_id=n.id, user_id=i) for n, ids in novas for i in ids)])
+    for usuario_id, n in nao_lidas.items(): ajustar_nao_lidas(usuario_id, n)
+    return criadas
+
+def processar_lote(lote=None, max_tentativas=None):
+    eventos = list(pendentes(max_tentativas).order_by('id')[:lote or settings.NOTIFICACOES_LOTE])
+    if not eventos: return 0
+    try:
+        with transaction.atomic():
+            entregar(eventos)
+            EventoNotificacao.objects.filter(id__in=[e.id for e in eventos]).delete()
+        return len(eventos)
+    except Exception:
+        logger.warning("Falha ao entregar lote de %s notificações; tentando uma a uma", len(eventos), exc_info=True)
+    entregues = 0
+    for evento in eventos:
+        try:
+            with transaction.atomic():
+                entregar([evento]); evento.delete()
+            entregues += 1
+        except Exception as exc:
+            logger.exception("Falha ao entregar evento de notificação %s", evento.id)
+            EventoNotificacao.objects.filter(id=evento.id).update(tentativas=F('tentativas') + 1, erro=str(exc))
+    return entregues
+
+def podar(dias=None, lote=None, arquivo=None):
+    limite = timezone.now() - timedelta(days=settings.NOTIFICACOES_RETENCAO_DIAS if dias is None else dias)
+    antigas, ultimo, removidas = Notificacao.objects.filter(lida=True, data__lt=limite).order_by('id'), 0, 0
+    while True:
+        ids = list(antigas.filter(id__gt=ultimo).values_list('id', flat=True)[:lote or settings.NOTIFICACOES_PODA_LOTE])
+        if not ids: return removidas
+        with transaction.atomic():
+            if arquivo:
+                for linha in Notificacao.objects.filter(id__in=ids, lida=True).order_by('id').values():
+                    arquivo.write(json.dumps(linha, cls=Codificador, ensure_ascii=False) + '\n')
+            removidas += Notificacao.objects.filter(id__in=ids, lida=True).delete()[0]
+        ultimo = ids[-1]
@@ -0,0 +1,81 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+class KeysetPagination(BasePagination):
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_query_param = 'page'
+    campo_data = 'data_criacao'
+
+    def usa_paginas(self, request, view):
+        if self.page_query_param in request.query_params or request.query_params.get('search'): return True
+        ordering = request.query_params.get('ordering')
+        return bool(ordering) and ordering != f'-{self.get_campo(view)}'
+
+    def get_campo(self, view): return getattr(view, 'cursor_campo', self.campo_data)
+
+    def get_page_size(self, request):
+        try: size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError): return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def encode_cursor(self, obj, campo):
+        bruto = str(obj.pk) if campo == 'pk' else f"{getattr(obj, campo).isoformat()}|{obj.pk}"
+        return urlsafe_b64encode(bruto.encode()).decode()
+
+    def decode_cursor(self, request, campo):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor: return None
+        try:
+            partes = urlsafe_b64decode(cursor.encode()).decode().split('|')
+            if campo == 'pk': return None, int(partes[0])
+            data, pk = parse_datetime(partes[0]), int(partes[1])
+        except (ValueError, IndexError, UnicodeDecodeError): data = None
+        if data is None: raise NotFound('Cursor inválido.')
+        return data, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginas = None
+        if self.usa_paginas(request, view):
+            self.paginas = PageNumberPagination()
+            return self.paginas.paginate_queryset(queryset, request, view)
+        return self.recortar(list(self.janela(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if self.usa_paginas(request, view): return await sync_to_async(self.paginate_queryset)(queryset, request, view)
+        self.paginas = None
+        return self.recortar([obj async for obj in self.janela(queryset, request, view)])
+
+    def paginar_fonte(self, fonte, request, view=None):
+        self.paginas, self.request, self.campo, self.size = None, request, self.get_campo(view), self.get_page_size(request)
+        return self.recortar(fonte(self.decode_cursor(request, self.campo), self.size + 1))
+
+    def janela(self, queryset, request, view):
+        self.request, self.campo, self.size = request, self.get_campo(view), self.get_page_size(request)
+        queryset = queryset.order_by('-pk') if self.campo == 'pk' else queryset.order_by(f'-{self.campo}', '-pk')
+        cursor = self.decode_cursor(request, self.campo)
+        if cursor:
+            data, pk = cursor
+            queryset = queryset.filter(pk__lt=pk) if self.campo == 'pk' else queryset.filter(Q(**{f'{self.campo}__lt': data}) | Q(**{self.campo: data, 'pk__lt': pk}))
+        return queryset[:self.size + 1]
+
+    def recortar(self, pagina):
+        self.next_cursor = self.encode_cursor(pagina[self.size - 1], self.campo) if len(pagina) > self.size else None
+        return pagina[:self.size]
+
+    def get_next_link(self):
+        if self.next_cursor is None: return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if self.paginas: return self.paginas.get_paginated_response(data)
+        return Response({'next': self.get_next_link(), 'results': data})
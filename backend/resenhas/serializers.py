@@ -1,6 +1,10 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Resenha, Comentario, Perfil, Notificacao, Mensagem
+from django.core.files.storage import default_storage
+from . import avatares
+from .metricas import SerializacaoMedida
+from .models import Resenha, Comentario, Perfil, Notificacao, Mensagem, Conversa, Livro, Seguindo
 
 def get_full_image_url(request, image_field):
     if image_field:
@@ -10,27 +14,46 @@ def get_full_image_url(request, image_field):
             return image_field.url
     return None
 
-class PerfilSerializer(serializers.ModelSerializer):
+def get_avatar_url(request, perfil, tamanho):
+    nome = perfil.miniaturas.get(tamanho)
+    if not nome: return get_full_image_url(request, perfil.avatar)
+    url = default_storage.url(nome)
+    return request.build_absolute_uri(url) if request else url
+
+def agrupar_comentarios(comentarios):
+    raizes, filhos = [], {}
+    for c in comentarios:
+        if c.parent_id is None: raizes.append(c)
+        else: filhos.setdefault(c.parent_id, []).append(c)
+    for lista in filhos.values(): lista.sort(key=lambda c: c.id)
+    return raizes, filhos
+
+class PerfilSerializer(SerializacaoMedida, serializers.ModelSerializer):
     avatar = serializers.SerializerMethodField()
     class Meta: 
         model = Perfil
-        fields = ['avatar', 'hobbies', 'bio']
+        fields = ['avatar', 'hobbies', 'bio', 'total_seguidores', 'total_seguindo']
     
     def get_avatar(self, obj):
-        return get_full_image_url(self.context.get('request'), obj.avatar)
+        return get_avatar_url(self.context.get('request'), obj, 'grande')
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SerializacaoMedida, serializers.ModelSerializer):
     perfil = PerfilSerializer(read_only=True)
     class Meta: 
         model = User
         fields = ("id", "username", "email", "perfil")
 
-class PublicUserSerializer(serializers.ModelSerializer):
+class PublicUserSerializer(SerializacaoMedida, serializers.ModelSerializer):
     perfil = PerfilSerializer(read_only=True)
+    seguindo = serializers.SerializerMethodField()
     class Meta: 
         model = User
-        fields = ("id", "username", "perfil") 
-class UpdateUserSerializer(serializers.ModelSerializer):
+        fields = ("id", "username", "perfil", "seguindo") 
+
+    def get_seguindo(self, obj):
+        req = self.context.get('request')
+        return bool(req) and req.user.is_authenticated and Seguindo.objects.filter(seguidor=req.user, seguido=obj).exists()
+class UpdateUserSerializer(SerializacaoMedida, serializers.ModelSerializer):
     avatar = serializers.ImageField(source='perfil.avatar', required=False)
     hobbies = serializers.CharField(source='perfil.hobbies', required=False, allow_blank=True)
     bio = serializers.CharField(source='perfil.bio', required=False, allow_blank=True)
@@ -41,18 +64,19 @@ class UpdateUserSerializer(serializers.ModelSerializer):
     
     def update(self, instance, validated_data):
         perfil_data = validated_data.pop('perfil', {})
-        instance.username = validated_data.get('username', instance.username)
-        instance.email = validated_data.get('email', instance.email)
-        instance.save()
+        campos = [campo for campo in ('username', 'email') if campo in validated_data]
+        for campo in campos: setattr(instance, campo, validated_data[campo])
+        if campos: instance.save(update_fields=campos)
         
         perfil, _ = Perfil.objects.get_or_create(usuario=instance)
-        if 'avatar' in perfil_data: perfil.avatar = perfil_data['avatar']
+        if 'avatar' in perfil_data: perfil.avatar, perfil.miniaturas = perfil_data['avatar'], {}
         if 'hobbies' in perfil_data: perfil.hobbies = perfil_data['hobbies']
         if 'bio' in perfil_data: perfil.bio = perfil_data['bio']
         perfil.save()
+        if 'avatar' in perfil_data and perfil.avatar: avatares.agendar(perfil.id)
         return instance
 
-class RegisterSerializer(serializers.ModelSerializer):
+class RegisterSerializer(SerializacaoMedida, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     class Meta: 
         model = User
@@ -60,22 +84,22 @@ class RegisterSerializer(serializers.ModelSerializer):
     def create(self, val_data): return User.objects.create_user(**val_data)
 
 
-class NotificacaoSerializer(serializers.ModelSerializer):
+class NotificacaoSerializer(SerializacaoMedida, serializers.ModelSerializer):
     remetente_nome = serializers.ReadOnlyField(source='remetente.username')
     remetente_avatar = serializers.SerializerMethodField()
     titulo_resenha = serializers.SerializerMethodField()
 
-    class Meta: model = Notificacao; fields = '__all__'
+    class Meta: model = Notificacao; exclude = ['remetentes']
 
     def get_remetente_avatar(self, obj):
         try:
-            if hasattr(obj.remetente, 'perfil'): return get_full_image_url(self.context.get('request'), obj.remetente.perfil.avatar)
+            if hasattr(obj.remetente, 'perfil'): return get_avatar_url(self.context.get('request'), obj.remetente.perfil, 'pequena')
         except Exception: pass
         return None
 
     def get_titulo_resenha(self, obj): return obj.resenha.titulo_livro if obj.resenha else "Conteúdo removido"
 
-class MensagemSerializer(serializers.ModelSerializer):
+class MensagemSerializer(SerializacaoMedida, serializers.ModelSerializer):
     remetente_nome = serializers.ReadOnlyField(source='remetente.username')
     remetente_avatar = serializers.SerializerMethodField()
     eh_minha = serializers.SerializerMethodField()
@@ -91,40 +115,70 @@ class MensagemSerializer(serializers.ModelSerializer):
 
     def get_remetente_avatar(self, obj):
         try:
-            if hasattr(obj.remetente, 'perfil'): return get_full_image_url(self.context.get('request'), obj.remetente.perfil.avatar)
+            if hasattr(obj.remetente, 'perfil'): return get_avatar_url(self.context.get('request'), obj.remetente.perfil, 'pequena')
+        except Exception: pass
+        return None
+
+class ConversaSerializer(SerializacaoMedida, serializers.ModelSerializer):
+    correspondente_nome = serializers.ReadOnlyField(source='correspondente.username')
+    correspondente_avatar = serializers.SerializerMethodField()
+    ultima_mensagem = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Conversa
+        fields = ['id', 'correspondente', 'correspondente_nome', 'correspondente_avatar', 'ultima_mensagem', 'atualizado_em', 'nao_lidas']
+
+    def get_correspondente_avatar(self, obj):
+        try:
+            if hasattr(obj.correspondente, 'perfil'): return get_avatar_url(self.context.get('request'), obj.correspondente.perfil, 'pequena')
         except Exception: pass
         return None
 
-class ComentarioSerializer(serializers.ModelSerializer):
+    def get_ultima_mensagem(self, obj):
+        msg = obj.ultima_mensagem
+        if msg is None: return None
+        return {'id': msg.id, 'texto': msg.texto, 'data': msg.data, 'eh_minha': msg.remetente_id == obj.usuario_id}
+
+class ComentarioSerializer(SerializacaoMedida, serializers.ModelSerializer):
     usuario_nome = serializers.ReadOnlyField(source="usuario.username")
     usuario_id = serializers.ReadOnlyField(source="usuario.id")
     usuario_avatar = serializers.SerializerMethodField()
-    total_curtidas = serializers.SerializerMethodField()
     curtido_por_mim = serializers.SerializerMethodField()
+    total_replies = serializers.SerializerMethodField()
     replies = serializers.SerializerMethodField()
 
     class Meta: 
         model = Comentario
         fields = "__all__"
-        read_only_fields = ["usuario", "resenha", "curtidas"]
+        read_only_fields = ["usuario", "resenha", "curtidas", "total_curtidas"]
         
-    def get_total_curtidas(self, obj): return obj.curtidas.count()
     def get_curtido_por_mim(self, obj):
+        if hasattr(obj, 'curtido'): return obj.curtido
         req = self.context.get("request")
         return req.user.is_authenticated and obj.curtidas.filter(id=req.user.id).exists() if req else False
+    def _filhos(self, obj):
+        arvore = self.context.setdefault('arvore', {'resenhas': set(), 'filhos': {}})
+        if obj.resenha_id not in arvore['resenhas']:
+            req = self.context.get('request')
+            _, filhos = agrupar_comentarios(Comentario.objects.filter(resenha_id=obj.resenha_id).com_detalhes(req.user if req else None))
+            arvore['filhos'].update(filhos); arvore['resenhas'].add(obj.resenha_id)
+        return arvore['filhos'].get(obj.id, [])
+    def get_total_replies(self, obj): return len(self._filhos(obj))
     def get_replies(self, obj):
-        return ComentarioSerializer(obj.replies.all(), many=True, context=self.context).data if obj.replies.exists() else []
+        profundidade = self.context.get('profundidade', 0) + 1
+        if profundidade > settings.COMENTARIOS_MAX_PROFUNDIDADE: return []
+        replies = self._filhos(obj)[:settings.COMENTARIOS_MAX_RESPOSTAS]
+        return ComentarioSerializer(replies, many=True, context={**self.context, 'profundidade': profundidade}).data if replies else []
     def get_usuario_avatar(self, obj):
         try:
-            if hasattr(obj.usuario, 'perfil'): return get_full_image_url(self.context.get('request'), obj.usuario.perfil.avatar)
+            if hasattr(obj.usuario, 'perfil'): return get_avatar_url(self.context.get('request'), obj.usuario.perfil, 'pequena')
         except Exception: pass
         return None
 
-class ResenhaSerializer(serializers.ModelSerializer):
+class ResenhaSerializer(SerializacaoMedida, serializers.ModelSerializer):
     usuario_nome = serializers.ReadOnlyField(source="usuario.username")
     usuario_id = serializers.ReadOnlyField(source="usuario.id")
     usuario_avatar = serializers.SerializerMethodField()
-    total_curtidas = serializers.SerializerMethodField()
     curtido_por_mim = serializers.SerializerMethodField()
     comentarios = serializers.SerializerMethodField()
     curtidores = serializers.SerializerMethodField() 
@@ -132,29 +186,66 @@ class ResenhaSerializer(serializers.ModelSerializer):
     class Meta: 
         model = Resenha
         fields = "__all__"
-        read_only_fields = ["usuario", "curtidas"]
+        read_only_fields = ["usuario", "curtidas", "total_curtidas", "total_comentarios", "versao", "livro"]
         
-    def get_total_curtidas(self, obj): return obj.curtidas.count()
     def get_curtido_por_mim(self, obj):
+        if hasattr(obj, 'curtido'): return obj.curtido
         req = self.context.get("request")
         return req.user.is_authenticated and obj.curtidas.filter(id=req.user.id).exists() if req else False
     def get_comentarios(self, obj):
-        qs = obj.comentarios.filter(parent=None).order_by('-data_criacao')
-        return ComentarioSerializer(qs, many=True, context=self.context).data
+        if 'comentarios' in getattr(obj, '_prefetched_objects_cache', {}):
+            todos = obj.comentarios.all()
+        else:
+            req = self.context.get('request')
+            todos = obj.comentarios.com_detalhes(req.user if req else None).order_by('-data_criacao')
+        raizes, filhos = agrupar_comentarios(todos)
+        arvore = {'resenhas': {obj.id}, 'filhos': filhos}
+        return ComentarioSerializer(raizes, many=True, context={**self.context, 'arvore': arvore}).data
     def get_usuario_avatar(self, obj):
         try:
-            if hasattr(obj.usuario, 'perfil'): return get_full_image_url(self.context.get('request'), obj.usuario.perfil.avatar)
+            if hasattr(obj.usuario, 'perfil'): return get_avatar_url(self.context.get('request'), obj.usuario.perfil, 'pequena')
         except Exception: pass
         return None
     
     def get_curtidores(self, obj):
-        curtidas = []
-        request = self.context.get('request')
-        for user in obj.curtidas.all():
-            avatar_url = None
-            try:
-                if hasattr(user, 'perfil') and user.perfil.avatar:
-                    avatar_url = get_full_image_url(request, user.perfil.avatar)
-            except Exception: pass
-            curtidas.append({'username': user.username, 'avatar': avatar_url})
-        return curtidas
+        return CurtidorSerializer(obj.curtidas.all(), many=True, context=self.context).data
+
+class CurtidorSerializer(SerializacaoMedida, serializers.ModelSerializer):
+    avatar = serializers.SerializerMethodField()
+    class Meta:
+        model = User
+        fields = ('username', 'avatar')
+
+    def get_avatar(self, obj):
+        try:
+            if hasattr(obj, 'perfil'): return get_avatar_url(self.context.get('request'), obj.perfil, 'pequena')
+        except Exception: pass
+        return None
+
+class ComentarioResumoSerializer(ComentarioSerializer):
+    total_replies = None
+    replies = None
+    class Meta(ComentarioSerializer.Meta):
+        fields = None
+        exclude = ["curtidas"]
+
+class ResenhaResumoSerializer(ResenhaSerializer):
+    curtidores = None
+    class Meta(ResenhaSerializer.Meta):
+        fields = None
+        exclude = ["curtidas"]
+
+    def get_comentarios(self, obj):
+        recentes = getattr(obj, 'comentarios_recentes', None)
+        if recentes is None:
+            req = self.context.get('request')
+            recentes = obj.comentarios.filter(parent=None).com_detalhes(req.user if req else None).prefetch_related(None).order_by('-data_criacao', '-id')[:settings.FEED_COMENTARIOS_RECENTES]
+        return ComentarioResumoSerializer(recentes, many=True, context=self.context).data
+
+class LivroSerializer(SerializacaoMedida, serializers.ModelSerializer):
+    autor_nome = serializers.ReadOnlyField(source='autor.nome')
+    media = serializers.ReadOnlyField()
+    histograma = serializers.ReadOnlyField()
+    class Meta:
+        model = Livro
+        fields = ['id', 'titulo', 'autor', 'autor_nome', 'url_imagem', 'total_resenhas', 'soma_notas', 'media', 'histograma']
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import threading
+from functools import lru_cache
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+class Assinatura:
+    def __init__(self, canal, tamanho):
+        self.canal, self.loop, self.fila = canal, asyncio.get_running_loop(), asyncio.Queue(maxsize=tamanho)
+
+    def entregar(self, evento):
+        if self.fila.full(): self.fila.get_nowait()
+        self.fila.put_nowait(evento)
+
+    async def proximo(self, timeout): return await asyncio.wait_for(self.fila.get(), timeout)
+
+class BrokerLocal:
+    def __init__(self):
+        self._lock, self._assinaturas = threading.Lock(), {}
+
+    def assinar(self, canal):
+        assinatura = Assinatura(canal, settings.TEMPO_REAL_FILA)
+        with self._lock: self._assinaturas.setdefault(canal, set()).add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            assinaturas = self._assinaturas.get(assinatura.canal, set())
+            assinaturas.discard(assinatura)
+            if not assinaturas: self._assinaturas.pop(assinatura.canal, None)
+
+    def publicar(self, canal, evento):
+        with self._lock: alvos = list(self._assinaturas.get(canal, ()))
+        for assinatura in alvos: assinatura.loop.call_soon_threadsafe(assinatura.entregar, evento)
+
+@lru_cache(maxsize=None)
+def get_broker(): return import_string(settings.TEMPO_REAL_BROKER)()
+
+def publicar(usuario_id, tipo, dados):
+    transaction.on_commit(lambda: get_broker().publicar(usuario_id, {'tipo': tipo, 'dados': dados}))
+
+def formatar(evento):
+    return f"event: {evento['tipo']}\ndata: {json.dumps(evento['dados'], cls=DjangoJSONEncoder)}\n\n"
+
+INGRESSO_SALT = 'resenhas.tempo_real.ingresso'
+
+def emitir_ingresso(usuario_id): return signing.dumps(usuario_id, salt=INGRESSO_SALT)
+
+async def autenticar(request):
+    ingresso = request.GET.get('ingresso')
+    if ingresso:
+        try: usuario_id = signing.loads(ingresso, salt=INGRESSO_SALT, max_age=settings.TEMPO_REAL_INGRESSO_TTL)
+        except signing.BadSignature: return None
+        return await User.objects.filter(pk=usuario_id, is_active=True).afirst()
+    auth = JWTAuthentication()
+    cabecalho = auth.get_header(request)
+    bruto = auth.get_raw_token(cabecalho) if cabecalho else None
+    if not bruto: return None
+    try:
+        token = auth.get_validated_token(bruto)
+        return await sync_to_async(auth.get_user)(token)
+    except (InvalidToken, TokenError):
+        return None
+
+async def stream_eventos(request):
+    usuario = await autenticar(request)
+    if usuario is None: return JsonResponse({'detail': 'Ingresso inválido, expirado ou ausente.'}, status=401)
+    broker = get_broker()
+    assinatura = broker.assinar(usuario.id)
+
+    async def eventos():
+        try:
+            yield f"retry: {settings.TEMPO_REAL_RETRY_MS}\n\n"
+            while True:
+                try: yield formatar(await assinatura.proximo(settings.TEMPO_REAL_KEEPALIVE))
+                except asyncio.TimeoutError: yield ": keep-alive\n\n"
+        finally:
+            broker.cancelar(assinatura)
+
+    return StreamingHttpResponse(eventos(), content_type='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -1,8 +1,32 @@
-﻿from django.test import TestCase
+﻿from django.test import TestCase, TransactionTestCase, override_settings
+from django.conf import settings
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth.models import User
-from .models import Resenha, Comentario, Mensagem, Notificacao, Perfil
+from io import BytesIO, StringIO
+import shutil
+import sqlite3
+import tempfile
+import json
+import threading
+import time
+from datetime import timedelta
+from django.utils import timezone
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.core.cache import cache
+from config import bancos, roteador
+from django.test.utils import CaptureQueriesContext
+from django.db.models import Sum
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from .models import Resenha, Comentario, Mensagem, Notificacao, Perfil, EventoNotificacao, Conversa, ConsultaLivro, Autor, Livro, Importacao, EntradaTimeline
+from . import avatares, benchmark, carga, exportacao, livros, notificacoes, tempo_real, timeline
+from .busca import ContainsBackend
+from .cache import CacheLRU
 
 class ReadListTests(TestCase):
     def setUp(self):
@@ -125,3 +149,1055 @@ class ReadListTests(TestCase):
         self.client.get("/api/mensagens/conversa/?user=visitante")
         self.client.post("/api/notificacoes/marcar_lidas/")
         str(self.resenha); str(self.owner.perfil)
+
+class FeedQueryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.users = [User.objects.create_user(username=f"leitor{i}", password="password123") for i in range(4)]
+        self.client.force_authenticate(user=self.users[0])
+
+    def criar_resenhas(self, n):
+        for i in range(n):
+            r = Resenha.objects.create(usuario=self.users[i % 4], titulo_livro=f"Livro {i}", autor_livro="Autor", nota=4, texto_resenha="Texto")
+            r.curtidas.add(*self.users)
+            raiz = Comentario.objects.create(usuario=self.users[1], resenha=r, texto="Raiz")
+            resposta = Comentario.objects.create(usuario=self.users[2], resenha=r, parent=raiz, texto="Resposta")
+            Comentario.objects.create(usuario=self.users[3], resenha=r, parent=resposta, texto="Resposta 2")
+            raiz.curtidas.add(self.users[0])
+        Resenha.objects.recalcular_contadores(); Comentario.objects.recalcular_contadores()
+
+    def test_feed_query_count_constant(self):
+        self.criar_resenhas(1)
+        with self.assertNumQueries(3):
+            self.client.get("/api/resenhas/")
+        with self.assertNumQueries(5):
+            self.client.get("/api/resenhas/?expand=1")
+        self.criar_resenhas(9)
+        with self.assertNumQueries(3):
+            resp = self.client.get("/api/resenhas/")
+        self.assertEqual(len(resp.data['results']), 10)
+        with self.assertNumQueries(5):
+            resp = self.client.get("/api/resenhas/?expand=1")
+        self.assertEqual(len(resp.data['results']), 10)
+
+    def test_feed_payload(self):
+        self.criar_resenhas(1)
+        item = self.client.get("/api/resenhas/?expand=1").data['results'][0]
+        self.assertEqual(item['total_curtidas'], 4)
+        self.assertTrue(item['curtido_por_mim'])
+        self.assertEqual(len(item['curtidores']), 4)
+        raiz = item['comentarios'][0]
+        self.assertEqual(len(item['comentarios']), 1)
+        self.assertEqual((raiz['total_curtidas'], raiz['curtido_por_mim']), (1, True))
+        self.assertEqual(raiz['replies'][0]['replies'][0]['texto'], "Resposta 2")
+
+    def test_compact_feed(self):
+        self.criar_resenhas(1)
+        r = Resenha.objects.get()
+        for i in range(5): Comentario.objects.create(usuario=self.users[0], resenha=r, texto=f"Extra {i}")
+        item = self.client.get("/api/resenhas/").data['results'][0]
+        self.assertNotIn('curtidores', item); self.assertNotIn('curtidas', item)
+        self.assertEqual((item['total_curtidas'], item['total_comentarios'], item['curtido_por_mim']), (4, 3, True))
+        self.assertEqual([c['texto'] for c in item['comentarios']], ["Extra 4", "Extra 3", "Extra 2"])
+        self.assertNotIn('replies', item['comentarios'][0])
+
+    def test_lazy_endpoints(self):
+        self.criar_resenhas(1)
+        r = Resenha.objects.get()
+        resp = self.client.get(f"/api/resenhas/{r.id}/curtidores/?page_size=3")
+        self.assertEqual([u['username'] for u in resp.data['results']], ["leitor3", "leitor2", "leitor1"])
+        resp = self.client.get(resp.data['next'])
+        self.assertEqual(([u['username'] for u in resp.data['results']], resp.data['next']), (["leitor0"], None))
+        resp = self.client.get(f"/api/resenhas/{r.id}/comentarios/")
+        self.assertEqual(len(resp.data['results']), 1)
+        self.assertEqual(resp.data['results'][0]['replies'][0]['texto'], "Resposta")
+
+    def test_retrieve_query_count(self):
+        self.criar_resenhas(1)
+        r = Resenha.objects.get()
+        with self.assertNumQueries(5):
+            self.client.get(f"/api/resenhas/{r.id}/")
+
+class ComentarioArvoreTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="leitor", password="password123")
+        self.client.force_authenticate(user=self.user)
+        self.resenha = Resenha.objects.create(usuario=self.user, titulo_livro="L", autor_livro="A", nota=3, texto_resenha="T")
+        self.raiz = Comentario.objects.create(usuario=self.user, resenha=self.resenha, texto="0")
+        pai = self.raiz
+        for i in range(1, 8):
+            pai = Comentario.objects.create(usuario=self.user, resenha=self.resenha, parent=pai, texto=str(i))
+        for i in range(5):
+            Comentario.objects.create(usuario=self.user, resenha=self.resenha, parent=self.raiz, texto=f"r{i}")
+
+    def profundidade(self, no):
+        return 1 + max((self.profundidade(r) for r in no['replies']), default=0)
+
+    def test_subtree_single_load(self):
+        with self.assertNumQueries(4):
+            resp = self.client.get(f"/api/comentarios/{self.raiz.id}/")
+        self.assertEqual(self.profundidade(resp.data), 8)
+        self.assertEqual(resp.data['total_replies'], 6)
+
+    @override_settings(COMENTARIOS_MAX_PROFUNDIDADE=3, COMENTARIOS_MAX_RESPOSTAS=2)
+    def test_tree_limits(self):
+        raiz = self.client.get(f"/api/resenhas/{self.resenha.id}/").data['comentarios'][0]
+        self.assertEqual(self.profundidade(raiz), 4)
+        self.assertEqual(len(raiz['replies']), 2)
+        self.assertEqual(raiz['total_replies'], 6)
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="leitor", password="password123")
+        self.outro = User.objects.create_user(username="outro", password="password123")
+        self.client.force_authenticate(user=self.user)
+        for i in range(25):
+            r = Resenha.objects.create(usuario=self.user, titulo_livro=f"L{i}", autor_livro="A", nota=1 + i % 5, texto_resenha="T")
+            Notificacao.objects.create(destinatario=self.user, remetente=self.outro, tipo='curtida', resenha=r)
+        Resenha.objects.update(data_criacao=Resenha.objects.first().data_criacao)
+
+    def percorrer(self, url):
+        ids = []
+        while url:
+            resp = self.client.get(url)
+            self.assertNotIn('count', resp.data)
+            ids += [item['id'] for item in resp.data['results']]
+            url = resp.data['next']
+        return ids
+
+    def test_feed_cursor_pages(self):
+        ids = self.percorrer("/api/resenhas/")
+        self.assertEqual(ids, sorted(Resenha.objects.values_list('id', flat=True), reverse=True))
+
+    def test_cursor_stable_with_new_items(self):
+        primeira = self.client.get("/api/resenhas/").data
+        Resenha.objects.create(usuario=self.user, titulo_livro="Nova", autor_livro="A", nota=5, texto_resenha="T")
+        segunda = self.client.get(primeira['next']).data
+        self.assertEqual(segunda['results'][0]['id'], primeira['results'][-1]['id'] - 1)
+
+    def test_notificacoes_cursor(self):
+        self.assertEqual(len(self.percorrer("/api/notificacoes/?page_size=7")), 25)
+
+    def test_page_number_fallback(self):
+        resp = self.client.get("/api/resenhas/?page=2")
+        self.assertEqual(resp.data['count'], 25)
+        resp = self.client.get("/api/resenhas/?ordering=-nota")
+        self.assertIn('count', resp.data)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get("/api/resenhas/?cursor=lixo").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_comentarios_por_resenha(self):
+        r = Resenha.objects.first()
+        raiz = Comentario.objects.create(usuario=self.user, resenha=r, texto="Raiz")
+        Comentario.objects.create(usuario=self.user, resenha=r, parent=raiz, texto="Resposta")
+        resp = self.client.get(f"/api/comentarios/?resenha={r.id}")
+        self.assertEqual([c['id'] for c in resp.data['results']], [raiz.id])
+
+class BuscaTextualTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="machado", password="password123")
+        self.client.force_authenticate(user=self.user)
+        self.dom = Resenha.objects.create(usuario=self.user, titulo_livro="Dom Casmurro", autor_livro="Machado de Assis", nota=5, texto_resenha="Capitu")
+        self.memorias = Resenha.objects.create(usuario=self.user, titulo_livro="Memórias Póstumas", autor_livro="Outro", nota=4, texto_resenha="Cita Dom Casmurro no texto")
+
+    def buscar(self, termo):
+        return [r['id'] for r in self.client.get(f"/api/resenhas/?search={termo}").data['results']]
+
+    def test_ranked_prefix_search(self):
+        self.assertEqual(self.buscar("casm"), [self.dom.id, self.memorias.id])
+        self.assertEqual(self.buscar("memorias"), [self.memorias.id])
+        self.assertEqual(self.buscar("inexistente"), [])
+
+    def test_index_follows_save_and_delete(self):
+        self.dom.titulo_livro = "Quincas Borba"; self.dom.save()
+        self.assertEqual(self.buscar("quincas"), [self.dom.id])
+        self.dom.delete()
+        self.assertEqual(self.buscar("quincas"), [])
+        self.user.username = "joaquim"; self.user.save()
+        self.assertEqual(self.buscar("joaquim"), [self.memorias.id])
+
+    def test_profile_edit_without_rename_skips_reindex(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.patch("/api/auth/me/", {"bio": "Bruxo"}).status_code, 200)
+            self.user.last_login = timezone.now(); self.user.save(update_fields=['last_login'])
+        self.assertFalse([q for q in ctx.captured_queries if 'resenha_fts' in q['sql']])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as c: c.execute("DELETE FROM resenhas_resenha_fts")
+        self.assertEqual(self.buscar("capitu"), [])
+        out = StringIO()
+        call_command("reindexar_busca", "--lote", "1", stdout=out)
+        self.assertIn("2 resenhas", out.getvalue())
+        self.assertEqual(self.buscar("capitu"), [self.dom.id])
+        self.assertEqual(list(ContainsBackend().filtrar(Resenha.objects.all(), "capitu")), [self.dom])
+
+class ContadoresTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create_user(username="dono", password="password123")
+        self.visitor = User.objects.create_user(username="visitante", password="password123")
+        self.resenha = Resenha.objects.create(usuario=self.owner, titulo_livro="L", autor_livro="A", nota=3, texto_resenha="T")
+        self.client.force_authenticate(user=self.visitor)
+
+    def test_actions_update_counters(self):
+        self.client.post(f"/api/resenhas/{self.resenha.id}/curtir/")
+        raiz = self.client.post(f"/api/resenhas/{self.resenha.id}/comentar/", {"texto": "Raiz"}, format='json').data
+        self.client.post(f"/api/resenhas/{self.resenha.id}/comentar/", {"texto": "R", "parent_id": raiz['id']}, format='json')
+        self.client.post(f"/api/comentarios/{raiz['id']}/curtir/")
+        self.resenha.refresh_from_db()
+        self.assertEqual((self.resenha.total_curtidas, self.resenha.total_comentarios), (1, 2))
+        self.assertEqual(Comentario.objects.get(pk=raiz['id']).total_curtidas, 1)
+        self.client.post(f"/api/resenhas/{self.resenha.id}/curtir/")
+        self.client.delete(f"/api/comentarios/{raiz['id']}/")
+        self.resenha.refresh_from_db()
+        self.assertEqual((self.resenha.total_curtidas, self.resenha.total_comentarios), (0, 0))
+
+    def test_edit_keeps_concurrent_counters(self):
+        carregada = Resenha.objects.get(pk=self.resenha.pk)
+        self.client.put(f"/api/resenhas/{self.resenha.id}/curtida/")
+        carregada.texto_resenha = "Editada"; carregada.save()
+        self.resenha.refresh_from_db()
+        self.assertEqual((self.resenha.total_curtidas, self.resenha.texto_resenha, self.resenha.versao), (1, "Editada", 2))
+        self.assertEqual(carregada.versao, 2)
+
+    def test_recalcular_command(self):
+        c = Comentario.objects.create(usuario=self.owner, resenha=self.resenha, texto="C")
+        self.resenha.curtidas.add(self.owner, self.visitor); c.curtidas.add(self.visitor)
+        Resenha.objects.update(total_curtidas=7)
+        Notificacao.objects.create(destinatario=self.owner, remetente=self.visitor, tipo='curtida', resenha=self.resenha)
+        Perfil.objects.update(notificacoes_nao_lidas=5)
+        call_command("recalcular_contadores", "--lote", "1", stdout=StringIO())
+        self.resenha.refresh_from_db(); c.refresh_from_db()
+        self.assertEqual((self.resenha.total_curtidas, self.resenha.total_comentarios, c.total_curtidas), (2, 1, 1))
+        self.assertEqual(dict(Perfil.objects.values_list('usuario__username', 'notificacoes_nao_lidas')), {"dono": 1, "visitante": 0})
+
+class FilaNotificacaoTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create_user(username="dono", password="password123")
+        self.visitor = User.objects.create_user(username="visitante", password="password123")
+        self.resenha = Resenha.objects.create(usuario=self.owner, titulo_livro="L", autor_livro="A", nota=3, texto_resenha="T")
+        self.client.force_authenticate(user=self.visitor)
+
+    def test_request_only_enqueues(self):
+        self.client.post(f"/api/resenhas/{self.resenha.id}/curtir/")
+        self.client.post(f"/api/resenhas/{self.resenha.id}/comentar/", {"texto": "Oi"}, format='json')
+        self.assertEqual((EventoNotificacao.objects.count(), Notificacao.objects.count()), (2, 0))
+        out = StringIO()
+        call_command("processar_notificacoes", "--uma-vez", "--lote", "1", stdout=out)
+        self.assertIn("0 pendentes", out.getvalue())
+        self.assertEqual(EventoNotificacao.objects.count(), 0)
+        self.assertEqual(sorted(Notificacao.objects.values_list('tipo', flat=True)), ['comentario', 'curtida'])
+
+    @override_settings(NOTIFICACOES_MAX_TENTATIVAS=2)
+    def test_retry_and_give_up(self):
+        notificacoes.enfileirar(self.visitor, self.owner, 'curtida', self.resenha)
+        with mock.patch.object(notificacoes, 'entregar', side_effect=RuntimeError("falhou")):
+            self.assertEqual(notificacoes.processar_lote(), 0)
+            self.assertEqual(notificacoes.processar_lote(), 0)
+        evento = EventoNotificacao.objects.get()
+        self.assertEqual((evento.tentativas, evento.erro), (2, "falhou"))
+        self.assertEqual(notificacoes.processar_lote(), 0)
+        self.assertEqual(notificacoes.atraso_fila()[0], 0)
+
+    def test_unread_count_badge(self):
+        for titulo in "XYZ":
+            resenha = Resenha.objects.create(usuario=self.owner, titulo_livro=titulo, autor_livro="A", nota=3, texto_resenha="T")
+            notificacoes.enfileirar(self.visitor, self.owner, 'curtida', resenha)
+        notificacoes.processar_lote()
+        self.client.force_authenticate(user=self.owner)
+        with self.assertNumQueries(1):
+            resp = self.client.get("/api/notificacoes/unread_count/")
+        self.assertEqual(resp.data, {'nao_lidas': 3})
+        resp = self.client.get("/api/notificacoes/unread_count/", HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        n = Notificacao.objects.first()
+        self.client.patch(f"/api/notificacoes/{n.id}/", {"lida": True}, format='json')
+        self.client.delete(f"/api/notificacoes/{Notificacao.objects.filter(lida=False).first().id}/")
+        self.assertEqual(self.client.get("/api/notificacoes/unread_count/").data, {'nao_lidas': 1})
+        self.client.post("/api/notificacoes/marcar_lidas/")
+        self.assertEqual(self.client.get("/api/notificacoes/unread_count/").data, {'nao_lidas': 0})
+
+    def test_cascade_delete_discounts_badge(self):
+        self.client.post(f"/api/resenhas/{self.resenha.id}/comentar/", {"texto": "Oi"}, format='json')
+        notificacoes.processar_lote()
+        self.client.force_authenticate(user=self.owner)
+        self.assertEqual(self.client.get("/api/notificacoes/unread_count/").data, {'nao_lidas': 1})
+        self.assertEqual(self.client.delete(f"/api/resenhas/{self.resenha.id}/").status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual((Notificacao.objects.count(), self.client.get("/api/notificacoes/unread_count/").data), (0, {'nao_lidas': 0}))
+
+class NotificacaoAgrupadaTests(TestCase):
+    def setUp(self):
+        self.autora = User.objects.create_user(username="autora", password="password123")
+        self.leitores = [User.objects.create_user(username=f"leitor{i}", password="password123") for i in range(4)]
+        self.resenha = Resenha.objects.create(usuario=self.autora, titulo_livro="L", autor_livro="A", nota=3, texto_resenha="T")
+        self.client = APIClient()
+
+    def nao_lidas(self): return Perfil.objects.get(usuario=self.autora).notificacoes_nao_lidas
+
+    def curtir(self, usuario):
+        self.client.force_authenticate(user=usuario)
+        return self.client.post(f"/api/resenhas/{self.resenha.id}/curtir/").data['status']
+
+    def test_likes_fold_into_one_row(self):
+        for leitor in self.leitores: self.curtir(leitor)
+        notificacoes.processar_lote(lote=2)
+        notificacoes.processar_lote(lote=2)
+        n = Notificacao.objects.get()
+        self.assertEqual((n.total_remetentes, n.remetente, n.ultimos_remetentes), (4, self.leitores[3], ["leitor3", "leitor2", "leitor1"]))
+        self.assertEqual(self.nao_lidas(), 1)
+        self.client.force_authenticate(user=self.autora)
+        dados = self.client.get("/api/notificacoes/").data['results'][0]
+        self.assertEqual((dados['remetente_nome'], dados['total_remetentes']), ("leitor3", 4))
+
+    def test_unlike_outside_recent_names_still_counts(self):
+        for leitor in self.leitores: self.curtir(leitor)
+        notificacoes.processar_lote()
+        self.assertEqual(self.curtir(self.leitores[0]), 'descurtido')
+        n = Notificacao.objects.get()
+        self.assertEqual((n.total_remetentes, n.remetente, n.ultimos_remetentes), (3, self.leitores[3], ["leitor3", "leitor2", "leitor1"]))
+
+    def test_read_row_reopens_and_window_splits(self):
+        self.curtir(self.leitores[0]); notificacoes.processar_lote()
+        self.client.force_authenticate(user=self.autora); self.client.post("/api/notificacoes/marcar_lidas/")
+        self.curtir(self.leitores[1]); notificacoes.processar_lote()
+        n = Notificacao.objects.get()
+        self.assertEqual((n.lida, n.total_remetentes, self.nao_lidas()), (False, 2, 1))
+        Notificacao.objects.update(inicio=timezone.now() - timedelta(days=2))
+        self.curtir(self.leitores[2]); notificacoes.processar_lote()
+        self.assertEqual(sorted(Notificacao.objects.values_list('total_remetentes', flat=True)), [1, 2])
+        self.assertEqual(self.nao_lidas(), 2)
+
+    def test_unlike_only_touches_group_with_actor(self):
+        self.curtir(self.leitores[0]); notificacoes.processar_lote()
+        Notificacao.objects.update(inicio=timezone.now() - timedelta(days=2))
+        self.curtir(self.leitores[1]); notificacoes.processar_lote()
+        self.assertEqual(self.curtir(self.leitores[0]), 'descurtido')
+        n = Notificacao.objects.get()
+        self.assertEqual((n.remetente, n.total_remetentes, self.nao_lidas()), (self.leitores[1], 1, 1))
+        self.assertEqual(self.curtir(self.leitores[2]), 'curtido'); notificacoes.processar_lote()
+        self.assertEqual(self.curtir(self.leitores[0]), 'curtido'); self.assertEqual(self.curtir(self.leitores[0]), 'descurtido')
+        n.refresh_from_db()
+        self.assertEqual((n.total_remetentes, n.ultimos_remetentes), (2, ["leitor2", "leitor1"]))
+
+    def test_repeat_comments_count_one_actor(self):
+        self.client.force_authenticate(user=self.leitores[0])
+        for texto in ("Um", "Dois"): self.client.post(f"/api/resenhas/{self.resenha.id}/comentar/", {"texto": texto}, format='json')
+        notificacoes.processar_lote()
+        self.client.post(f"/api/resenhas/{self.resenha.id}/comentar/", {"texto": "Três"}, format='json')
+        notificacoes.processar_lote()
+        n = Notificacao.objects.get()
+        self.assertEqual((n.tipo, n.total_remetentes, n.ultimos_remetentes, self.nao_lidas()), ('comentario', 1, ["leitor0"], 1))
+        self.client.force_authenticate(user=self.leitores[1])
+        self.client.post(f"/api/resenhas/{self.resenha.id}/comentar/", {"texto": "Outro"}, format='json')
+        notificacoes.processar_lote()
+        n.refresh_from_db()
+        self.assertEqual((n.total_remetentes, n.ultimos_remetentes), (2, ["leitor1", "leitor0"]))
+
+    def test_messages_stay_separate(self):
+        for _ in range(2): notificacoes.enfileirar(self.leitores[0], self.autora, 'mensagem')
+        notificacoes.processar_lote()
+        self.assertEqual((Notificacao.objects.count(), self.nao_lidas()), (2, 2))
+
+    def test_unlike_withdraws_actor(self):
+        self.curtir(self.leitores[0]); self.curtir(self.leitores[0])
+        self.assertEqual(EventoNotificacao.objects.count(), 0)
+        for leitor in self.leitores[:2]: self.curtir(leitor)
+        notificacoes.processar_lote()
+        self.assertEqual(self.curtir(self.leitores[1]), 'descurtido')
+        n = Notificacao.objects.get()
+        self.assertEqual((n.total_remetentes, n.remetente, n.ultimos_remetentes), (1, self.leitores[0], ["leitor0"]))
+        self.curtir(self.leitores[0])
+        self.assertEqual((Notificacao.objects.count(), self.nao_lidas()), (0, 0))
+
+    def test_prune_read_notifications(self):
+        antiga = timezone.now() - timedelta(days=100)
+        criar = lambda lida, data: Notificacao.objects.create(destinatario=self.autora, remetente=self.leitores[0], tipo='curtida', resenha=self.resenha, lida=lida, data=data, inicio=data)
+        alvos = [criar(True, antiga) for _ in range(3)]
+        pendente, recente = criar(False, antiga), criar(True, timezone.now())
+        with tempfile.NamedTemporaryFile('r', suffix='.ndjson') as arquivo:
+            out = StringIO()
+            call_command('podar_notificacoes', '--dias', '90', '--lote', '2', '--arquivo', arquivo.name, stdout=out)
+            arquivadas = [json.loads(linha) for linha in arquivo]
+        self.assertIn("3 notificações", out.getvalue())
+        self.assertEqual(sorted(a['id'] for a in arquivadas), [n.id for n in alvos])
+        self.assertEqual(set(Notificacao.objects.values_list('id', flat=True)), {pendente.id, recente.id})
+
+class CurtidaIdempotenteTests(TestCase):
+    def setUp(self):
+        self.autora = User.objects.create_user(username="autora", password="password123")
+        self.leitor = User.objects.create_user(username="leitor", password="password123")
+        self.resenha = Resenha.objects.create(usuario=self.autora, titulo_livro="L", autor_livro="A", nota=3, texto_resenha="T")
+        self.client = APIClient(); self.client.force_authenticate(user=self.leitor)
+        self.url = f"/api/resenhas/{self.resenha.id}/curtida/"
+
+    def test_put_and_delete_are_idempotent(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.put(self.url)
+        self.assertEqual(resp.data, {'curtido': True, 'total_curtidas': 1, 'alterado': True})
+        self.assertLessEqual(len([q for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]), 3)
+        self.assertEqual(self.client.put(self.url).data, {'curtido': True, 'total_curtidas': 1, 'alterado': False})
+        self.assertEqual(EventoNotificacao.objects.count(), 1)
+        versao = Resenha.objects.get(pk=self.resenha.pk).versao
+        self.assertEqual(self.client.delete(self.url).data, {'curtido': False, 'total_curtidas': 0, 'alterado': True})
+        self.assertEqual(self.client.delete(self.url).data, {'curtido': False, 'total_curtidas': 0, 'alterado': False})
+        self.assertEqual((EventoNotificacao.objects.count(), Resenha.objects.get(pk=self.resenha.pk).versao), (0, versao + 1))
+        self.assertEqual(self.client.put("/api/resenhas/999999/curtida/").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_comment_like_touches_review(self):
+        c = Comentario.objects.create(resenha=self.resenha, usuario=self.autora, texto="Oi")
+        versao = Resenha.objects.get(pk=self.resenha.pk).versao
+        self.assertEqual(self.client.put(f"/api/comentarios/{c.id}/curtida/").data['total_curtidas'], 1)
+        self.assertEqual(Resenha.objects.get(pk=self.resenha.pk).versao, versao + 1)
+        self.assertEqual(self.client.delete(f"/api/comentarios/{c.id}/curtida/").data['total_curtidas'], 0)
+        self.assertEqual(self.client.post("/api/comentarios/abc/curtir/").status_code, status.HTTP_404_NOT_FOUND)
+
+class CurtidaConcorrenteTests(TransactionTestCase):
+    def em_arquivo(self):
+        memoria, pasta = connection.settings_dict['NAME'], tempfile.mkdtemp()
+        guarda, destino = sqlite3.connect(memoria, uri=True), sqlite3.connect(f"{pasta}/curtidas.sqlite3")
+        guarda.backup(destino); destino.close()
+        connections.settings['default']['NAME'] = f"{pasta}/curtidas.sqlite3"; connection.close()
+        def restaurar():
+            connection.close(); connections.settings['default']['NAME'] = memoria; connection.ensure_connection(); guarda.close(); shutil.rmtree(pasta, True)
+        self.addCleanup(restaurar)
+
+    def test_hot_review_under_many_threads(self):
+        autora = User.objects.create_user(username="autora", password="password123")
+        leitores = [User.objects.create_user(username=f"leitor{i}", password="password123") for i in range(8)]
+        resenha = Resenha.objects.create(usuario=autora, titulo_livro="L", autor_livro="A", nota=3, texto_resenha="T")
+        url, erros = f"/api/resenhas/{resenha.id}/curtida/", []
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db(): self.em_arquivo()
+        def martelar(leitor):
+            client = APIClient(); client.force_authenticate(user=leitor)
+            try:
+                for i in range(10):
+                    resp = client.put(url) if i % 3 else client.delete(url)
+                    if resp.status_code != 200: erros.append(resp.status_code)
+                client.put(url); client.put(url)
+            except Exception as exc: erros.append(exc)
+            finally: connections.close_all()
+        threads = [threading.Thread(target=martelar, args=(leitor,)) for leitor in leitores]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        resenha.refresh_from_db()
+        self.assertEqual(erros, [])
+        self.assertEqual((resenha.total_curtidas, resenha.curtidas.count()), (8, 8))
+        self.assertEqual(EventoNotificacao.objects.filter(resenha=resenha).count(), 8)
+
+class TempoRealTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create_user(username="dono", password="password123")
+        self.visitor = User.objects.create_user(username="visitante", password="password123")
+        self.client.force_authenticate(user=self.visitor)
+
+    async def test_stream_delivers_events(self):
+        from django.test import AsyncRequestFactory
+        self.client.force_authenticate(user=self.owner)
+        ingresso = (await sync_to_async(self.client.post)("/api/eventos/ingresso/")).data['ingresso']
+        request = AsyncRequestFactory().get("/api/eventos/", {"ingresso": ingresso})
+        resp = await tempo_real.stream_eventos(request)
+        self.assertEqual(resp['Content-Type'], 'text/event-stream')
+        eventos = resp.streaming_content
+        self.assertTrue((await anext(eventos)).startswith(b"retry:"))
+        tempo_real.get_broker().publicar(self.owner.id, {'tipo': 'mensagem', 'dados': {'texto': 'Oi'}})
+        self.assertEqual(await anext(eventos), b'event: mensagem\ndata: {"texto": "Oi"}\n\n')
+        await eventos.aclose()
+
+    async def test_broker_local(self):
+        broker = tempo_real.BrokerLocal()
+        assinatura = broker.assinar(7)
+        for i in range(3): broker.publicar(7, {'n': i})
+        self.assertEqual(await assinatura.proximo(1), {'n': 0})
+        broker.cancelar(assinatura)
+        self.assertEqual(broker._assinaturas, {})
+
+    async def test_stream_requires_ticket(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        from django.test import AsyncRequestFactory
+        expirado = tempo_real.emitir_ingresso(self.owner.id)
+        with override_settings(TEMPO_REAL_INGRESSO_TTL=-1):
+            resp = await tempo_real.stream_eventos(AsyncRequestFactory().get("/api/eventos/", {"ingresso": expirado}))
+        self.assertEqual(resp.status_code, 401)
+        for params in ({"ingresso": "lixo"}, {"token": str(AccessToken.for_user(self.owner))}):
+            resp = await tempo_real.stream_eventos(AsyncRequestFactory().get("/api/eventos/", params))
+            self.assertEqual(resp.status_code, 401)
+
+    def test_publish_after_commit(self):
+        with mock.patch.object(tempo_real, 'get_broker') as broker, self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/mensagens/", {"destinatario_username": "dono", "texto": "Oi"}, format='json')
+        tipos = [c.args[1]['tipo'] for c in broker.return_value.publicar.call_args_list]
+        self.assertEqual(sorted(tipos), ['mensagem', 'notificacao'])
+        self.assertTrue(all(c.args[0] == self.owner.id for c in broker.return_value.publicar.call_args_list))
+
+class ConversaTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.a = User.objects.create_user(username="ana", password="password123")
+        self.b = User.objects.create_user(username="bia", password="password123")
+        self.c = User.objects.create_user(username="caio", password="password123")
+        self.ids = [Mensagem.objects.create(remetente=(self.a, self.b)[i % 2], destinatario=(self.b, self.a)[i % 2], texto=str(i)).id for i in range(8)]
+        Mensagem.objects.create(remetente=self.c, destinatario=self.a, texto="outra conversa")
+        self.client.force_authenticate(user=self.a)
+
+    def ids_de(self, url): return [m['id'] for m in self.client.get(url).data]
+
+    def test_latest_page_and_before(self):
+        with self.assertNumQueries(3):
+            resp = self.client.get("/api/mensagens/conversa/?user=bia&limite=3")
+        self.assertEqual([m['id'] for m in resp.data], self.ids[-3:])
+        self.assertEqual([m['eh_minha'] for m in resp.data], [False, True, False])
+        self.assertEqual(self.ids_de(f"/api/mensagens/conversa/?user=bia&limite=3&before_id={self.ids[-3]}"), self.ids[2:5])
+
+    def test_since_id(self):
+        self.assertEqual(self.ids_de(f"/api/mensagens/conversa/?user=bia&since_id={self.ids[5]}"), self.ids[6:])
+        self.assertEqual(self.ids_de("/api/mensagens/conversa/?user=ninguem"), [])
+        self.assertEqual(self.client.get("/api/mensagens/conversa/?user=bia&since_id=x").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_inbox_summary(self):
+        with self.assertNumQueries(1):
+            resp = self.client.get("/api/mensagens/inbox/")
+        linhas = resp.data['results']
+        self.assertEqual([c['correspondente_nome'] for c in linhas], ["caio", "bia"])
+        self.assertEqual((linhas[0]['ultima_mensagem']['texto'], linhas[0]['nao_lidas']), ("outra conversa", 1))
+        self.assertEqual((linhas[1]['ultima_mensagem']['id'], linhas[1]['nao_lidas']), (self.ids[-1], 4))
+        self.client.get("/api/mensagens/conversa/?user=caio")
+        self.client.post("/api/mensagens/", {"destinatario_username": "bia", "texto": "nova"}, format='json')
+        linhas = self.client.get("/api/mensagens/inbox/?page_size=1").data['results']
+        self.assertEqual((linhas[0]['correspondente_nome'], linhas[0]['ultima_mensagem']['eh_minha']), ("bia", True))
+        self.assertEqual(Conversa.objects.get(usuario=self.a, correspondente=self.c).nao_lidas, 0)
+        self.assertEqual(Conversa.objects.get(usuario=self.b, correspondente=self.a).nao_lidas, 5)
+        Mensagem.objects.filter(texto="nova").delete()
+        self.assertEqual(Conversa.objects.get(usuario=self.b, correspondente=self.a).ultima_mensagem_id, self.ids[-1])
+
+class CondicionalTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create_user(username="dono", password="password123")
+        self.visitor = User.objects.create_user(username="visitante", password="password123")
+        self.resenha = Resenha.objects.create(usuario=self.owner, titulo_livro="L", autor_livro="A", nota=3, texto_resenha="T")
+        self.client.force_authenticate(user=self.visitor)
+
+    def assert_revalida(self, url, mudar):
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        mudar()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_feed_and_review(self):
+        self.assert_revalida("/api/resenhas/", lambda: self.client.post(f"/api/resenhas/{self.resenha.id}/curtir/"))
+        self.assert_revalida(f"/api/resenhas/{self.resenha.id}/", lambda: self.client.post(f"/api/resenhas/{self.resenha.id}/comentar/", {"texto": "Oi"}, format='json'))
+        c = Comentario.objects.get()
+        self.assert_revalida(f"/api/resenhas/{self.resenha.id}/", lambda: self.client.post(f"/api/comentarios/{c.id}/curtir/"))
+        self.assert_revalida("/api/resenhas/", lambda: self.resenha.delete())
+
+    def renomear_autor(self, nome):
+        self.client.force_authenticate(user=self.owner)
+        self.assertEqual(self.client.patch("/api/auth/me/", {"username": nome}, format='json').status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(user=self.visitor)
+
+    def test_author_rename_revalidates(self):
+        Notificacao.objects.create(destinatario=self.visitor, remetente=self.owner, tipo='curtida', resenha=self.resenha)
+        self.assert_revalida("/api/resenhas/", lambda: self.renomear_autor("dona"))
+        self.assertEqual(self.client.get("/api/resenhas/").data['results'][0]['usuario_nome'], "dona")
+        self.assert_revalida(f"/api/resenhas/{self.resenha.id}/", lambda: self.renomear_autor("senhora"))
+        self.assert_revalida("/api/notificacoes/", lambda: self.renomear_autor("madame"))
+        self.resenha.titulo_livro = "Outro"
+        self.assert_revalida("/api/notificacoes/", self.resenha.save)
+        self.assertEqual(self.client.get("/api/notificacoes/").data['results'][0]['titulo_resenha'], "Outro")
+
+    def test_profiles_and_notifications(self):
+        self.assert_revalida("/api/auth/me/", lambda: self.client.patch("/api/auth/me/", {"bio": "Nova"}, format='json'))
+        self.assert_revalida("/api/auth/profile/dono/", lambda: Perfil.objects.get(usuario=self.owner).save())
+        Notificacao.objects.create(destinatario=self.visitor, remetente=self.owner, tipo='curtida', resenha=self.resenha)
+        self.assert_revalida("/api/notificacoes/", lambda: self.client.post("/api/notificacoes/marcar_lidas/"))
+
+class AvatarMiniaturaTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, True)
+        ajuste = override_settings(MEDIA_ROOT=self.media); ajuste.enable(); self.addCleanup(ajuste.disable)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="leitora", password="password123")
+        Resenha.objects.create(usuario=self.user, titulo_livro="L", autor_livro="A", nota=3, texto_resenha="T")
+        self.client.force_authenticate(user=self.user)
+
+    def enviar_avatar(self, user):
+        buffer = BytesIO(); Image.new('RGB', (640, 400), 'teal').save(buffer, 'PNG')
+        self.client.force_authenticate(user=user)
+        with mock.patch.object(avatares.executor, 'submit') as submit, self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.patch("/api/auth/me/", {"avatar": SimpleUploadedFile("foto.png", buffer.getvalue(), content_type="image/png")}, format='multipart')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        submit.assert_called_once_with(avatares._processar, user.perfil.id)
+        return avatares.gerar_miniaturas(user.perfil.id)
+
+    def test_thumbnails_generated_and_served_per_context(self):
+        miniaturas = self.enviar_avatar(self.user)
+        self.assertEqual(set(miniaturas), set(settings.AVATAR_MINIATURAS))
+        with Image.open(f"{self.media}/{miniaturas['pequena']}") as img: self.assertEqual(img.size, (48, 48))
+        self.assertEqual(Perfil.objects.get(usuario=self.user).miniaturas, miniaturas)
+        self.assertTrue(self.client.get("/api/resenhas/").data['results'][0]['usuario_avatar'].endswith(miniaturas['pequena']))
+        self.assertTrue(self.client.get("/api/auth/profile/leitora/").data['perfil']['avatar'].endswith(miniaturas['grande']))
+        outra = User.objects.create_user(username="outra", password="password123")
+        self.assertEqual(self.enviar_avatar(outra), miniaturas)
+
+    def test_media_cache_headers_and_ranges(self):
+        url = "/media/" + self.enviar_avatar(self.user)['media']
+        resp = self.client.get(url)
+        corpo = b''.join(resp.streaming_content)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIn('immutable', resp['Cache-Control'])
+        self.assertEqual((resp['Accept-Ranges'], resp['Content-Type']), ('bytes', 'image/webp'))
+        resp = self.client.get(url, HTTP_RANGE="bytes=0-9")
+        self.assertEqual((resp.status_code, b''.join(resp.streaming_content)), (206, corpo[:10]))
+        self.assertEqual(resp['Content-Range'], f"bytes 0-9/{len(corpo)}")
+        self.assertEqual(b''.join(self.client.get(url, HTTP_RANGE="bytes=-5").streaming_content), corpo[-5:])
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f"bytes={len(corpo)}-").status_code, 416)
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"outra"').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=resp['ETag']).status_code, 304)
+        self.assertEqual(self.client.get("/media/../config/settings.py").status_code, 404)
+
+class PerfilBundleTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.ana = User.objects.create_user(username="ana", email="ana@x.com", password="password123")
+        self.bia = User.objects.create_user(username="bia", password="password123")
+        self.resenhas = [Resenha.objects.create(usuario=self.bia, titulo_livro=f"L{i}", autor_livro="A", nota=1 + i % 5, texto_resenha="T") for i in range(12)]
+        Resenha.objects.create(usuario=self.ana, titulo_livro="Outra", autor_livro="A", nota=5, texto_resenha="Resenha citando bia")
+        Resenha.objects.filter(pk=self.resenhas[0].pk).update(total_curtidas=3)
+        self.msgs = [Mensagem.objects.create(remetente=(self.ana, self.bia)[i % 2], destinatario=(self.bia, self.ana)[i % 2], texto=str(i)).id for i in range(4)]
+        Conversa.objects.filter(usuario=self.ana, correspondente=self.bia).update(nao_lidas=2)
+        timeline.seguir(self.ana, self.bia)
+        self.client.force_authenticate(user=self.ana)
+
+    def test_other_profile_bundle(self):
+        with CaptureQueriesContext(connection) as ctx:
+            dados = self.client.get("/api/auth/profile/bia/bundle/").data
+        self.assertLessEqual(len(ctx.captured_queries), 9)
+        self.assertEqual((dados['eu']['username'], dados['proprio'], dados['usuario']['username'], dados['usuario']['seguindo']), ("ana", False, "bia", True))
+        self.assertEqual([r['id'] for r in dados['resenhas']['results']], [r.id for r in self.resenhas[::-1][:10]])
+        self.assertEqual(dados['estatisticas'], {'total_resenhas': 12, 'total_curtidas': 3, 'media_nota': 2.75})
+        self.assertEqual([m['id'] for m in dados['conversa']], self.msgs)
+        self.assertEqual(Conversa.objects.get(usuario=self.ana).nao_lidas, 0)
+        resto = self.client.get(dados['resenhas']['next']).data
+        self.assertEqual([r['id'] for r in resto['results']], [self.resenhas[1].id, self.resenhas[0].id])
+        Resenha.objects.create(usuario=self.bia, titulo_livro="Nova", autor_livro="A", nota=3, texto_resenha="T")
+        with CaptureQueriesContext(connection) as mais:
+            self.client.get("/api/auth/profile/bia/bundle/")
+        self.assertEqual(len(mais.captured_queries), len(ctx.captured_queries))
+
+    def test_own_bundle_and_missing_user(self):
+        dados = self.client.get("/api/auth/me/bundle/").data
+        self.assertEqual((dados['proprio'], dados['usuario']['email'], dados['conversa'], dados['estatisticas']['total_resenhas']), (True, "ana@x.com", [], 1))
+        self.assertEqual(self.client.get("/api/auth/profile/ana/bundle/").data['proprio'], True)
+        self.assertEqual(self.client.get("/api/auth/profile/ninguem/bundle/").status_code, status.HTTP_404_NOT_FOUND)
+
+class ClienteFake:
+    def __init__(self): self.chamadas = []
+    def buscar(self, termo):
+        self.chamadas.append(termo)
+        return [{'id': f'fake-{i}', 'titulo': f'{termo.title()} {i}', 'autores': ['Autor Fake'], 'capa': '', 'miniatura': ''} for i in range(3)]
+
+class LivroBuscaTests(TestCase):
+    def setUp(self):
+        livros.get_memoria.cache_clear()
+        self.cliente = ClienteFake()
+        patcher = mock.patch.object(livros, 'get_cliente', return_value=self.cliente)
+        patcher.start(); self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username="leitor", password="password123"))
+
+    def test_two_tier_cache(self):
+        resp = self.client.get("/api/livros/busca/", {"q": "  Dom   Casmurro "})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['results'][0]['titulo'], "Dom Casmurro 0")
+        with self.assertNumQueries(0):
+            self.client.get("/api/livros/busca/", {"q": "dom casmurro"})
+        livros.get_memoria.cache_clear()
+        self.client.get("/api/livros/busca/", {"q": "DOM CASMURRO"})
+        self.assertEqual(self.cliente.chamadas, ["dom casmurro"])
+        ConsultaLivro.objects.update(atualizado_em=timezone.now() - timedelta(days=30))
+        livros.get_memoria.cache_clear()
+        self.client.get("/api/livros/busca/", {"q": "dom casmurro"})
+        self.assertEqual(len(self.cliente.chamadas), 2)
+        self.assertEqual(self.client.get("/api/livros/busca/", {"q": "d"}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_client_failure_serves_stale_or_503(self):
+        ConsultaLivro.objects.create(termo="velho", resultados=[{"id": "1"}], atualizado_em=timezone.now() - timedelta(days=30))
+        with mock.patch.object(self.cliente, 'buscar', side_effect=OSError):
+            self.assertEqual(self.client.get("/api/livros/busca/", {"q": "velho"}).data['results'], [{"id": "1"}])
+            self.assertEqual(self.client.get("/api/livros/busca/", {"q": "novo"}).status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_concurrent_identical_queries_are_coalesced(self):
+        coalescedor, liberar, chamadas, resultados = livros.Coalescedor(), threading.Event(), [], []
+        def lenta(): chamadas.append(1); liberar.wait(5); return ['ok']
+        threads = [threading.Thread(target=lambda: resultados.append(coalescedor.executar('termo', lenta))) for _ in range(5)]
+        for t in threads: t.start()
+        time.sleep(0.2); liberar.set()
+        for t in threads: t.join()
+        self.assertEqual((len(chamadas), resultados), (1, [['ok']] * 5))
+
+    def test_lru_evicts_and_expires(self):
+        cache, agora = CacheLRU(2, 60), time.monotonic()
+        cache.set('a', 1); cache.set('b', 2); cache.get('a'); cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+        with mock.patch('resenhas.cache.time.monotonic', return_value=agora + 120):
+            self.assertIsNone(cache.get('a'))
+
+class LivroCatalogoTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="leitor", password="password123")
+        self.client.force_authenticate(user=self.user)
+
+    def criar(self, titulo, autor, nota):
+        resp = self.client.post("/api/resenhas/", {"titulo_livro": titulo, "autor_livro": autor, "nota": nota, "texto_resenha": "T"}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        return resp.data['id']
+
+    def assert_agregados(self, livro, total, soma, histograma):
+        livro.refresh_from_db()
+        self.assertEqual((livro.total_resenhas, livro.soma_notas, livro.histograma), (total, soma, {i: histograma.get(i, 0) for i in range(1, 6)}))
+
+    def test_aggregates_follow_create_edit_delete(self):
+        a = self.criar("Dom Casmurro", "Machado de Assis", 4)
+        b = self.criar("dom  casmurro", "MACHADO DE ASSÍS", 2)
+        livro = Livro.objects.get()
+        self.assertEqual(Resenha.objects.filter(livro=livro).count(), 2)
+        self.assert_agregados(livro, 2, 6, {4: 1, 2: 1})
+        self.assertEqual(livro.media, 3.0)
+        self.client.patch(f"/api/resenhas/{b}/", {"nota": 5}, format='json')
+        self.assert_agregados(livro, 2, 9, {4: 1, 5: 1})
+        self.client.patch(f"/api/resenhas/{b}/", {"titulo_livro": "Quincas Borba"}, format='json')
+        self.assert_agregados(livro, 1, 4, {4: 1})
+        self.assertEqual(Autor.objects.count(), 1)
+        self.client.delete(f"/api/resenhas/{a}/")
+        self.assert_agregados(livro, 0, 0, {})
+        outro = Livro.objects.get(titulo="Quincas Borba")
+        self.assertEqual(self.client.get("/api/livros/").data['results'][0]['histograma'], {1: 0, 2: 0, 3: 0, 4: 0, 5: 1})
+        self.assertEqual([r['id'] for r in self.client.get("/api/resenhas/", {"livro": outro.id}).data['results']], [b])
+
+    def test_batched_dedupe_command(self):
+        for titulo, autor, nota in [("Dom Casmurro", "Machado", 5), ("DOM CASMURRO", "machado", 3), ("Iracema", "Alencar", 4)]: self.criar(titulo, autor, nota)
+        Livro.objects.all().delete(); Autor.objects.all().delete()
+        self.assertEqual(Resenha.objects.filter(livro=None).count(), 3)
+        call_command('catalogar_livros', lote=2, stdout=StringIO())
+        self.assertFalse(Resenha.objects.filter(livro=None).exists())
+        self.assert_agregados(Livro.objects.get(chave="machado/dom-casmurro"), 2, 8, {5: 1, 3: 1})
+        self.assertEqual((Livro.objects.count(), Autor.objects.count()), (2, 2))
+
+class ExportacaoImportacaoTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username="admin", password="password123", is_staff=True)
+        self.autora = User.objects.create_user(username="autora", password="password123")
+        self.r1 = Resenha.objects.create(usuario=self.autora, titulo_livro="Dom Casmurro", autor_livro="Machado", nota=5, texto_resenha="Ótimo")
+        self.r2 = Resenha.objects.create(usuario=self.admin, titulo_livro="Iracema", autor_livro="Alencar", nota=3, texto_resenha="Bom")
+        raiz = Comentario.objects.create(usuario=self.admin, resenha=self.r1, texto="Concordo")
+        Comentario.objects.create(usuario=self.autora, resenha=self.r1, parent=raiz, texto="Obrigada")
+        self.r1.curtidas.add(self.admin, self.autora); raiz.curtidas.add(self.autora)
+
+    def exportar(self):
+        self.client.force_authenticate(user=self.autora)
+        self.assertEqual(self.client.get("/api/admin/exportar/").status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.admin)
+        resp = self.client.get("/api/admin/exportar/")
+        self.assertEqual((resp.status_code, resp['Content-Type']), (200, 'application/x-ndjson'))
+        return b''.join(resp.streaming_content).decode().splitlines(keepends=True)
+
+    def test_round_trip_with_validation(self):
+        linhas = self.exportar()
+        self.assertEqual([json.loads(l)['tipo'] for l in linhas].count('curtida'), 2)
+        invalida = json.dumps({"tipo": "resenha", "id": 99, "usuario": "nova", "titulo_livro": "X", "autor_livro": "Y", "url_imagem": None, "texto_resenha": "palavra " * 501, "nota": 4, "data_criacao": "2024-01-01T00:00:00Z"}) + "\n"
+        datas = dict(Resenha.objects.values_list('titulo_livro', 'data_criacao'))
+        Resenha.objects.all().delete()
+        importador = exportacao.Importador("teste", lote=1)
+        self.assertEqual(importador.importar([invalida] + linhas), {'resenha': 2, 'comentario': 2, 'curtida': 2, 'curtida_comentario': 1})
+        self.assertEqual([n for n, _ in importador.erros], [1])
+        r1 = Resenha.objects.get(titulo_livro="Dom Casmurro")
+        self.assertEqual((r1.total_comentarios, r1.total_curtidas, r1.data_criacao), (2, 2, datas["Dom Casmurro"]))
+        self.assertEqual(Comentario.objects.get(texto="Obrigada").parent, Comentario.objects.get(texto="Concordo"))
+        self.assertEqual(Comentario.objects.get(texto="Concordo").total_curtidas, 1)
+        self.assertEqual(r1.livro.total_resenhas, 1)
+
+    def test_import_resumes_from_checkpoint(self):
+        arquivo = f"{tempfile.mkdtemp()}/resenhas.ndjson"
+        self.addCleanup(shutil.rmtree, arquivo.rsplit('/', 1)[0], True)
+        call_command('exportar_resenhas', saida=arquivo)
+        Resenha.objects.all().delete()
+        with mock.patch.object(exportacao.Importador, 'importar_comentario', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            call_command('importar_resenhas', arquivo, lote=1, stdout=StringIO())
+        self.assertEqual((Resenha.objects.count(), Importacao.objects.get().linha), (2, 2))
+        out = StringIO()
+        call_command('importar_resenhas', arquivo, lote=1, stdout=out)
+        self.assertIn("Retomando após a linha 2", out.getvalue())
+        self.assertEqual((Resenha.objects.count(), Comentario.objects.count(), Resenha.curtidas.through.objects.count()), (2, 2, 2))
+
+class CargaBenchmarkTests(TestCase):
+    parametros = dict(seed=7, usuarios=8, resenhas=20, comentarios=60, profundidade=6, conversas=2, mensagens=10, stdout=StringIO())
+
+    def retrato(self):
+        return list(Resenha.objects.order_by('id').values_list('usuario__username', 'titulo_livro', 'nota', 'total_curtidas', 'total_comentarios'))
+
+    def test_seed_is_deterministic(self):
+        call_command('seed_readlist', **self.parametros)
+        primeiro = self.retrato()
+        self.assertTrue(Comentario.objects.filter(parent__parent__parent__isnull=False).exists())
+        self.assertTrue(Conversa.objects.exists())
+        self.assertEqual(Livro.objects.aggregate(n=Sum('total_resenhas'))['n'], 20)
+        call_command('seed_readlist', limpar=True, **self.parametros)
+        self.assertEqual(self.retrato(), primeiro)
+
+    def test_benchmark_compares_with_baseline(self):
+        call_command('seed_readlist', **self.parametros)
+        pasta = tempfile.mkdtemp(); self.addCleanup(shutil.rmtree, pasta, True)
+        baseline = f"{pasta}/baseline.json"
+        call_command('benchmark_readlist', banco_atual=True, repeticoes=3, endpoints=['feed', 'inbox'], baseline=baseline, salvar=True, stdout=StringIO())
+        base = json.load(open(baseline))
+        self.assertEqual(set(base), {'feed', 'inbox'})
+        self.assertEqual(base['inbox']['consultas'], 1)
+        base['feed']['consultas'] -= 1
+        self.assertEqual(benchmark.comparar(base, base), [])
+        self.assertEqual(benchmark.comparar({**base, 'timeline': base['feed']}, base), ["timeline: sem linha de base; grave com --salvar"])
+        self.assertEqual(benchmark.comparar({'feed': {**base['feed'], 'consultas': base['feed']['consultas'] + 1}}, base), [f"feed.consultas: {base['feed']['consultas']} -> {base['feed']['consultas'] + 1}"])
+        json.dump(base, open(baseline, 'w'))
+        with self.assertRaisesMessage(CommandError, 'feed.consultas'):
+            call_command('benchmark_readlist', banco_atual=True, repeticoes=3, endpoints=['feed'], baseline=baseline, tolerancia=100, stdout=StringIO())
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        User.objects.create_user(username="leitor", password="password123")
+        token = self.client.post("/api/auth/login/", {"username": "leitor", "password": "password123"}, format='json').data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_server_timing_and_prometheus_histograms(self):
+        resp = self.client.get("/api/resenhas/")
+        for etapa in ('db;dur=', 'autenticacao;dur=', 'renderizacao;dur=', 'resposta;desc=', 'total;dur='): self.assertIn(etapa, resp['Server-Timing'])
+        self.assertIn('serializacao;dur=', self.client.get("/api/auth/me/")['Server-Timing'])
+        texto = self.client.get("/api/metrics/").content.decode()
+        self.assertIn('# TYPE readlist_consultas histogram', texto)
+        self.assertIn('readlist_requisicao_segundos_count{view="resenha-list",metodo="GET",status="2xx"}', texto)
+        self.assertIn('readlist_consultas_bucket{view="resenha-list",metodo="GET",status="2xx",le="+Inf"}', texto)
+        self.assertEqual(self.client.get("/api/metrics/", REMOTE_ADDR="10.0.0.1").status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(METRICAS_ORCAMENTO_CONSULTAS=1)
+    def test_query_budget_warning_lists_sql(self):
+        with self.assertLogs('resenhas.metricas', 'WARNING') as logs:
+            self.client.get("/api/resenhas/")
+        self.assertIn("GET /api/resenhas/ executou", logs.output[0])
+        self.assertIn("1x SELECT", logs.output[0])
+
+class AutenticacaoCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="leitor", password="password123")
+        token = self.client.post("/api/auth/login/", {"username": "leitor", "password": "password123"}, format='json').data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def consultas_usuario(self):
+        with CaptureQueriesContext(connection) as capturadas: resp = self.client.get("/api/auth/me/")
+        return resp, sum('"auth_user"."password"' in q['sql'] for q in capturadas)
+
+    def test_user_and_profile_served_from_cache_until_invalidated(self):
+        self.assertEqual(self.consultas_usuario()[1], 1)
+        self.assertEqual(self.consultas_usuario()[1], 0)
+        self.client.patch("/api/auth/me/", {"bio": "Nova bio"}, format='json')
+        resp, n = self.consultas_usuario()
+        self.assertEqual((resp.data['perfil']['bio'], n), ("Nova bio", 1))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db(); self.user.save()
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_CACHE_ATIVO=False)
+    def test_cache_can_be_disabled(self):
+        self.consultas_usuario()
+        self.assertGreaterEqual(self.consultas_usuario()[1], 1)
+
+class ReplicaTests(TransactionTestCase):
+    databases = {'default', 'replica_teste'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pasta = tempfile.mkdtemp()
+        connections.settings['replica_teste'] = {**connections.settings['default'], **bancos.sqlite(f"{cls.pasta}/replica.sqlite3", 0, 1000, replica=True)}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica_teste'].close(); del connections['replica_teste']; del connections.settings['replica_teste']
+        shutil.rmtree(cls.pasta, True)
+
+    def setUp(self):
+        ajuste = override_settings(DATABASE_REPLICAS=['replica_teste']); ajuste.enable(); self.addCleanup(ajuste.disable)
+        cache.clear()
+        self.client = APIClient()
+        self.autora = User.objects.create_user(username="autora", password="password123")
+        self.leitor = User.objects.create_user(username="leitor", password="password123")
+        Resenha.objects.create(usuario=self.autora, titulo_livro="Antiga", autor_livro="A", nota=3, texto_resenha="T")
+        roteador.sincronizar_sqlite('default', 'replica_teste')
+        Resenha.objects.create(usuario=self.autora, titulo_livro="Recente", autor_livro="A", nota=4, texto_resenha="T")
+
+    def titulos(self, user):
+        self.client.force_authenticate(user=user)
+        return sorted(r['titulo_livro'] for r in self.client.get("/api/resenhas/").data['results'])
+
+    def test_safe_reads_use_replica_until_user_writes(self):
+        self.assertEqual(self.titulos(self.leitor), ["Antiga"])
+        with self.assertRaises(Exception):
+            with connections['replica_teste'].cursor() as c: c.execute("DELETE FROM resenhas_resenha")
+        self.client.post("/api/resenhas/", {"titulo_livro": "Minha", "autor_livro": "B", "nota": 5, "texto_resenha": "T"}, format='json')
+        self.assertEqual(self.titulos(self.leitor), ["Antiga", "Minha", "Recente"])
+        self.assertEqual(self.titulos(self.autora), ["Antiga"])
+        cache.clear()
+        self.assertEqual(self.titulos(self.leitor), ["Antiga"])
+        self.client.get("/api/mensagens/conversa/", {"user": "autora"})
+        self.assertEqual(len(self.titulos(self.leitor)), 3)
+
+    def test_follow_makes_user_sticky(self):
+        self.client.force_authenticate(user=self.leitor)
+        self.assertEqual(self.client.post("/api/auth/profile/autora/seguir/").status_code, 200)
+        self.assertTrue(cache.get(roteador.chave_aderencia(self.leitor.pk)))
+
+    def test_own_like_makes_user_sticky(self):
+        resenha = Resenha.objects.filter(usuario=self.autora).first()
+        self.client.force_authenticate(user=self.autora)
+        self.assertEqual(self.client.put(f"/api/resenhas/{resenha.id}/curtida/").data['alterado'], True)
+        self.assertEqual(EventoNotificacao.objects.count(), 0)
+        self.assertTrue(cache.get(roteador.chave_aderencia(self.autora.pk)))
+
+    def test_check_warns_about_process_local_cache(self):
+        self.assertEqual([w.id for w in roteador.verificar_cache_aderencia()], ['readlist.W001'])
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}):
+            self.assertEqual(roteador.verificar_cache_aderencia(), [])
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(roteador.verificar_cache_aderencia(), [])
+
+class AssincronoTests(TestCase):
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        self.client = APIClient()
+        self.autora = User.objects.create_user(username="autora", password="password123")
+        self.leitor = User.objects.create_user(username="leitor", password="password123")
+        for i in range(3):
+            resenha = Resenha.objects.create(usuario=self.autora, titulo_livro=f"Livro {i}", autor_livro="A", nota=4, texto_resenha="T")
+            Comentario.objects.create(usuario=self.leitor, resenha=resenha, texto=f"Comentário {i}")
+            Notificacao.objects.create(destinatario=self.autora, remetente=self.leitor, tipo='comentario', resenha=resenha)
+        for texto in ("Oi", "Tudo bem?"): Mensagem.objects.create(remetente=self.leitor, destinatario=self.autora, texto=texto)
+        self.assertEqual(Conversa.objects.get(usuario=self.autora).nao_lidas, 2)
+        self.client.force_authenticate(user=self.autora)
+        self.cabecalhos = {'Authorization': f"Bearer {AccessToken.for_user(self.autora)}"}
+
+    async def comparar(self, sincrono, assincrono):
+        from asgiref.sync import sync_to_async
+        esperado = (await sync_to_async(self.client.get)(sincrono)).json()
+        resp = await self.async_client.get(assincrono, headers=self.cabecalhos)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(json.loads(resp.content.decode().replace("/api/async/", "/api/")), esperado)
+        return resp
+
+    async def test_async_reads_match_sync_endpoints(self):
+        resp = await self.comparar("/api/resenhas/?page_size=2", "/api/async/resenhas/?page_size=2")
+        self.assertIn("/api/async/resenhas/", resp.json()['next'])
+        await self.comparar(resp.json()['next'].replace("/api/async/", "/api/"), resp.json()['next'])
+        await self.comparar("/api/resenhas/?expand=1", "/api/async/resenhas/?expand=1")
+        await self.comparar("/api/notificacoes/", "/api/async/notificacoes/")
+        self.assertEqual((await self.async_client.get("/api/async/resenhas/", headers={**self.cabecalhos, 'If-None-Match': resp['ETag']})).status_code, 200)
+        atual = await self.async_client.get("/api/async/notificacoes/", headers=self.cabecalhos)
+        self.assertEqual((await self.async_client.get("/api/async/notificacoes/", headers={**self.cabecalhos, 'If-None-Match': atual['ETag']})).status_code, 304)
+
+    async def test_async_conversation_marks_read(self):
+        resp = await self.async_client.get("/api/async/mensagens/conversa/", {"user": "leitor", "limite": 1}, headers=self.cabecalhos)
+        self.assertEqual([m['texto'] for m in resp.json()], ["Tudo bem?"])
+        self.assertEqual((await Conversa.objects.aget(usuario=self.autora)).nao_lidas, 0)
+        anterior = await self.async_client.get("/api/async/mensagens/conversa/", {"user": "leitor", "before_id": resp.json()[0]['id']}, headers=self.cabecalhos)
+        self.assertEqual([m['texto'] for m in anterior.json()], ["Oi"])
+        self.assertEqual((await self.async_client.get("/api/async/mensagens/conversa/", {"user": "leitor", "limite": "x"}, headers=self.cabecalhos)).status_code, 400)
+        self.assertEqual((await self.async_client.get("/api/async/mensagens/conversa/", {"user": "ninguem"}, headers=self.cabecalhos)).json(), [])
+
+    async def test_async_requires_auth_and_rejects_search(self):
+        self.assertEqual((await self.async_client.get("/api/async/resenhas/")).status_code, 401)
+        self.assertEqual((await self.async_client.get("/api/async/notificacoes/", headers={'Authorization': "Bearer lixo"})).status_code, 401)
+        self.assertEqual((await self.async_client.get("/api/async/resenhas/", {"search": "Livro"}, headers=self.cabecalhos)).status_code, 400)
+        self.assertEqual((await self.async_client.post("/api/async/resenhas/", headers=self.cabecalhos)).status_code, 405)
+
+class ConcorrenciaBenchmarkTests(TransactionTestCase):
+    def test_compares_wsgi_and_asgi_throughput(self):
+        carga.semear(seed=7, usuarios=6, resenhas=12, comentarios=20, profundidade=4, conversas=2, mensagens=6)
+        resultado = benchmark.concorrencia(clientes=3, trabalhadores=2, requisicoes=6, endpoints=['feed', 'notificacoes'])
+        self.assertEqual(set(resultado), {'feed', 'notificacoes'})
+        for servidores in resultado.values():
+            self.assertEqual(set(servidores), {'wsgi', 'asgi'})
+            for m in servidores.values(): self.assertEqual(m['erros'], 0); self.assertGreater(m['req_s'], 0)
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.leitor = User.objects.create_user(username="leitor", password="password123")
+        self.autora = User.objects.create_user(username="autora", password="password123")
+        self.estranha = User.objects.create_user(username="estranha", password="password123")
+        self.client.force_authenticate(user=self.leitor)
+
+    def resenha(self, usuario, titulo):
+        return Resenha.objects.create(usuario=usuario, titulo_livro=titulo, autor_livro="A", nota=4, texto_resenha="T")
+
+    def titulos(self, url="/api/resenhas/timeline/"):
+        vistos = []
+        while url:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            vistos += [r['titulo_livro'] for r in resp.data['results']]; url = resp.data['next']
+        return vistos
+
+    def test_follow_backfills_fans_out_and_unfollow_removes(self):
+        self.resenha(self.autora, "Anterior"); self.resenha(self.estranha, "Alheia")
+        resp = self.client.post("/api/auth/profile/autora/seguir/")
+        self.assertEqual(resp.data, {'seguindo': True, 'total_seguidores': 1})
+        self.assertEqual(self.client.post("/api/auth/profile/autora/seguir/").data['total_seguidores'], 1)
+        self.assertEqual(self.titulos(), ["Anterior"])
+        with mock.patch.object(timeline.executor, 'submit') as submit, self.captureOnCommitCallbacks(execute=True):
+            self.client.force_authenticate(user=self.autora)
+            criada = self.client.post("/api/resenhas/", {"titulo_livro": "Nova", "autor_livro": "A", "nota": 5, "texto_resenha": "T"}, format='json').data
+        submit.assert_called_once_with(timeline._distribuir, criada['id'])
+        self.assertEqual(timeline.distribuir(Resenha.objects.get(pk=criada['id'])), 1)
+        self.client.force_authenticate(user=self.leitor)
+        self.assertEqual(self.titulos(), ["Nova", "Anterior"])
+        perfil = self.client.get("/api/auth/profile/autora/").data
+        self.assertTrue(perfil['seguindo']); self.assertEqual(perfil['perfil']['total_seguidores'], 1)
+        self.client.force_authenticate(user=User.objects.get(pk=self.leitor.pk))
+        self.assertEqual(self.client.get("/api/auth/me/").data['perfil']['total_seguindo'], 1)
+        self.assertEqual(self.client.delete("/api/auth/profile/autora/seguir/").data, {'seguindo': False, 'total_seguidores': 0})
+        self.assertEqual(self.titulos(), [])
+        self.assertEqual(self.client.post("/api/auth/profile/leitor/seguir/").status_code, 400)
+
+    def test_fan_out_in_batches(self):
+        seguidores = [User.objects.create_user(username=f"fa{i}", password="password123") for i in range(5)]
+        for seguidor in seguidores: timeline.seguir(seguidor, self.autora)
+        resenha = self.resenha(self.autora, "Lançamento")
+        with CaptureQueriesContext(connection) as consultas: self.assertEqual(timeline.distribuir(resenha, lote=2), 5)
+        self.assertEqual(sum('INSERT' in q['sql'] for q in consultas.captured_queries), 4)
+        self.assertEqual(EntradaTimeline.objects.filter(resenha=resenha).count(), 6)
+
+    @override_settings(TIMELINE_LIMITE_POPULAR=2)
+    def test_popular_authors_merged_at_read_time(self):
+        fa = User.objects.create_user(username="fa", password="password123")
+        for seguidor in (self.leitor, fa): timeline.seguir(seguidor, self.autora)
+        timeline.seguir(self.leitor, self.estranha)
+        for i in range(3):
+            for usuario in (self.autora, self.estranha):
+                timeline.distribuir(self.resenha(usuario, f"{usuario.username} {i}"))
+        self.assertFalse(EntradaTimeline.objects.filter(autor=self.autora).exists())
+        self.assertEqual(self.titulos("/api/resenhas/timeline/?page_size=2"), [f"{nome} {i}" for i in (2, 1, 0) for nome in ("estranha", "autora")])
+        call_command('reconstruir_timeline', 'leitor', stdout=StringIO())
+        self.assertEqual(EntradaTimeline.objects.filter(usuario=self.leitor).count(), 3)
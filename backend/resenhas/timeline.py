@@ -0,0 +1,89 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from . import autenticacao
+from .models import EntradaTimeline, Perfil, Resenha, Seguindo
+
+logger = logging.getLogger(__name__)
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='timeline')
+
+def popular(perfil_total): return perfil_total >= settings.TIMELINE_LIMITE_POPULAR
+
+def ajustar_contadores(seguidor_id, seguido_id, delta):
+    for usuario_id, campo in ((seguidor_id, 'total_seguindo'), (seguido_id, 'total_seguidores')):
+        qs = Perfil.objects.filter(usuario_id=usuario_id)
+        if delta < 0: qs = qs.filter(**{f'{campo}__gte': -delta})
+        qs.update(**{campo: F(campo) + delta}, atualizado_em=timezone.now()); autenticacao.invalidar(usuario_id)
+
+def entradas(usuario_id, resenhas):
+    return [EntradaTimeline(usuario_id=usuario_id, resenha_id=r.id, autor_id=r.usuario_id, data_criacao=r.data_criacao) for r in resenhas]
+
+def preencher(seguidor_id, seguido_id):
+    total = Perfil.objects.filter(usuario_id=seguido_id).values_list('total_seguidores', flat=True).first() or 0
+    if popular(total): return 0
+    recentes = Resenha.objects.filter(usuario_id=seguido_id).only('id', 'usuario_id', 'data_criacao').order_by('-data_criacao', '-id')[:settings.TIMELINE_PREENCHIMENTO]
+    return len(EntradaTimeline.objects.bulk_create(entradas(seguidor_id, recentes), ignore_conflicts=True))
+
+@transaction.atomic
+def seguir(seguidor, seguido):
+    _, criado = Seguindo.objects.get_or_create(seguidor=seguidor, seguido=seguido)
+    if criado: ajustar_contadores(seguidor.id, seguido.id, 1); preencher(seguidor.id, seguido.id)
+    return criado
+
+@transaction.atomic
+def deixar_de_seguir(seguidor, seguido):
+    removido = Seguindo.objects.filter(seguidor=seguidor, seguido=seguido).delete()[0] > 0
+    if removido:
+        ajustar_contadores(seguidor.id, seguido.id, -1)
+        EntradaTimeline.objects.filter(usuario=seguidor, autor=seguido).delete()
+    return removido
+
+def distribuir(resenha, lote=None):
+    lote = lote or settings.TIMELINE_LOTE
+    total = Perfil.objects.filter(usuario_id=resenha.usuario_id).values_list('total_seguidores', flat=True).first() or 0
+    if popular(total): return 0
+    EntradaTimeline.objects.bulk_create(entradas(resenha.usuario_id, [resenha]), ignore_conflicts=True)
+    seguidores, ultimo, entregues = Seguindo.objects.filter(seguido_id=resenha.usuario_id).order_by('seguidor_id'), 0, 0
+    while True:
+        ids = list(seguidores.filter(seguidor_id__gt=ultimo).values_list('seguidor_id', flat=True)[:lote])
+        if not ids: return entregues
+        with transaction.atomic():
+            EntradaTimeline.objects.bulk_create([e for usuario_id in ids for e in entradas(usuario_id, [resenha])], ignore_conflicts=True)
+        entregues += len(ids); ultimo = ids[-1]
+
+def _distribuir(resenha_id):
+    close_old_connections()
+    try:
+        resenha = Resenha.objects.filter(pk=resenha_id).only('id', 'usuario_id', 'data_criacao').first()
+        if resenha: distribuir(resenha)
+    except Exception: logger.exception("Falha ao distribuir a resenha %s nas timelines", resenha_id)
+    finally: close_old_connections()
+
+def agendar(resenha_id):
+    transaction.on_commit(lambda: executor.submit(_distribuir, resenha_id))
+
+def mesclados(usuario):
+    limite = settings.TIMELINE_LIMITE_POPULAR
+    autores = list(Seguindo.objects.filter(seguidor=usuario, seguido__perfil__total_seguidores__gte=limite).values_list('seguido_id', flat=True))
+    if popular(getattr(getattr(usuario, 'perfil', None), 'total_seguidores', 0)): autores.append(usuario.id)
+    return autores
+
+def pagina(usuario, cursor, limite):
+    materializadas, autores = EntradaTimeline.objects.filter(usuario=usuario), mesclados(usuario)
+    recentes = Resenha.objects.filter(usuario_id__in=autores)
+    if cursor:
+        data, pk = cursor
+        materializadas = materializadas.filter(Q(data_criacao__lt=data) | Q(data_criacao=data, resenha_id__lt=pk))
+        recentes = recentes.filter(Q(data_criacao__lt=data) | Q(data_criacao=data, id__lt=pk))
+    chaves = set(materializadas.order_by('-data_criacao', '-resenha_id').values_list('data_criacao', 'resenha_id')[:limite])
+    if autores: chaves.update(recentes.order_by('-data_criacao', '-id').values_list('data_criacao', 'id')[:limite])
+    return [pk for _, pk in sorted(chaves, reverse=True)[:limite]]
+
+@transaction.atomic
+def reconstruir(usuario_id):
+    EntradaTimeline.objects.filter(usuario_id=usuario_id).delete()
+    autores = [usuario_id, *Seguindo.objects.filter(seguidor_id=usuario_id).values_list('seguido_id', flat=True)]
+    return sum(preencher(usuario_id, autor_id) for autor_id in autores)
@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ResenhaViewSet, ComentarioViewSet, NotificacaoViewSet, MensagemViewSet
+from .views import ResenhaViewSet, ComentarioViewSet, NotificacaoViewSet, MensagemViewSet, LivroBuscaView, LivroViewSet, ExportacaoView, IngressoEventosView
+from .tempo_real import stream_eventos
+from .assincrono import ConversaAssincrona, FeedAssincrono, NotificacoesAssincronas
+from .metricas import exportar_metricas
 
 router = DefaultRouter()
 
@@ -8,7 +11,16 @@ router.register(r'resenhas', ResenhaViewSet, basename='resenha')
 router.register(r'comentarios', ComentarioViewSet, basename='comentario')
 router.register(r'notificacoes', NotificacaoViewSet, basename='notificacao')
 router.register(r'mensagens', MensagemViewSet, basename='mensagem')
+router.register(r'livros', LivroViewSet, basename='livro')
 
 urlpatterns = [
+    path('eventos/', stream_eventos, name='eventos'),
+    path('eventos/ingresso/', IngressoEventosView.as_view(), name='eventos_ingresso'),
+    path('metrics/', exportar_metricas, name='metricas'),
+    path('async/resenhas/', FeedAssincrono.as_view(), name='feed_async'),
+    path('async/notificacoes/', NotificacoesAssincronas.as_view(), name='notificacoes_async'),
+    path('async/mensagens/conversa/', ConversaAssincrona.as_view(), name='conversa_async'),
+    path('admin/exportar/', ExportacaoView.as_view(), name='exportar'),
+    path('livros/busca/', LivroBuscaView.as_view(), name='livros_busca'),
     path('', include(router.urls)),
 ]
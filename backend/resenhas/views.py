@@ -1,99 +1,289 @@
 from rest_framework import viewsets, generics, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from .models import Resenha, Comentario, Notificacao, Mensagem
+from rest_framework.views import APIView
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.utils.urls import replace_query_param
+from .models import Resenha, Comentario, Notificacao, Mensagem, Perfil, Conversa, Livro, carimbo_versao
 from .serializers import (
     RegisterSerializer, UserSerializer, PublicUserSerializer, UpdateUserSerializer, 
-    NotificacaoSerializer, MensagemSerializer, ComentarioSerializer, ResenhaSerializer
+    NotificacaoSerializer, MensagemSerializer, ComentarioSerializer, ResenhaSerializer,
+    ResenhaResumoSerializer, CurtidorSerializer, ConversaSerializer, LivroSerializer
 )
 from .permissions import IsOwnerOrReadOnly
+from . import curtidas, exportacao, livros, notificacoes, tempo_real, timeline
+from .pagination import KeysetPagination
+from .busca import BuscaTextualFilter
+from .condicional import CondicionalMixin, mais_recente
+from django.conf import settings
+from config.roteador import LeituraReplicaMixin
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.urls import reverse
+from django.http import Http404, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import Q, F, Avg, Max, Count, Sum
 
-def criar_notificacao(remetente, destinatario, tipo, resenha=None):
-    if remetente != destinatario:
-        Notificacao.objects.create(remetente=remetente, destinatario=destinatario, tipo=tipo, resenha=resenha)
+def ajustar_contador(model, pk, campo, delta, **extra):
+    qs = model.objects.filter(pk=pk)
+    if delta < 0: qs = qs.filter(**{f'{campo}__gte': -delta})
+    qs.update(**{campo: F(campo) + delta}, **extra)
+
+def marcar_curtida(request, model, pk, curtida):
+    estado = curtidas.aplicar(request.user, model, int(pk), curtida) if str(pk).isdigit() else None
+    if estado is None: raise Http404
+    return estado
+
+def janela_conversa(usuario, outro_id, params):
+    try:
+        limite = min(max(int(params.get('limite', settings.CONVERSA_LIMITE)), 1), settings.CONVERSA_LIMITE_MAXIMO)
+        since_id, before_id = (int(params[p]) if params.get(p) else None for p in ('since_id', 'before_id'))
+    except ValueError: raise ParseError('limite, since_id e before_id devem ser inteiros.')
+    msgs = Mensagem.objects.filter(Q(remetente=usuario, destinatario_id=outro_id) | Q(remetente_id=outro_id, destinatario=usuario)).select_related('remetente__perfil')
+    if since_id: return msgs.filter(id__gt=since_id).order_by('id')[:limite], False
+    if before_id: msgs = msgs.filter(id__lt=before_id)
+    return msgs.order_by('-id')[:limite], True
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all(); permission_classes = (AllowAny,); serializer_class = RegisterSerializer
 
-class UserDetailView(generics.RetrieveUpdateAPIView):
+class UserDetailView(LeituraReplicaMixin, CondicionalMixin, generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
     def get_serializer_class(self): return UpdateUserSerializer if self.request.method in ['PUT', 'PATCH'] else UserSerializer
     def get_object(self): return self.request.user
+    def get_validadores(self, request):
+        modificado = Perfil.objects.filter(usuario=request.user).values_list('atualizado_em', flat=True).first()
+        return (modificado.isoformat(), modificado) if modificado else None
+    def retrieve(self, request, *args, **kwargs): return self.condicional(super().retrieve, request, *args, **kwargs)
 
-class PublicProfileView(generics.RetrieveAPIView):
+class PublicProfileView(LeituraReplicaMixin, CondicionalMixin, generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]; serializer_class = PublicUserSerializer
     def get_object(self): return get_object_or_404(User, username=self.kwargs['username'])
+    def get_validadores(self, request):
+        modificado = Perfil.objects.filter(usuario__username=self.kwargs['username']).values_list('atualizado_em', flat=True).first()
+        return (modificado.isoformat(), modificado) if modificado else None
+    def retrieve(self, request, *args, **kwargs): return self.condicional(super().retrieve, request, *args, **kwargs)
+
+class SeguirView(LeituraReplicaMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    def alterar(self, request, username, operacao):
+        seguido = get_object_or_404(User, username=username)
+        if seguido == request.user: raise ValidationError({'detail': 'Não é possível seguir a si mesmo.'})
+        operacao(request.user, seguido)
+        total = Perfil.objects.filter(usuario=seguido).values_list('total_seguidores', flat=True).first() or 0
+        return Response({'seguindo': operacao is timeline.seguir, 'total_seguidores': total})
+    def post(self, request, username): return self.alterar(request, username, timeline.seguir)
+    def delete(self, request, username): return self.alterar(request, username, timeline.deixar_de_seguir)
+
+class PerfilBundleView(LeituraReplicaMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    def resenhas(self, request, alvo):
+        paginador = KeysetPagination()
+        consulta = Resenha.objects.com_resumo(request.user, settings.FEED_COMENTARIOS_RECENTES).filtrar_feed(request.user, {'usuario': str(alvo.pk)})
+        pagina = paginador.paginate_queryset(consulta, request, self)
+        proxima = paginador.next_cursor and replace_query_param(request.build_absolute_uri(f"{reverse('resenha-list')}?usuario={alvo.pk}"), 'cursor', paginador.next_cursor)
+        return {'next': proxima, 'results': ResenhaResumoSerializer(pagina, many=True, context={'request': request}).data}
+    def estatisticas(self, alvo):
+        estado = Resenha.objects.filter(usuario=alvo).order_by().aggregate(total_resenhas=Count('id'), total_curtidas=Sum('total_curtidas'), media_nota=Avg('nota'))
+        return {**estado, 'total_curtidas': estado['total_curtidas'] or 0, 'media_nota': round(estado['media_nota'], 2) if estado['media_nota'] else None}
+    def conversa(self, request, alvo):
+        consulta, invertida = janela_conversa(request.user, alvo.pk, request.query_params)
+        Conversa.objects.filter(usuario=request.user, correspondente=alvo, nao_lidas__gt=0).update(nao_lidas=0)
+        msgs = list(consulta)
+        return MensagemSerializer(msgs[::-1] if invertida else msgs, many=True, context={'request': request}).data
+    def get(self, request, username=None):
+        proprio = username is None or username == request.user.username
+        alvo = request.user if proprio else get_object_or_404(User.objects.select_related('perfil'), username=username)
+        usuario = (UserSerializer if proprio else PublicUserSerializer)(alvo, context={'request': request}).data
+        return Response({
+            'eu': {'id': request.user.pk, 'username': request.user.username}, 'proprio': proprio, 'usuario': usuario,
+            'resenhas': self.resenhas(request, alvo), 'estatisticas': self.estatisticas(alvo), 'conversa': [] if proprio else self.conversa(request, alvo),
+        })
+
+class IngressoEventosView(APIView):
+    permission_classes = [IsAuthenticated]
+    def post(self, request):
+        return Response({'ingresso': tempo_real.emitir_ingresso(request.user.pk), 'expira_em': settings.TEMPO_REAL_INGRESSO_TTL}, headers={'Cache-Control': 'no-store'})
+
+class LivroBuscaView(APIView):
+    permission_classes = [IsAuthenticated]
+    def get(self, request):
+        termo = request.query_params.get('q', '').strip()
+        if len(termo) < 2: raise ValidationError({'q': 'Informe ao menos 2 caracteres.'})
+        return Response({'results': livros.buscar(termo)}, headers={'Cache-Control': f'private, max-age={settings.LIVROS_CACHE_TTL}'})
 
-class NotificacaoViewSet(viewsets.ModelViewSet):
+class ExportacaoView(APIView):
+    permission_classes = [IsAdminUser]
+    def get(self, request):
+        return StreamingHttpResponse(exportacao.ndjson(), content_type='application/x-ndjson', headers={'Content-Disposition': 'attachment; filename="resenhas.ndjson"'})
+
+class LivroViewSet(LeituraReplicaMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = LivroSerializer; permission_classes = [IsAuthenticated]
+    def get_queryset(self):
+        queryset = Livro.objects.select_related('autor').order_by('-total_resenhas', '-id')
+        if self.request.query_params.get('autor', '').isdigit(): queryset = queryset.filter(autor_id=self.request.query_params['autor'])
+        return queryset
+
+class NotificacaoViewSet(LeituraReplicaMixin, CondicionalMixin, viewsets.ModelViewSet):
     serializer_class = NotificacaoSerializer; permission_classes = [IsAuthenticated]
-    def get_queryset(self): return Notificacao.objects.filter(destinatario=self.request.user)
+    pagination_class = KeysetPagination; cursor_campo = 'data'
+    def get_queryset(self): return Notificacao.objects.filter(destinatario=self.request.user).select_related('remetente__perfil', 'resenha')
+    def get_validadores(self, request):
+        estado = self.get_queryset().order_by().aggregate(n=Count('id'), nao_lidas=Count('id', filter=Q(lida=False)), atores=Sum('total_remetentes'), ultima=Max('data'),
+                                                          perfis=Max('remetente__perfil__atualizado_em'), resenhas=Max('resenha__atualizado_em'))
+        return f"{estado['n']}|{estado['nao_lidas']}|{estado['atores']}|{estado['ultima']}|{estado['perfis']}|{estado['resenhas']}", mais_recente(estado['ultima'], estado['perfis'], estado['resenhas'])
+    def list(self, request, *args, **kwargs): return self.condicional(super().list, request, *args, **kwargs)
     @action(detail=False, methods=['post'])
+    @transaction.atomic
     def marcar_lidas(self, request):
-        self.get_queryset().update(lida=True); return Response({'status': 'ok'})
+        self.get_queryset().update(lida=True)
+        Perfil.objects.filter(usuario=request.user).update(notificacoes_nao_lidas=0); return Response({'status': 'ok'})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        total = Perfil.objects.filter(usuario=request.user).values_list('notificacoes_nao_lidas', flat=True).first() or 0
+        etag = f'"nao-lidas-{total}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in [t.strip() for t in request.headers.get('If-None-Match', '').split(',')]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response({'nao_lidas': total}, headers=headers)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        lida_antes = serializer.instance.lida
+        notificacao = serializer.save()
+        if notificacao.lida != lida_antes: notificacoes.ajustar_nao_lidas(notificacao.destinatario_id, -1 if notificacao.lida else 1)
 
-class MensagemViewSet(viewsets.ModelViewSet):
+class MensagemViewSet(LeituraReplicaMixin, viewsets.ModelViewSet):
     serializer_class = MensagemSerializer; permission_classes = [IsAuthenticated]
-    def get_queryset(self): return Mensagem.objects.filter(Q(remetente=self.request.user) | Q(destinatario=self.request.user))
+    def get_queryset(self):
+        return Mensagem.objects.filter(Q(remetente=self.request.user) | Q(destinatario=self.request.user)).select_related('remetente__perfil')
     @action(detail=False, methods=['get'])
     def conversa(self, request):
-        outro = request.query_params.get('user')
-        msgs = self.get_queryset().filter(Q(remetente__username=outro) | Q(destinatario__username=outro))
-        return Response(MensagemSerializer(msgs, many=True, context={'request': request}).data)
+        outro = User.objects.filter(username=request.query_params.get('user')).values_list('id', flat=True).first()
+        if outro is None: return Response([])
+        consulta, invertida = janela_conversa(request.user, outro, request.query_params)
+        Conversa.objects.filter(usuario=request.user, correspondente_id=outro, nao_lidas__gt=0).update(nao_lidas=0)
+        msgs = list(consulta)
+        return Response(MensagemSerializer(msgs[::-1] if invertida else msgs, many=True, context={'request': request}).data)
+
+    @action(detail=False, methods=['get'])
+    def inbox(self, request):
+        paginator = KeysetPagination(); self.cursor_campo = 'atualizado_em'
+        conversas = Conversa.objects.filter(usuario=request.user).select_related('correspondente__perfil', 'ultima_mensagem')
+        pagina = paginator.paginate_queryset(conversas, request, self)
+        return paginator.get_paginated_response(ConversaSerializer(pagina, many=True, context={'request': request}).data)
+    @transaction.atomic
     def perform_create(self, serializer):
         dest = get_object_or_404(User, username=self.request.data.get('destinatario_username'))
-        serializer.save(remetente=self.request.user, destinatario=dest)
-        criar_notificacao(self.request.user, dest, 'mensagem')
+        msg = serializer.save(remetente=self.request.user, destinatario=dest)
+        notificacoes.enfileirar(self.request.user, dest, 'mensagem')
+        tempo_real.publicar(dest.id, 'mensagem', {'id': msg.id, 'remetente_nome': self.request.user.username, 'texto': msg.texto, 'data': msg.data})
 
-class ComentarioViewSet(viewsets.ModelViewSet):
-    queryset = Comentario.objects.all(); serializer_class = ComentarioSerializer
+class ComentarioViewSet(LeituraReplicaMixin, viewsets.ModelViewSet):
+    serializer_class = ComentarioSerializer; pagination_class = KeysetPagination
+    def get_queryset(self):
+        queryset = Comentario.objects.com_detalhes(self.request.user)
+        resenha_id = self.request.query_params.get('resenha')
+        if resenha_id and self.action == 'list': queryset = queryset.filter(resenha_id=resenha_id, parent=None)
+        return queryset
     def get_permissions(self):
-        if self.action == 'curtir': return [IsAuthenticated()]
+        if self.action in ['curtir', 'curtida']: return [IsAuthenticated()]
         if self.action in ['update', 'partial_update', 'destroy']: return [IsAuthenticated(), IsOwnerOrReadOnly()]
         return [IsAuthenticated(), IsOwnerOrReadOnly()] 
 
     @action(detail=True, methods=['post'])
+    @transaction.atomic
     def curtir(self, request, pk=None):
-        c = self.get_object()
-        if c.curtidas.filter(id=request.user.id).exists(): c.curtidas.remove(request.user)
-        else: c.curtidas.add(request.user); criar_notificacao(request.user, c.usuario, 'curtida', c.resenha)
-        return Response({'status': 'ok'})
-
-class ResenhaViewSet(viewsets.ModelViewSet):
-    serializer_class = ResenhaSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['titulo_livro', 'autor_livro', 'texto_resenha', 'usuario__username']
+        curtida = str(pk).isdigit() and not Comentario.curtidas.through.objects.filter(comentario_id=pk, user=request.user).exists()
+        marcar_curtida(request, Comentario, pk, curtida); return Response({'status': 'ok'})
+
+    @action(detail=True, methods=['put', 'delete'])
+    def curtida(self, request, pk=None): return Response(marcar_curtida(request, Comentario, pk, request.method == 'PUT'))
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save(); Resenha.objects.filter(pk=serializer.instance.resenha_id).tocar()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        _, removidos = instance.delete()
+        ajustar_contador(Resenha, instance.resenha_id, 'total_comentarios', -removidos.get(Comentario._meta.label, 0), **carimbo_versao())
+
+class ResenhaViewSet(LeituraReplicaMixin, CondicionalMixin, viewsets.ModelViewSet):
+    serializer_class = ResenhaSerializer; pagination_class = KeysetPagination
+    filter_backends = [BuscaTextualFilter, filters.OrderingFilter]
     ordering_fields = ['nota', 'data_criacao']
 
+    def expandida(self): return self.action not in ('list', 'timeline') or bool(self.request.query_params.get('expand'))
+
     def get_queryset(self):
-        queryset = Resenha.objects.all().order_by('-data_criacao')
-        if self.request.query_params.get('only_mine') == 'true' and self.request.user.is_authenticated:
-            queryset = queryset.filter(usuario=self.request.user)
-        return queryset
+        if self.action in ['curtir', 'comentar', 'destroy', 'comentarios', 'curtidores']: queryset = Resenha.objects.all()
+        elif self.expandida(): queryset = Resenha.objects.com_detalhes(self.request.user)
+        else: queryset = Resenha.objects.com_resumo(self.request.user, settings.FEED_COMENTARIOS_RECENTES)
+        return queryset.order_by('-data_criacao').filtrar_feed(self.request.user, self.request.query_params)
 
     def get_permissions(self):
-        if self.action in ['curtir', 'comentar']: return [IsAuthenticated()]
+        if self.action in ['curtir', 'curtida', 'comentar']: return [IsAuthenticated()]
         return [IsAuthenticated(), IsOwnerOrReadOnly()]
 
-    def perform_create(self, serializer): serializer.save(usuario=self.request.user)
+    def get_serializer_class(self): return ResenhaSerializer if self.expandida() else ResenhaResumoSerializer
+
+    def get_validadores(self, request):
+        if self.action == 'retrieve':
+            try: versao = Resenha.objects.filter(pk=self.kwargs['pk']).values_list('versao', 'atualizado_em', 'usuario__perfil__atualizado_em').first()
+            except ValueError: return None
+            return (f"{versao[0]}|{versao[1].isoformat()}|{versao[2]}", mais_recente(versao[1], versao[2])) if versao else None
+        estado = self.filter_queryset(self.get_queryset()).order_by().aggregate(n=Count('id'), ultima=Max('atualizado_em'), perfis=Max('usuario__perfil__atualizado_em'))
+        return f"{estado['n']}|{estado['ultima']}|{estado['perfis']}", mais_recente(estado['ultima'], estado['perfis'])
+
+    def list(self, request, *args, **kwargs): return self.condicional(super().list, request, *args, **kwargs)
+    def retrieve(self, request, *args, **kwargs): return self.condicional(super().retrieve, request, *args, **kwargs)
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        resenha = serializer.save(usuario=self.request.user); timeline.agendar(resenha.id)
+
+    @action(detail=False, methods=['get'])
+    def timeline(self, request):
+        def fonte(cursor, limite):
+            ids = timeline.pagina(request.user, cursor, limite)
+            resenhas = self.get_queryset().in_bulk(ids)
+            return [resenhas[pk] for pk in ids if pk in resenhas]
+        pagina = self.paginator.paginar_fonte(fonte, request, self)
+        return self.get_paginated_response(self.get_serializer(pagina, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def comentarios(self, request, pk=None):
+        resenha = self.get_object()
+        pagina = self.paginate_queryset(resenha.comentarios.filter(parent=None).com_detalhes(request.user))
+        return self.get_paginated_response(ComentarioSerializer(pagina, many=True, context=self.get_serializer_context()).data)
+
+    @action(detail=True, methods=['get'])
+    def curtidores(self, request, pk=None):
+        resenha = self.get_object(); self.cursor_campo = 'pk'
+        pagina = self.paginate_queryset(Resenha.curtidas.through.objects.filter(resenha=resenha).select_related('user__perfil').order_by('-id'))
+        return self.get_paginated_response(CurtidorSerializer([c.user for c in pagina], many=True, context=self.get_serializer_context()).data)
 
     @action(detail=True, methods=['post'])
+    @transaction.atomic
     def curtir(self, request, pk=None):
-        resenha = self.get_object()
-        if resenha.curtidas.filter(id=request.user.id).exists():
-            resenha.curtidas.remove(request.user); return Response({'status': 'descurtido'})
-        resenha.curtidas.add(request.user); criar_notificacao(request.user, resenha.usuario, 'curtida', resenha); return Response({'status': 'curtido'})
+        curtida = str(pk).isdigit() and not Resenha.curtidas.through.objects.filter(resenha_id=pk, user=request.user).exists()
+        marcar_curtida(request, Resenha, pk, curtida); return Response({'status': 'curtido' if curtida else 'descurtido'})
+
+    @action(detail=True, methods=['put', 'delete'])
+    def curtida(self, request, pk=None): return Response(marcar_curtida(request, Resenha, pk, request.method == 'PUT'))
 
     @action(detail=True, methods=['post'])
+    @transaction.atomic
     def comentar(self, request, pk=None):
         resenha = self.get_object(); parent_id = request.data.get('parent_id')
         parent_obj = get_object_or_404(Comentario, pk=parent_id) if parent_id else None
         serializer = ComentarioSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(usuario=request.user, resenha=resenha, parent=parent_obj)
-            criar_notificacao(request.user, resenha.usuario, 'comentario', resenha)
+            ajustar_contador(Resenha, resenha.pk, 'total_comentarios', 1, **carimbo_versao())
+            notificacoes.enfileirar(request.user, resenha.usuario, 'comentario', resenha)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
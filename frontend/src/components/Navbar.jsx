@@ -11,15 +11,23 @@ export default function Navbar() {
 
   useEffect(() => {
     if(token) {
-        api.get('/notificacoes/').then(res => {
-            const dados = res.data.results ? res.data.results : res.data;
-            if(Array.isArray(dados)) {
-               setNotifCount(dados.filter(n => !n.lida).length);
-            }
-        }).catch(() => {});
+        api.get('/notificacoes/unread_count/').then(res => setNotifCount(res.data.nao_lidas)).catch(() => {});
     }
   }, [location.pathname, token]);
 
+  useEffect(() => {
+    if (!token) return;
+    let eventos = null, espera = null, ativo = true;
+    const conectar = () => api.post('/eventos/ingresso/').then(res => {
+      if (!ativo) return;
+      eventos = new EventSource(`${api.defaults.baseURL}/eventos/?ingresso=${encodeURIComponent(res.data.ingresso)}`);
+      eventos.addEventListener('notificacao', () => setNotifCount(n => n + 1));
+      eventos.onerror = () => { eventos.close(); espera = setTimeout(conectar, 3000); };
+    }).catch(() => { if (ativo) espera = setTimeout(conectar, 3000); });
+    conectar();
+    return () => { ativo = false; clearTimeout(espera); if (eventos) eventos.close(); };
+  }, [token]);
+
   const handleLogout = () => {
     localStorage.removeItem('access_token');
     localStorage.removeItem('refresh_token');
@@ -1,6 +1,5 @@
 import { useState } from 'react';
 import api from '../api';
-import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
 import { Search } from 'lucide-react';
 import ReviewForm from '../components/ReviewForm';
@@ -14,20 +13,18 @@ export default function AddReview() {
   const searchGoogleBooks = async () => {
     if (!bookQuery) return;
     try {
-      const res = await axios.get(`https://www.googleapis.com/books/v1/volumes?q=${bookQuery}`);
-      setBooksFound(res.data.items || []);
+      const res = await api.get('/livros/busca/', { params: { q: bookQuery } });
+      setBooksFound(res.data.results || []);
     } catch (err) {
       console.error(err);
     }
   };
 
   const selectBook = (book) => {
-    const info = book.volumeInfo;
-    const capa = info.imageLinks?.thumbnail || info.imageLinks?.smallThumbnail || '';
     setSelectedBookData({
-      titulo_livro: info.title || '',
-      autor_livro: info.authors ? info.authors.join(', ') : 'Desconhecido',
-      url_imagem: capa,
+      titulo_livro: book.titulo || '',
+      autor_livro: book.autores.length ? book.autores.join(', ') : 'Desconhecido',
+      url_imagem: book.capa || book.miniatura || '',
       texto_resenha: '',
       nota: 5
     });
@@ -60,10 +57,10 @@ export default function AddReview() {
                   className="w-full p-3 hover:bg-slate-900 flex gap-4 items-center text-left transition focus:bg-slate-900 focus:outline-none"
                   onClick={() => selectBook(b)}
                 >
-                  {b.volumeInfo.imageLinks?.smallThumbnail && <img src={b.volumeInfo.imageLinks.smallThumbnail} alt={b.volumeInfo.title} className="w-10 h-14 object-cover rounded shadow-md" />}
+                  {b.miniatura && <img src={b.miniatura} alt={b.titulo} className="w-10 h-14 object-cover rounded shadow-md" />}
                   <div>
-                    <p className="font-bold text-sm text-slate-200 leading-tight">{b.volumeInfo.title}</p>
-                    <p className="text-[10px] text-slate-500 uppercase mt-0.5">{b.volumeInfo.authors?.join(', ')}</p>
+                    <p className="font-bold text-sm text-slate-200 leading-tight">{b.titulo}</p>
+                    <p className="text-[10px] text-slate-500 uppercase mt-0.5">{b.autores.join(', ')}</p>
                   </div>
                 </button>
               </li>
@@ -2,7 +2,7 @@ import { useEffect, useState, useRef } from 'react';
 import api from '../api';
 import { 
   Star, Book, Pencil, Trash2, Search, Heart, MessageCircle, 
-  Send, Globe, User, X, ArrowUp, ArrowDown, Clock, Filter 
+  Send, Globe, User, Users, X, ArrowUp, ArrowDown, Clock, Filter 
 } from 'lucide-react';
 import { useNavigate, useSearchParams, Link } from 'react-router-dom';
 import ConfirmModal from '../components/ConfirmModal';
@@ -37,7 +37,7 @@ const CommentItem = ({ comment, onReply, onLike, onDelete, currentUser, depth =
                     )}
                 </div>
                 <div className="flex items-center gap-4 mt-2 ml-11">
-                    <button onClick={() => onLike(comment.id)} className={`flex items-center gap-1 text-[10px] font-bold transition ${comment.curtido_por_mim ? "text-pink-500" : "text-slate-500 hover:text-pink-400"}`}>
+                    <button onClick={() => onLike(comment)} className={`flex items-center gap-1 text-[10px] font-bold transition ${comment.curtido_por_mim ? "text-pink-500" : "text-slate-500 hover:text-pink-400"}`}>
                         <Heart size={10} fill={comment.curtido_por_mim ? "currentColor" : "none"} /> {comment.total_curtidas}
                     </button>
                     <button onClick={() => setIsReplying(!isReplying)} className="flex items-center gap-1 text-[10px] font-bold text-slate-500 hover:text-indigo-400 transition"><MessageCircle size={10} /> Responder</button>
@@ -81,6 +81,7 @@ export default function Home() {
   
   const [likesModalOpen, setLikesModalOpen] = useState(false);
   const [likesList, setLikesList] = useState([]);
+  const [comments, setComments] = useState([]);
 
   const reviewRefs = useRef({}); 
   const navigate = useNavigate();
@@ -89,6 +90,7 @@ export default function Home() {
 
   useEffect(() => { api.get('/auth/me/').then(res => setCurrentUser(res.data)).catch(() => {}); }, []);
   useEffect(() => { fetchResenhas(); }, [viewMode, search, ordering]);
+  useEffect(() => { if (openCommentId) fetchComments(openCommentId); else setComments([]); }, [openCommentId]);
 
   useEffect(() => {
       const highlightId = searchParams.get('highlight');
@@ -104,22 +106,34 @@ export default function Home() {
   }, [searchParams, resenhas]);
 
   const fetchResenhas = async () => {
-    let url = `/resenhas/?ordering=${ordering}&search=${search}`;
+    let url = `/resenhas/?search=${search}`;
+    if (ordering !== '-data_criacao') url += `&ordering=${ordering}`;
     if (viewMode === 'mine') url += '&only_mine=true';
+    if (viewMode === 'following') url = '/resenhas/timeline/';
     try {
         const res = await api.get(url);
         setResenhas(res.data.results ? res.data.results : res.data);
     } catch (err) { console.error(err); }
   };
 
-  const toggleReviewLike = async (id) => { await api.post(`/resenhas/${id}/curtir/`); fetchResenhas(); };
-  const toggleCommentLike = async (cid) => { await api.post(`/comentarios/${cid}/curtir/`); fetchResenhas(); };
-  const deleteComment = async (cid) => { if(globalThis.confirm("Apagar?")) { await api.delete(`/comentarios/${cid}/`); fetchResenhas(); }};
+  const fetchComments = async (resenhaId) => {
+    try {
+        const res = await api.get(`/resenhas/${resenhaId}/comentarios/`);
+        setComments(res.data.results);
+    } catch (err) { console.error(err); }
+  };
+
+  const toggleReviewLike = async (item) => {
+    const res = await api[item.curtido_por_mim ? 'delete' : 'put'](`/resenhas/${item.id}/curtida/`);
+    setResenhas(atuais => atuais.map(r => r.id === item.id ? { ...r, curtido_por_mim: res.data.curtido, total_curtidas: res.data.total_curtidas } : r));
+  };
+  const toggleCommentLike = async (comment) => { await api[comment.curtido_por_mim ? 'delete' : 'put'](`/comentarios/${comment.id}/curtida/`); fetchComments(openCommentId); };
+  const deleteComment = async (cid) => { if(globalThis.confirm("Apagar?")) { await api.delete(`/comentarios/${cid}/`); fetchComments(openCommentId); fetchResenhas(); }};
   
   const submitComment = async (resenhaId, texto, parentId = null) => {
     if (!texto) return;
     await api.post(`/resenhas/${resenhaId}/comentar/`, { texto, parent_id: parentId });
-    setNewComment(""); fetchResenhas();
+    setNewComment(""); fetchComments(resenhaId); fetchResenhas();
   };
 
   const confirmDeleteReview = async () => {
@@ -127,9 +141,13 @@ export default function Home() {
     setModalOpen(false); fetchResenhas();
   };
 
-  const openLikesModal = (curtidores) => {
-      setLikesList(curtidores || []);
+  const openLikesModal = async (resenhaId) => {
+      setLikesList([]);
       setLikesModalOpen(true);
+      try {
+          const res = await api.get(`/resenhas/${resenhaId}/curtidores/`);
+          setLikesList(res.data.results);
+      } catch (err) { console.error(err); }
   };
 
   const selectFilter = (order) => {
@@ -147,6 +165,7 @@ export default function Home() {
           <div className="flex bg-slate-900 p-1 rounded-xl inline-flex border border-slate-800">
               <button onClick={() => setViewMode('all')} className={`flex items-center gap-2 px-4 py-2 rounded-lg text-xs font-bold transition ${viewMode === 'all' ? 'bg-slate-800 text-white shadow-sm' : 'text-slate-500 hover:text-slate-300'}`}><Globe size={14} /> Global</button>
               <button onClick={() => setViewMode('mine')} className={`flex items-center gap-2 px-4 py-2 rounded-lg text-xs font-bold transition ${viewMode === 'mine' ? 'bg-slate-800 text-white shadow-sm' : 'text-slate-500 hover:text-slate-300'}`}><User size={14} /> Minhas</button>
+              <button onClick={() => setViewMode('following')} className={`flex items-center gap-2 px-4 py-2 rounded-lg text-xs font-bold transition ${viewMode === 'following' ? 'bg-slate-800 text-white shadow-sm' : 'text-slate-500 hover:text-slate-300'}`}><Users size={14} /> Seguindo</button>
           </div>
         </div>
 
@@ -202,16 +221,16 @@ export default function Home() {
                 <div className="border-t border-slate-800/50 p-4 bg-slate-900/30 rounded-b-3xl flex items-center justify-between">
                     <div className="flex gap-4">
                         <div className="flex items-center gap-1">
-                            <button onClick={() => toggleReviewLike(item.id)} className={`flex items-center gap-1.5 text-xs font-bold transition p-1.5 rounded-lg hover:bg-white/5 ${item.curtido_por_mim ? "text-pink-500" : "text-slate-400 hover:text-pink-400"}`}>
+                            <button onClick={() => toggleReviewLike(item)} className={`flex items-center gap-1.5 text-xs font-bold transition p-1.5 rounded-lg hover:bg-white/5 ${item.curtido_por_mim ? "text-pink-500" : "text-slate-400 hover:text-pink-400"}`}>
                                 <Heart size={16} fill={item.curtido_por_mim ? "currentColor" : "none"} /> 
                             </button>
-                            <button onClick={() => openLikesModal(item.curtidores)} className="text-xs font-bold text-slate-400 hover:text-indigo-400 transition flex items-center gap-1">
+                            <button onClick={() => openLikesModal(item.id)} className="text-xs font-bold text-slate-400 hover:text-indigo-400 transition flex items-center gap-1">
                                 {item.total_curtidas}
                             </button>
                         </div>
                         
                         <button onClick={() => setOpenCommentId(item.id)} className="flex items-center gap-1.5 text-xs font-bold transition p-1.5 rounded-lg hover:bg-white/5 text-slate-400 hover:text-indigo-400">
-                            <MessageCircle size={16} /> {item.comentarios.length}
+                            <MessageCircle size={16} /> {item.total_comentarios}
                         </button>
                     </div>
                     
@@ -239,13 +258,13 @@ export default function Home() {
                 </div>
 
                 <div className="flex-1 overflow-y-auto p-5 custom-scrollbar bg-slate-900/50">
-                    {activeReview.comentarios.length === 0 && (
+                    {comments.length === 0 && (
                         <div className="h-full flex flex-col items-center justify-center text-slate-600 opacity-60">
                             <MessageCircle size={48} className="mb-2"/>
                             <p className="text-xs">Seja o primeiro a comentar!</p>
                         </div>
                     )}
-                    {activeReview.comentarios.map(c => (
+                    {comments.map(c => (
                         <CommentItem 
                             key={c.id} 
                             comment={c} 
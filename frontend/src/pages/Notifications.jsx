@@ -81,9 +81,10 @@ export default function Notifications() {
                         </div>
                         <div className="flex-1 min-w-0">
                             <p className="text-sm text-slate-200">
-                                <span className="font-bold text-white hover:underline">@{n.remetente_nome}</span> 
-                                {n.tipo === 'curtida' && <span className="text-slate-400"> curtiu sua resenha sobre <strong className="text-indigo-300">"{n.titulo_resenha}"</strong>.</span>}
-                                {n.tipo === 'comentario' && <span className="text-slate-400"> comentou na sua resenha sobre <strong className="text-indigo-300">"{n.titulo_resenha}"</strong>.</span>}
+                                <span className="font-bold text-white hover:underline" title={(n.ultimos_remetentes || []).map(nome => `@${nome}`).join(', ')}>@{n.remetente_nome}</span> 
+                                {n.total_remetentes > 1 && <span className="text-slate-400"> e mais <strong className="text-white">{n.total_remetentes - 1}</strong></span>}
+                                {n.tipo === 'curtida' && <span className="text-slate-400"> {n.total_remetentes > 1 ? 'curtiram' : 'curtiu'} sua resenha sobre <strong className="text-indigo-300">"{n.titulo_resenha}"</strong>.</span>}
+                                {n.tipo === 'comentario' && <span className="text-slate-400"> {n.total_remetentes > 1 ? 'comentaram' : 'comentou'} na sua resenha sobre <strong className="text-indigo-300">"{n.titulo_resenha}"</strong>.</span>}
                                 {n.tipo === 'mensagem' && <span className="text-slate-400"> te enviou uma mensagem.</span>}
                             </p>
                             <span className="text-[10px] text-slate-500 mt-1 block">{new Date(n.data).toLocaleString()}</span>
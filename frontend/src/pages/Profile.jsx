@@ -3,7 +3,7 @@ import api from '../api';
 import { useParams, useLocation, useNavigate } from 'react-router-dom';
 import { 
   Camera, Send, MessageCircle, Edit3, Image as ImageIcon, 
-  Calendar, X, Star, BookOpen, ArrowUp, ArrowDown, Clock, CheckCircle, AlertCircle
+  Calendar, X, Star, BookOpen, ArrowUp, ArrowDown, Clock, CheckCircle, AlertCircle, UserPlus, UserCheck, Users
 } from 'lucide-react';
 import LikesModal from '../components/LikesModal';
 import PropTypes from 'prop-types';
@@ -39,6 +39,7 @@ export default function Profile() {
   const [currentUser, setCurrentUser] = useState(null); 
   const [profileUser, setProfileUser] = useState(null); 
   const [reviews, setReviews] = useState([]);
+  const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
 
   const [isChatOpen, setIsChatOpen] = useState(false);
@@ -77,23 +78,12 @@ export default function Profile() {
   async function loadData() {
     try {
       setLoading(true);
-      const meRes = await api.get('/auth/me/');
-      setCurrentUser(meRes.data);
-
-      let targetUser = meRes.data;
-      if (username && username !== meRes.data.username) {
-          const otherRes = await api.get(`/auth/profile/${username}/`);
-          targetUser = otherRes.data;
-      }
-      setProfileUser(targetUser);
-
-      const reviewsRes = await api.get(`/resenhas/?search=${targetUser.username}`);
-      setReviews(reviewsRes.data.results || []);
-
-      if (username && username !== meRes.data.username) {
-          const msgRes = await api.get(`/mensagens/conversa/?user=${username}`);
-          setChatMessages(msgRes.data);
-      }
+      const res = await api.get(username ? `/auth/profile/${username}/bundle/` : '/auth/me/bundle/');
+      setCurrentUser(res.data.proprio ? res.data.usuario : res.data.eu);
+      setProfileUser(res.data.usuario);
+      setReviews(res.data.resenhas.results);
+      setStats(res.data.estatisticas);
+      setChatMessages(res.data.conversa);
     } catch (error) {
       console.error("Erro:", error);
     } finally {
@@ -101,6 +91,22 @@ export default function Profile() {
     }
   }
 
+  const handleFollow = async () => {
+    try {
+      const res = profileUser.seguindo
+        ? await api.delete(`/auth/profile/${profileUser.username}/seguir/`)
+        : await api.post(`/auth/profile/${profileUser.username}/seguir/`);
+      setProfileUser({
+          ...profileUser,
+          seguindo: res.data.seguindo,
+          perfil: { ...profileUser.perfil, total_seguidores: res.data.total_seguidores }
+      });
+    } catch (error) {
+      console.error(error);
+      setNotification({ message: "Não foi possível atualizar o seguimento.", type: "error" });
+    }
+  };
+
   const handleEditClick = () => {
     setEditFormData({
       username: currentUser.username || "",
@@ -165,9 +171,13 @@ export default function Profile() {
     } catch (error) { console.error(error); }
   };
 
-  const openLikesModal = (curtidores) => {
-      setLikesList(curtidores || []);
+  const openLikesModal = async (resenhaId) => {
+      setLikesList([]);
       setLikesModalOpen(true);
+      try {
+          const res = await api.get(`/resenhas/${resenhaId}/curtidores/`);
+          setLikesList(res.data.results);
+      } catch (err) { console.error(err); }
   };
 
   const getFilteredReviews = () => {
@@ -223,14 +233,18 @@ export default function Profile() {
                         )}
                     </div>
                     <div className="flex flex-wrap justify-center md:justify-start gap-4 mt-4">
-                        <div className="flex items-center gap-2 text-slate-400 text-sm"><BookOpen size={16} className="text-purple-400" /> <span className="font-bold text-white">{reviews.length}</span> Resenhas</div>
+                        <div className="flex items-center gap-2 text-slate-400 text-sm"><BookOpen size={16} className="text-purple-400" /> <span className="font-bold text-white">{stats?.total_resenhas ?? reviews.length}</span> Resenhas</div>
+                        <div className="flex items-center gap-2 text-slate-400 text-sm"><Users size={16} className="text-indigo-400" /> <span className="font-bold text-white">{profileUser.perfil?.total_seguidores || 0}</span> Seguidores · <span className="font-bold text-white">{profileUser.perfil?.total_seguindo || 0}</span> Seguindo</div>
                         <div className="flex items-center gap-2 text-slate-400 text-sm"><Calendar size={16} className="text-pink-400" /> Membro desde {new Date().getFullYear()}</div>
                     </div>
                     <div className="pt-4 flex flex-wrap justify-center md:justify-start gap-3">
                         {isOwnProfile ? (
                             <button onClick={handleEditClick} className="bg-white text-slate-900 hover:bg-slate-200 px-6 py-2.5 rounded-xl font-bold text-sm transition shadow-lg shadow-white/10 flex items-center gap-2"><Edit3 size={16}/> Editar Perfil</button>
                         ) : (
+                            <>
+                            <button onClick={handleFollow} className={`px-6 py-2.5 rounded-xl font-bold text-sm transition flex items-center gap-2 ${profileUser.seguindo ? 'bg-slate-800 text-slate-200 hover:bg-slate-700 border border-slate-700' : 'bg-white text-slate-900 hover:bg-slate-200 shadow-lg shadow-white/10'}`}>{profileUser.seguindo ? <><UserCheck size={16}/> Seguindo</> : <><UserPlus size={16}/> Seguir</>}</button>
                             <button onClick={() => setIsChatOpen(true)} className="bg-indigo-600 hover:bg-indigo-500 text-white px-6 py-2.5 rounded-xl font-bold text-sm transition shadow-lg shadow-indigo-600/30 flex items-center gap-2 animate-bounce-subtle"><MessageCircle size={18}/> Enviar Mensagem</button>
+                            </>
                         )}
                     </div>
                 </div>
@@ -279,7 +293,7 @@ export default function Profile() {
                             <p className="text-sm text-slate-300 line-clamp-3 leading-relaxed flex-1 border-t border-white/5 pt-3">{review.texto_resenha}</p>
                             <div className="flex justify-between items-center mt-4">
                                 <span className="text-[10px] text-slate-500 font-mono uppercase">{new Date(review.data_criacao).toLocaleDateString()}</span>
-                                <button onClick={() => openLikesModal(review.curtidores)} className="text-[10px] text-indigo-400 hover:text-white font-bold transition">
+                                <button onClick={() => openLikesModal(review.id)} className="text-[10px] text-indigo-400 hover:text-white font-bold transition">
                                     {review.total_curtidas} curtidas
                                 </button>
                             </div>